@@ -0,0 +1,47 @@
+"""post counters (comment_count, upvotes, downvotes) and votes table
+
+Revision ID: 4f2a8c61d3b5
+Revises: 9c1e4b7d2a10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a8c61d3b5'
+down_revision: Union[str, None] = '9c1e4b7d2a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('votes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    for name in ('comment_count', 'upvotes', 'downvotes'):
+        op.add_column('posts', sa.Column(
+            name, sa.Integer(), nullable=False, server_default='0'
+        ))
+
+    # backfill comment_count from existing comments (no votes exist yet)
+    op.execute(
+        "UPDATE posts SET comment_count = "
+        "(SELECT count(*) FROM comments WHERE comments.post_id = posts.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ('downvotes', 'upvotes', 'comment_count'):
+        op.drop_column('posts', name)
+    op.drop_table('votes')
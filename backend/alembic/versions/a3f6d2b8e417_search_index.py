@@ -0,0 +1,54 @@
+"""full-text search index over posts and comments
+
+Revision ID: a3f6d2b8e417
+Revises: e2a5c8f1b904
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6d2b8e417'
+down_revision: Union[str, None] = 'e2a5c8f1b904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # sama dengan pyramid_kampusku.search.DDL
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE search_index ("
+            " kind VARCHAR(10) NOT NULL,"
+            " ref_id INTEGER NOT NULL,"
+            " document TSVECTOR NOT NULL,"
+            " PRIMARY KEY (kind, ref_id))"
+        )
+        op.execute("CREATE INDEX ix_search_index_document ON search_index"
+                   " USING gin (document)")
+        op.execute("INSERT INTO search_index (kind, ref_id, document)"
+                   " SELECT 'post', id, to_tsvector('simple', content)"
+                   " FROM posts")
+        op.execute("INSERT INTO search_index (kind, ref_id, document)"
+                   " SELECT 'comment', id, to_tsvector('simple', content)"
+                   " FROM comments")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE search_index USING fts5("
+            "content, kind UNINDEXED, ref_id UNINDEXED,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute("INSERT INTO search_index (rowid, content, kind, ref_id)"
+                   " SELECT id * 2, content, 'post', id FROM posts")
+        op.execute("INSERT INTO search_index (rowid, content, kind, ref_id)"
+                   " SELECT id * 2 + 1, content, 'comment', id FROM comments")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE search_index")
@@ -0,0 +1,44 @@
+"""hot feed ranking table
+
+Revision ID: a8d2f6c4e1b7
+Revises: f1c7a3e9b250
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d2f6c4e1b7'
+down_revision: Union[str, None] = 'f1c7a3e9b250'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('post_ranks',
+    sa.Column('post_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_post_ranks_score_post_id', 'post_ranks',
+                    ['score', 'post_id'], unique=False)
+    # kosong: refresh pertama membangun seluruh tabel (rank_state belum ada)
+    op.create_table('rank_state',
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('last_seq', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rank_state')
+    op.drop_index('ix_post_ranks_score_post_id', table_name='post_ranks')
+    op.drop_table('post_ranks')
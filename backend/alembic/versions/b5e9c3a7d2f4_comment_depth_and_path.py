@@ -0,0 +1,72 @@
+"""comment depth and materialized path
+
+Revision ID: b5e9c3a7d2f4
+Revises: a8d2f6c4e1b7
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e9c3a7d2f4'
+down_revision: Union[str, None] = 'a8d2f6c4e1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# segmen path satu leluhur, sama dengan threads.SEGMENT ('%08x.')
+SEGMENT_SQL = {
+    'postgresql': "lpad(to_hex(p.id), 8, '0') || '.'",
+    'sqlite':     "printf('%08x.', p.id)",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('comments', sa.Column('depth', sa.Integer(),
+                                        server_default='0', nullable=False))
+    op.add_column('comments', sa.Column(
+        'path',
+        sa.String(length=1800).with_variant(
+            sa.String(length=1800, collation='C'), 'postgresql'),
+        server_default='', nullable=False))
+
+    # isi per level: balasan yang parent-nya sudah di level sebelumnya
+    bind = op.get_bind()
+    segment = SEGMENT_SQL[bind.dialect.name]
+    op.execute("UPDATE comments SET depth = -1 WHERE parent_id IS NOT NULL")
+    level = 0
+    while True:
+        done = bind.execute(sa.text(
+            "UPDATE comments SET depth = :next, path ="
+            " (SELECT p.path || " + segment + " FROM comments p"
+            "  WHERE p.id = comments.parent_id)"
+            " WHERE depth = -1 AND parent_id IN"
+            " (SELECT id FROM comments WHERE depth = :level)"
+        ), {'level': level, 'next': level + 1}).rowcount
+        if not done:
+            break
+        level += 1
+
+    op.create_index('ix_comments_path', 'comments', ['path'], unique=False)
+
+    # hanya untuk balasan: parent_id IS NULL harus memakai
+    # ix_comments_top_level
+    op.drop_index('ix_comments_parent_id_created_at', table_name='comments')
+    op.create_index('ix_comments_parent_id_created_at', 'comments',
+                    ['parent_id', 'created_at'],
+                    postgresql_where=sa.text('parent_id IS NOT NULL'),
+                    sqlite_where=sa.text('parent_id IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_parent_id_created_at', table_name='comments')
+    op.create_index('ix_comments_parent_id_created_at', 'comments',
+                    ['parent_id', 'created_at'])
+    op.drop_index('ix_comments_path', table_name='comments')
+    op.drop_column('comments', 'path')
+    op.drop_column('comments', 'depth')
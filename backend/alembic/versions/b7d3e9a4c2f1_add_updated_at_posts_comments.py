@@ -0,0 +1,38 @@
+"""add updated_at to posts and comments (ETag versions)
+
+Revision ID: b7d3e9a4c2f1
+Revises: 4f2a8c61d3b5
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e9a4c2f1'
+down_revision: Union[str, None] = '4f2a8c61d3b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('comments', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # post "berubah" terakhir kali saat dia atau komentar terbarunya dibuat
+    op.execute("UPDATE comments SET updated_at = created_at")
+    op.execute(
+        "UPDATE posts SET updated_at = COALESCE("
+        "(SELECT max(comments.created_at) FROM comments "
+        " WHERE comments.post_id = posts.id), created_at)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('comments', 'updated_at')
+    op.drop_column('posts', 'updated_at')
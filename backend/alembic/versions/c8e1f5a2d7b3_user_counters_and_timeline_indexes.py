@@ -0,0 +1,55 @@
+"""user counters (post_count, comment_count, upvotes_received) and
+profile timeline indexes
+
+Revision ID: c8e1f5a2d7b3
+Revises: a3f6d2b8e417
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f5a2d7b3'
+down_revision: Union[str, None] = 'a3f6d2b8e417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name in ('post_count', 'comment_count', 'upvotes_received'):
+        op.add_column('users', sa.Column(
+            name, sa.Integer(), nullable=False, server_default='0'
+        ))
+    op.execute(
+        "UPDATE users SET"
+        " post_count = (SELECT count(*) FROM posts"
+        "               WHERE posts.user_id = users.id),"
+        " comment_count = (SELECT count(*) FROM comments"
+        "                  WHERE comments.user_id = users.id),"
+        " upvotes_received = (SELECT coalesce(sum(upvotes), 0) FROM posts"
+        "                     WHERE posts.user_id = users.id)"
+    )
+
+    # keyset timeline profil butuh id di ujung index
+    op.drop_index('ix_posts_user_id_created_at', table_name='posts')
+    op.create_index('ix_posts_user_id_created_at', 'posts',
+                    ['user_id', 'created_at', 'id'])
+    op.drop_index('ix_comments_user_id', table_name='comments')
+    op.create_index('ix_comments_user_id_created_at', 'comments',
+                    ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_user_id_created_at', table_name='comments')
+    op.create_index('ix_comments_user_id', 'comments', ['user_id'])
+    op.drop_index('ix_posts_user_id_created_at', table_name='posts')
+    op.create_index('ix_posts_user_id_created_at', 'posts',
+                    ['user_id', 'created_at'])
+    for name in ('upvotes_received', 'comment_count', 'post_count'):
+        op.drop_column('users', name)
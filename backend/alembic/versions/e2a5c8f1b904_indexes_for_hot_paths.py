@@ -0,0 +1,44 @@
+"""indexes for hot foreign-key and sort paths
+
+Revision ID: e2a5c8f1b904
+Revises: b7d3e9a4c2f1
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a5c8f1b904'
+down_revision: Union[str, None] = 'b7d3e9a4c2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_posts_user_id_created_at', 'posts',
+                    ['user_id', 'created_at'])
+    op.create_index('ix_comments_post_id_created_at', 'comments',
+                    ['post_id', 'created_at', 'id'])
+    op.create_index('ix_comments_top_level', 'comments',
+                    ['post_id', 'created_at', 'id'],
+                    postgresql_where=sa.text('parent_id IS NULL'),
+                    sqlite_where=sa.text('parent_id IS NULL'))
+    op.create_index('ix_comments_parent_id_created_at', 'comments',
+                    ['parent_id', 'created_at'])
+    op.create_index('ix_comments_user_id', 'comments', ['user_id'])
+    op.create_index('ix_votes_post_id', 'votes', ['post_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_votes_post_id', table_name='votes')
+    op.drop_index('ix_comments_user_id', table_name='comments')
+    op.drop_index('ix_comments_parent_id_created_at', table_name='comments')
+    op.drop_index('ix_comments_top_level', table_name='comments')
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.drop_index('ix_posts_user_id_created_at', table_name='posts')
@@ -1,8 +1,12 @@
+import logging
+
 from pyramid.config import Configurator
 from pyramid.response import Response
-from pyramid.events import NewResponse
-from sqlalchemy import engine_from_config
-from .models import DBSession, Base
+from pyramid.events import NewRequest, NewResponse
+from sqlalchemy.orm import configure_mappers
+from .models import DBSession, Base, RoutingSession, get_engine
+
+log = logging.getLogger(__name__)
 
 def add_cors_headers(event):
     response = event.response
@@ -16,17 +20,29 @@ def options_view(request):
     # Untuk preflight OPTIONS
     return Response(status=204)
 
-def main(global_config, **settings):
+def route_reads_to_replica(event):
+    # GET/HEAD tidak menulis apa pun -> boleh dibaca dari replica
+    DBSession.info['use_replica'] = event.request.method in ('GET', 'HEAD')
+
+def make_config(settings):
+    """Configurator with the database, tweens, routes and views; shared by
+    :func:`main` and :func:`production_main`."""
     # --- Database setup ---
-    engine = engine_from_config(settings, 'sqlalchemy.')
+    engine = get_engine(settings, 'sqlalchemy.')
     DBSession.configure(bind=engine)
     Base.metadata.bind = engine
 
     # --- Pyramid config ---
+    # response 4xx/5xx -> transaksi di-abort, selain itu di-commit pyramid_tm
+    settings.setdefault('tm.commit_veto', 'pyramid_tm.default_commit_veto')
     config = Configurator(settings=settings)
     config.include('pyramid_tm')
-    config.include('pyramid_jinja2')
-    config.include('pyramid_debugtoolbar')
+
+    # read replica opsional untuk view GET (sqlalchemy_replica.url)
+    RoutingSession.replica = None
+    if settings.get('sqlalchemy_replica.url'):
+        RoutingSession.replica = get_engine(settings, 'sqlalchemy_replica.')
+        config.add_subscriber(route_reads_to_replica, NewRequest)
 
     # 1) Tambahkan subscriber untuk semua response
     config.add_subscriber(add_cors_headers, NewResponse)
@@ -35,7 +51,50 @@ def main(global_config, **settings):
     config.add_route('cors-preflight', '/api/*{path:.*}', request_method='OPTIONS')
     config.add_view(options_view, route_name='cors-preflight')
 
+    # Response cache (feed & thread komentar), lihat cache.py
+    config.include('.cache')
+    # bcrypt di process pool terpisah, lihat hashing.py
+    config.include('.hashing')
+    config.include('.events')
+    # efek samping write lewat outbox + worker, lihat outbox.py
+    config.include('.outbox')
+    # skor feed "hot" di-refresh terjadwal dari change log, lihat ranking.py
+    config.include('.ranking')
+    # token Bearer (HMAC) + security policy, lihat auth.py
+    config.include('.auth')
+    # token bucket per IP/user + batas request bersamaan, lihat ratelimit.py
+    config.include('.ratelimit')
+    # latensi/SQL per route di GET /metrics, lihat metrics.py
+    config.include('.metrics')
+    # renderer 'json' via orjson bila terpasang, lihat renderers.py
+    config.include('.renderers')
+    # gzip/brotli sesuai Accept-Encoding, lihat compression.py
+    config.include('.compression')
+
     # Routes & views
     config.include('.routes')    # yourpackage/routes.py
-    config.scan('pyramid_kampusku.views')   # scan views di yourpackage/views
+    config.include('.views')     # didaftarkan eksplisit, lihat views/__init__.py
+    return config
+
+def main(global_config, **settings):
+    """App factory for development: everything plus ``pyramid_jinja2`` and
+    ``pyramid.includes`` (the debug toolbar in development.ini)."""
+    config = make_config(settings)
+    config.include('pyramid_jinja2')
+    # pyramid_debugtoolbar hanya lewat pyramid.includes di development.ini
     return config.make_wsgi_app()
+
+def production_main(global_config, **settings):
+    """Lean app factory for production (``use = call:pyramid_kampusku:
+    production_main``): no template engine, ``pyramid.includes`` ignored,
+    and the ORM mappers configured up front so a preloading server
+    (``kampusku_serve``) does that work once, before forking workers.
+    Every view renders JSON, so nothing else changes.
+    """
+    includes = settings.pop('pyramid.includes', '').split()
+    if includes:
+        log.warning('production_main ignores pyramid.includes: %s',
+                    ', '.join(includes))
+    app = make_config(settings).make_wsgi_app()
+    configure_mappers()
+    return app
@@ -0,0 +1,253 @@
+# backend/pyramid_kampusku/asgi.py
+"""Entry point ASGI: GET baca utama lewat driver database async.
+
+Di bawah waitress setiap koneksi yang sedang dilayani memegang satu
+thread dari pool yang tetap, termasuk selama menunggu database. Di sini
+request ``GET``/``HEAD`` ke route ``ASYNC_ROUTES`` (feed, thread komentar,
+profil user) dijalankan di event loop:
+
+* pipeline Pyramid-nya sama persis (tween rate limit, metrik, kompresi,
+  ETag, cache, renderer, subscriber CORS), jadi view-nya tidak berubah;
+* pipeline itu berjalan di greenlet lewat ``AsyncSession.run_sync``:
+  ``DBSession`` di request ini adalah session engine async (aiosqlite /
+  asyncpg), jadi saat view menunggu database event loop melayani koneksi
+  lain, bukan memblokir thread;
+* transaksinya read-only milik request itu sendiri (ditutup = rollback),
+  pyramid_tm tidak ikut (``tm.active``): transaction manager-nya per
+  thread, dan semua request async berbagi satu thread. Karena itu view
+  di sini tidak boleh memakai ``request.tm`` (error ``NoTransaction``);
+  view yang butuh transaksi harus tetap di jalur WSGI;
+* body dikirim lewat ``send`` ASGI, jadi klien lambat yang mengunduh feed
+  besar hanya menahan buffer koneksi, bukan thread.
+
+Request lain (write, ``?stream=1``, SSE, route lain) diteruskan ke app
+WSGI yang sama di pool ``asgi.wsgi_threads`` thread (a2wsgi) dan
+berperilaku persis seperti di waitress, termasuk pyramid_tm. Stream SSE
+tetap menahan satu thread pool itu per klien.
+
+Bagian CPU (serialisasi, JSON, kompresi) tetap berjalan di thread event
+loop: satu proses tetap memakai paling banyak satu core, jadi jalankan
+beberapa worker. ``ratelimit.max_concurrent`` kini juga menghitung
+request async yang sedang menunggu database; naikkan dari batas thread
+waitress. ``get_current_request()`` tidak tersedia di jalur async.
+
+Menjalankan (``pip install .[asgi]``)::
+
+    kampusku_serve_asgi production.ini --port 6543 --workers 4
+    KAMPUSKU_INI=production.ini uvicorn --factory pyramid_kampusku.asgi:from_env
+
+Konfigurasi (production.ini)::
+
+    # default: sqlalchemy_replica.url, atau sqlalchemy.url, dengan driver
+    # async (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg)
+    sqlalchemy_async.url       =
+    sqlalchemy_async.pool_size = 10     # opsi pool seperti sqlalchemy.*
+    asgi.wsgi_threads          = 8      # thread untuk request WSGI
+"""
+
+import io
+import logging
+import os
+
+from pyramid.interfaces import IRoutesMapper
+from sqlalchemy.engine import make_url
+
+from .metrics import instrument
+from .models import DBSession, session_scope
+from .streaming import wants_stream
+
+log = logging.getLogger(__name__)
+
+# route GET yang dilayani di event loop. Invariant: view GET route ini
+# hanya membaca; tidak boleh memakai request.tm (invalidate cache,
+# publish event, outbox) karena pyramid_tm tidak berjalan di sini.
+# request.tm di jalur async adalah NoTransaction yang langsung error;
+# route yang butuh transaksi tetap lewat WSGI.
+ASYNC_ROUTES = {'posts', 'comments', 'user'}
+
+ASYNC_DRIVERS = {
+    'sqlite':     'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+_ERROR_BODY = b'{"error": "Server error"}'
+
+
+def async_url(url):
+    """``url`` with its driver swapped for the async one."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError('no async driver for %r; set sqlalchemy_async.url'
+                         % backend)
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def get_async_engine(settings, prefix='sqlalchemy_async.'):
+    """``AsyncEngine`` for the async read path, configured like
+    :func:`models.get_engine` (``<prefix>statement_timeout`` in ms)."""
+    from sqlalchemy.ext.asyncio import async_engine_from_config
+
+    settings = dict(settings)
+    if not settings.get(prefix + 'url'):
+        settings[prefix + 'url'] = async_url(
+            settings.get('sqlalchemy_replica.url') or settings['sqlalchemy.url']
+        )
+    timeout = settings.pop(prefix + 'statement_timeout',
+                           settings.get('sqlalchemy.statement_timeout'))
+    kw = {}
+    if timeout and str(settings[prefix + 'url']).startswith('postgresql'):
+        kw['connect_args'] = {
+            'server_settings': {'statement_timeout': str(int(timeout))}
+        }
+    return async_engine_from_config(settings, prefix, **kw)
+
+
+def environ_from_scope(scope):
+    """A WSGI environ (without body) for the ASGI HTTP ``scope``."""
+    root   = scope.get('root_path', '')
+    path   = scope['path']
+    if root and path.startswith(root):
+        path = path[len(root):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD':    scope['method'],
+        'SCRIPT_NAME':       root.encode('utf-8').decode('latin-1'),
+        'PATH_INFO':         path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING':      scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME':       server[0],
+        'SERVER_PORT':       str(server[1]),
+        'SERVER_PROTOCOL':   'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR':       client[0],
+        'wsgi.version':      (1, 0),
+        'wsgi.url_scheme':   scope.get('scheme', 'http'),
+        'wsgi.input':        io.BytesIO(),
+        'wsgi.errors':       io.StringIO(),
+        'wsgi.multithread':  True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once':     False,
+    }
+    for name, value in scope.get('headers', ()):
+        name  = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+    return environ
+
+
+class NoTransaction(object):
+    """``request.tm`` on the async path: every use raises, so a view in
+    ``ASYNC_ROUTES`` that needs a transaction fails loudly instead of
+    joining a transaction nobody commits."""
+
+    def __getattr__(self, name):
+        raise RuntimeError('request.tm is not available on the async read '
+                           'path; remove the route from ASYNC_ROUTES')
+
+
+class AsyncApp(object):
+    """ASGI app: ``ASYNC_ROUTES`` on the event loop with ``engine``, the
+    rest through the WSGI ``app`` (a Pyramid router) in a thread pool."""
+
+    def __init__(self, app, engine, threads=8):
+        from a2wsgi import WSGIMiddleware
+
+        self.app    = app
+        self.engine = engine
+        self.routes = app.registry.getUtility(IRoutesMapper)
+        self.wsgi   = WSGIMiddleware(app, workers=threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            return await self.wsgi(scope, receive, send)
+        # tanpa begin(): threadlocal Pyramid tidak di-push, semua request
+        # async berbagi thread event loop
+        request = self.app.request_context(environ_from_scope(scope)).request
+        route = self.routes(request)['route']
+        if route is None or route.name not in ASYNC_ROUTES or \
+                wants_stream(request):
+            return await self.wsgi(scope, receive, send)
+
+        try:
+            status, headers, body = await self.handle(request)
+        except Exception:
+            log.exception('error in %s %s', request.method, request.path_qs)
+            status, headers, body = 500, [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(_ERROR_BODY)).encode()),
+            ], _ERROR_BODY
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def handle(self, request):
+        """Run ``request`` through the Pyramid pipeline with a session on
+        the async engine; returns ``(status, headers, body)``."""
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        token = session_scope.set(object())
+        try:
+            async with AsyncSession(self.engine) as session:
+                return await session.run_sync(self._invoke, request)
+        finally:
+            session_scope.reset(token)
+
+    def _invoke(self, session, request):
+        # di greenlet: setiap akses database menunggu di event loop
+        DBSession.registry.set(session)
+        # transaksi = session ini (read-only); pyramid_tm tidak ikut dan
+        # request.tm (dibaca dari tm.manager) menolak dipakai
+        request.environ['tm.active']  = True
+        request.environ['tm.manager'] = NoTransaction()
+        try:
+            response = self.app.invoke_request(request)
+            body = b''
+            if request.method != 'HEAD':
+                body = b''.join(response.app_iter)
+            close = getattr(response.app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            DBSession.registry.clear()
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                   for k, v in response.headerlist]
+        return response.status_int, headers, body
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def main(global_config, **settings):
+    """Build the ASGI app: the WSGI app of ``production_main`` plus the
+    async read path."""
+    from . import production_main as wsgi_main
+
+    app    = wsgi_main(global_config, **settings)
+    engine = get_async_engine(settings)
+    if getattr(app.registry, 'metrics', None) is not None:
+        instrument(engine.sync_engine)
+    return AsyncApp(app, engine,
+                    threads=int(settings.get('asgi.wsgi_threads', 8)))
+
+
+def from_env():
+    """App factory for ``uvicorn --factory``: reads the .ini file named by
+    ``$KAMPUSKU_INI``."""
+    from pyramid.paster import get_appsettings, setup_logging
+
+    config_uri = os.environ.get('KAMPUSKU_INI', 'production.ini')
+    setup_logging(config_uri)
+    return main({}, **get_appsettings(config_uri))
@@ -0,0 +1,201 @@
+# backend/pyramid_kampusku/auth.py
+"""Token login stateless (HMAC) dan security policy Pyramid.
+
+``login``/``register`` mengeluarkan token ``<payload>.<signature>``:
+payload = base64url JSON ``[user_id, expires]``, signature = HMAC-SHA256
+atas payload dengan ``auth.secret``. Client mengirimnya di
+``Authorization: Bearer <token>``; view write memakai ``permission='write'``
+(view baca data pribadi, mis. notifikasi: ``permission='private'``) dan
+membaca ``request.identity`` (``{'id'}``) alih-alih ``user_id`` di body
+dan SELECT ke tabel users.
+
+Username sengaja tidak ada di token: user bisa ganti nama
+(``PUT /api/users/{id}``) sementara token lamanya masih berlaku.
+``request.username`` membacanya dari database (satu SELECT per primary
+key, hanya di request yang memakainya, yaitu view write yang menaruh
+nama penulis di respons/event).
+
+Token yang sudah diverifikasi disimpan di LRU kecil supaya request
+berikutnya dengan token yang sama tidak menghitung HMAC lagi; masa
+berlakunya tetap dicek setiap kali.
+
+Konfigurasi (development.ini)::
+
+    auth.secret        = ...     # WAJIB, sama di semua proses
+    auth.ttl           = 86400   # umur token (detik)
+    auth.cache_size    = 10000   # token terverifikasi yang diingat
+    auth.random_secret = false   # true: secret acak per proses bila
+                                 # auth.secret kosong (hanya test/dev)
+
+Tanpa ``auth.secret`` app gagal start (``ConfigurationError``): secret
+acak per proses membuat token tidak berlaku setelah restart dan ditolak
+worker lain.
+"""
+
+import base64
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+from pyramid.exceptions import ConfigurationError
+from pyramid.security import Allowed, Denied
+
+from .models import DBSession, User
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 3600
+
+# izin yang diberikan ke setiap token valid
+TOKEN_PERMISSIONS = ('write', 'private')
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class TokenSigner(object):
+    """Issues and verifies signed, expiring user tokens."""
+
+    def __init__(self, secret, ttl=DEFAULT_TTL, cache_size=10000):
+        self.secret     = secret.encode() if isinstance(secret, str) else secret
+        self.ttl        = ttl
+        self.cache_size = cache_size
+        self._verified  = collections.OrderedDict()
+        self._lock      = threading.Lock()
+
+    def _sign(self, payload):
+        digest = hmac.new(self.secret, payload.encode(), hashlib.sha256)
+        return _b64encode(digest.digest())
+
+    def issue(self, user_id, now=None):
+        """Return a token for ``user_id`` valid for ``ttl`` seconds."""
+        expires = int((now or time.time()) + self.ttl)
+        payload = _b64encode(json.dumps([user_id, expires],
+                                        separators=(',', ':')).encode())
+        return payload + '.' + self._sign(payload)
+
+    def verify(self, token, now=None):
+        """Return ``{'id'}`` for a valid token, else ``None``."""
+        now = now or time.time()
+        with self._lock:
+            hit = self._verified.get(token)
+            if hit is not None:
+                self._verified.move_to_end(token)
+        if hit is None:
+            hit = self._check(token)
+            if hit is None:
+                return None
+            with self._lock:
+                self._verified[token] = hit
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        identity, expires = hit
+        return identity if expires > now else None
+
+    def _check(self, token):
+        payload, _, signature = token.partition('.')
+        if not signature or not hmac.compare_digest(self._sign(payload),
+                                                    signature):
+            return None
+        try:
+            # token lama berbentuk [user_id, username, expires]
+            fields  = json.loads(_b64decode(payload))
+            user_id = int(fields[0])
+            expires = fields[-1]
+        except Exception:
+            return None
+        return {'id': user_id}, expires
+
+
+def signer_from_settings(settings):
+    """Build the :class:`TokenSigner` configured by the ``auth.*`` settings.
+
+    Raises :class:`ConfigurationError` when ``auth.secret`` is empty, unless
+    ``auth.random_secret = true`` (tests, throwaway dev servers).
+    """
+    secret = settings.get('auth.secret')
+    if not secret:
+        if settings.get('auth.random_secret', 'false').lower() != 'true':
+            raise ConfigurationError(
+                'auth.secret is not set; every process must share the same '
+                'secret (set auth.random_secret = true for tests only)')
+        log.warning('auth.secret is not set; using a random per-process '
+                    'secret (tokens break on restart and across processes)')
+        secret = os.urandom(32)
+    return TokenSigner(
+        secret,
+        ttl=int(settings.get('auth.ttl', DEFAULT_TTL)),
+        cache_size=int(settings.get('auth.cache_size', 10000)),
+    )
+
+
+class TokenSecurityPolicy(object):
+    """Identity from ``Authorization: Bearer <token>``; the ``write`` and
+    ``private`` permissions are granted to any valid token."""
+
+    def __init__(self, signer):
+        self.signer = signer
+
+    def identity(self, request):
+        if 'kampusku.identity' not in request.environ:
+            identity = None
+            scheme, _, token = request.headers.get('Authorization', '') \
+                                      .partition(' ')
+            if scheme.lower() == 'bearer' and token:
+                identity = self.signer.verify(token.strip())
+            request.environ['kampusku.identity'] = identity
+        return request.environ['kampusku.identity']
+
+    def authenticated_userid(self, request):
+        identity = self.identity(request)
+        return identity['id'] if identity else None
+
+    def permits(self, request, context, permission):
+        if permission in TOKEN_PERMISSIONS and \
+                self.identity(request) is not None:
+            return Allowed('valid token')
+        return Denied('no valid token')
+
+    def remember(self, request, userid, **kw):
+        return []
+
+    def forget(self, request, **kw):
+        return []
+
+
+def request_username(request):
+    """``request.username``: the token user's current username (``None``
+    without a valid token)."""
+    identity = request.identity
+    if identity is None:
+        return None
+    return DBSession.query(User.username) \
+                    .filter_by(id=identity['id']).scalar()
+
+
+def forbidden_view(request):
+    """JSON 401 for a missing/expired token, 403 otherwise."""
+    if request.identity is None:
+        request.response.status = 401
+        request.response.headers['WWW-Authenticate'] = 'Bearer'
+        return {'error': 'Login required'}
+    request.response.status = 403
+    return {'error': 'Forbidden'}
+
+
+def includeme(config):
+    signer = signer_from_settings(config.get_settings())
+    config.registry.token_signer = signer
+    config.set_security_policy(TokenSecurityPolicy(signer))
+    config.add_request_method(request_username, 'username', reify=True)
+    config.add_forbidden_view(forbidden_view, renderer='json')
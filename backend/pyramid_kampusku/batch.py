@@ -0,0 +1,161 @@
+# backend/pyramid_kampusku/batch.py
+"""Bulk create untuk integrasi (POST /api/posts/batch, /api/comments/batch).
+
+Satu request membawa sampai ``BATCH_MAX_ITEMS`` item dan di-commit sekali.
+Setiap item divalidasi sendiri; item yang gagal dilaporkan di posisinya
+(``{'index', 'error'}``) dan tidak menggagalkan item lain. Referensi
+(post, parent comment) dicek dengan satu query ``IN`` per batch dan baris
+disisipkan dengan satu ``INSERT ... RETURNING`` (executemany). Efek
+sampingnya (index search, counter, change log, notifikasi, event SSE)
+sama dengan create satuan: view mengantre satu job outbox per baris
+(``outbox.enqueue_many``) dan worker yang mengerjakannya.
+"""
+
+from sqlalchemy import insert
+
+from .models import DBSession, Comment, Post
+from .threads import InvalidParent, place_under
+
+BATCH_MAX_ITEMS = 500
+
+
+class InvalidBatch(ValueError):
+    """Raised when the request body is not a usable batch."""
+
+
+def parse_items(request, key):
+    """The list under ``key`` in the JSON body (1..BATCH_MAX_ITEMS items)."""
+    try:
+        items = request.json_body.get(key)
+    except Exception:
+        raise InvalidBatch('Invalid JSON body')
+    if not isinstance(items, list) or not items:
+        raise InvalidBatch('%s must be a non-empty list' % key)
+    if len(items) > BATCH_MAX_ITEMS:
+        raise InvalidBatch('at most %d %s per batch' % (BATCH_MAX_ITEMS, key))
+    return items
+
+
+def _content(item):
+    if not isinstance(item, dict):
+        return None, 'item must be an object'
+    content = item.get('content')
+    if not isinstance(content, str) or not content.strip():
+        return None, 'content is required'
+    return content, None
+
+
+def _int_or_none(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) \
+        else None
+
+
+def _insert(model, params):
+    """INSERT ``params`` into ``model`` as one multi-row statement; returns
+    ``(id, created_at)`` per param, in order.
+
+    PostgreSQL does not promise that a multi-row INSERT hands out ids in
+    VALUES order, so there ``sort_by_parameter_order`` matches the
+    RETURNING rows to ``params`` (still one batched statement). On SQLite
+    that option would fall back to one INSERT per row; a single INSERT
+    there assigns rowids in VALUES order, so sorting by id is enough.
+    """
+    stmt = insert(model)
+    if DBSession.get_bind().dialect.name == 'postgresql':
+        return DBSession.execute(
+            stmt.returning(model.id, model.created_at,
+                           sort_by_parameter_order=True), params
+        ).all()
+    rows = DBSession.execute(
+        stmt.returning(model.id, model.created_at), params
+    ).all()
+    return sorted(rows, key=lambda r: r.id)
+
+
+def create_posts(user_id, items):
+    """Insert the valid ``items`` as posts by ``user_id``.
+
+    Returns ``(results, created)``: one result dict per item, in order,
+    and the created rows as ``(index, id, content, created_at)``.
+    """
+    results = [None] * len(items)
+    rows    = []
+    for i, item in enumerate(items):
+        content, error = _content(item)
+        if error:
+            results[i] = {'index': i, 'error': error}
+        else:
+            rows.append((i, content))
+    if not rows:
+        return results, []
+
+    inserted = _insert(Post, [{'content': content, 'user_id': user_id}
+                              for _, content in rows])
+    created = [(i, r.id, content, r.created_at)
+               for (i, content), r in zip(rows, inserted)]
+    for i, id_, _, _ in created:
+        results[i] = {'index': i, 'id': id_}
+    return results, created
+
+
+def create_comments(user_id, items):
+    """Insert the valid ``items`` as comments by ``user_id``.
+
+    Each item needs ``post_id`` and ``content``; ``parent_id`` must be a
+    comment on the same post. Returns ``(results, created)`` like
+    :func:`create_posts`, with created rows as ``(index, id, post_id,
+    parent_id, content, created_at)``.
+    """
+    results = [None] * len(items)
+    wanted  = []
+    for i, item in enumerate(items):
+        content, error = _content(item)
+        post_id = _int_or_none(item.get('post_id')) if not error else None
+        if not error and post_id is None:
+            error = 'post_id must be an integer'
+        parent_id = item.get('parent_id') if not error else None
+        if parent_id is not None and _int_or_none(parent_id) is None:
+            error = 'parent_id must be an integer'
+        if error:
+            results[i] = {'index': i, 'error': error}
+        else:
+            wanted.append((i, post_id, parent_id, content))
+
+    post_ids   = {post_id for _, post_id, _, _ in wanted}
+    parent_ids = {parent_id for _, _, parent_id, _ in wanted if parent_id}
+    posts   = {pid for pid, in DBSession.query(Post.id)
+                                        .filter(Post.id.in_(post_ids))} \
+        if post_ids else set()
+    parents = {r.id: r for r in DBSession.query(Comment.id, Comment.post_id,
+                                                 Comment.path, Comment.depth)
+                                          .filter(Comment.id.in_(parent_ids))} \
+        if parent_ids else {}
+
+    rows = []
+    for i, post_id, parent_id, content in wanted:
+        parent = parents.get(parent_id) if parent_id else None
+        if post_id not in posts:
+            results[i] = {'index': i, 'error': 'Post not found'}
+        elif parent_id and (parent is None or parent.post_id != post_id):
+            results[i] = {'index': i, 'error': 'Parent comment not found'}
+        else:
+            try:
+                path, depth = place_under(parent) if parent else ('', 0)
+            except InvalidParent as e:
+                results[i] = {'index': i, 'error': str(e)}
+                continue
+            rows.append((i, post_id, parent_id, content, path, depth))
+    if not rows:
+        return results, []
+
+    inserted = _insert(Comment, [
+        {'content': content, 'user_id': user_id, 'post_id': post_id,
+         'parent_id': parent_id, 'path': path, 'depth': depth}
+        for _, post_id, parent_id, content, path, depth in rows
+    ])
+    created = [(i, r.id, post_id, parent_id, content, r.created_at)
+               for (i, post_id, parent_id, content, _, _), r
+               in zip(rows, inserted)]
+    for i, id_, _, _, _, _ in created:
+        results[i] = {'index': i, 'id': id_}
+    return results, created
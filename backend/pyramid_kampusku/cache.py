@@ -0,0 +1,195 @@
+# backend/pyramid_kampusku/cache.py
+"""Response cache untuk halaman feed dan thread komentar.
+
+Invalidasi memakai generation counter: setiap key menyertakan versi
+"namespace"-nya (``post:<id>`` dan ``all``), jadi write cukup
+menaikkan versi namespace yang terdampak; entry lama tidak pernah dibaca
+lagi dan akhirnya keluar lewat LRU/TTL. TTL juga membatasi umur entry
+yang terisi bersamaan dengan write yang sedang berjalan.
+
+Konfigurasi (development.ini)::
+
+    cache.backend        = memory   # memory | none | paket.modul:Kelas
+    cache.max_entries    = 10000
+    cache.ttl            = 60
+    cache.stats_endpoint = false    # true: daftarkan GET /api/cache/stats
+
+GET /api/cache/stats tanpa autentikasi, jadi hanya didaftarkan bila
+``cache.stats_endpoint = true`` (development); hit, miss dan eviction
+juga diekspor di GET /metrics.
+"""
+
+import collections
+import threading
+import time
+
+from pyramid.path import DottedNameResolver
+
+
+class BaseCache(object):
+    """Interface for cache backends.
+
+    A shared backend (Redis, memcached, ...) subclasses this, implements
+    the five methods below and is selected with ``cache.backend =
+    package.module:Class``. ``from_settings`` receives the ``cache.*``
+    settings with the prefix stripped. Values are JSON-compatible dicts;
+    generations must never expire or be evicted.
+    """
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls()
+
+    def get(self, key):
+        """Return the cached value or ``None``."""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def generation(self, name):
+        """Current version number of namespace ``name`` (0 if unseen)."""
+        raise NotImplementedError
+
+    def bump(self, name):
+        """Invalidate every key built with namespace ``name``."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return a dict with at least hits, misses and evictions."""
+        raise NotImplementedError
+
+    def key(self, *parts, gens=()):
+        """Build a key from ``parts`` plus the current generation of
+        ``all`` and of each namespace in ``gens``."""
+        versions = [self.generation(n) for n in ('all',) + tuple(gens)]
+        return ':'.join(str(p) for p in parts) + \
+            '@' + '.'.join(str(v) for v in versions)
+
+
+class NullCache(BaseCache):
+    """Disabled cache (``cache.backend = none``): every get is a miss."""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def generation(self, name):
+        return 0
+
+    def bump(self, name):
+        pass
+
+    def stats(self):
+        return {'backend': 'none', 'hits': 0, 'misses': self.misses,
+                'evictions': 0, 'entries': 0}
+
+
+class MemoryCache(BaseCache):
+    """In-process LRU cache with a per-entry TTL.
+
+    Each waitress worker process has its own copy; use a shared backend
+    when running more than one process.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self._data       = collections.OrderedDict()
+        self._gens       = {}
+        self._lock       = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            max_entries=int(settings.get('max_entries', 10000)),
+            ttl=float(settings.get('ttl', 60)),
+        )
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, name):
+        return self._gens.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._gens[name] = self._gens.get(name, 0) + 1
+
+    def stats(self):
+        return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self._data)}
+
+
+BACKENDS = {
+    'memory': MemoryCache,
+    'none':   NullCache,
+}
+
+
+def cache_from_settings(settings):
+    """Build the cache backend configured by the ``cache.*`` settings."""
+    options = {k[len('cache.'):]: v for k, v in settings.items()
+               if k.startswith('cache.')}
+    options.pop('stats_endpoint', None)
+    name = options.pop('backend', 'memory').strip()
+    cls  = BACKENDS.get(name) or DottedNameResolver().resolve(name)
+    return cls.from_settings(options)
+
+
+def invalidate(request, *names):
+    """Bump the generation of each namespace in ``names`` once the
+    request's transaction has committed (nothing happens on abort)."""
+    cache = request.cache
+
+    def bump_after_commit(success):
+        if success:
+            for name in names:
+                cache.bump(name)
+
+    request.tm.get().addAfterCommitHook(bump_after_commit)
+
+
+def post_ns(post_id):
+    """Namespace covering one post's feed entry and comment threads."""
+    return 'post:%d' % post_id
+
+
+def cache_stats_view(request):
+    return request.cache.stats()
+
+
+def includeme(config):
+    settings = config.get_settings()
+    config.registry.cache = cache_from_settings(settings)
+    config.add_request_method(
+        lambda request: request.registry.cache, 'cache', reify=True
+    )
+    if settings.get('cache.stats_endpoint', 'false').lower() == 'true':
+        config.add_route('cache_stats', '/api/cache/stats')
+        config.add_view(cache_stats_view, route_name='cache_stats',
+                        renderer='json', request_method='GET')
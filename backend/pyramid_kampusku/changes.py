@@ -0,0 +1,144 @@
+# backend/pyramid_kampusku/changes.py
+"""Change log untuk sinkronisasi inkremental (GET /api/posts/changes).
+
+Setiap write ke post/komentar menambah satu baris ``changes`` di transaksi
+yang sama (:func:`record`). Client polling menyimpan ``next_since`` dan
+hanya menerima entitas yang berubah sesudahnya, dalam *keadaan saat ini*
+(bukan isi saat write), atau tombstone jika sudah dihapus. Karena itu
+mengirim perubahan yang sama dua kali tidak berbahaya, dan dipakai untuk
+menutup celah urutan commit: ``seq`` dibagikan saat INSERT, jadi
+transaksi yang mulai lebih dulu bisa commit dengan ``seq`` lebih kecil
+setelah client sudah lewat. ``next_since`` karenanya tidak melewati baris
+yang umurnya kurang dari ``SETTLE_SECONDS``; baris itu dikirim ulang di
+poll berikutnya sampai "mengendap".
+
+Menghapus post hanya meninggalkan tombstone post; komentarnya ikut
+hilang. Menghapus komentar meninggalkan tombstone komentar itu saja;
+balasannya ikut hilang.
+"""
+
+import datetime
+
+from sqlalchemy import func, insert
+
+from .models import DBSession, Change, Comment, Post
+from .serializers import load_usernames
+
+POST    = 'post'
+COMMENT = 'comment'
+
+# lebih lama dari transaksi write terpanjang (statement_timeout 5 detik)
+SETTLE_SECONDS = 10
+
+
+def record(kind, ref_id, post_id, deleted=False):
+    """Log a write to ``kind`` ``ref_id`` in the current transaction."""
+    DBSession.add(Change(kind=kind, ref_id=ref_id, post_id=post_id,
+                         deleted=deleted))
+
+
+def record_many(entries):
+    """:func:`record` for many ``(kind, ref_id, post_id)`` in one INSERT."""
+    if entries:
+        DBSession.execute(insert(Change), [
+            {'kind': kind, 'ref_id': ref_id, 'post_id': post_id,
+             'deleted': False}
+            for kind, ref_id, post_id in entries
+        ])
+
+
+def head():
+    """The newest ``seq`` (0 when the log is empty)."""
+    return DBSession.query(func.max(Change.seq)).scalar() or 0
+
+
+def is_pruned(since):
+    """True if rows after ``since`` may already have been pruned."""
+    oldest = DBSession.query(func.min(Change.seq)).scalar()
+    return oldest is not None and since + 1 < oldest
+
+
+def prune(before):
+    """Delete change rows older than the datetime ``before``."""
+    return DBSession.query(Change).filter(Change.created_at < before) \
+                    .delete(synchronize_session=False)
+
+
+def _post_data(p, username):
+    return {
+        'id':            p.id,
+        'username':      username,
+        'content':       p.content,
+        'created_at':    p.created_at.isoformat(),
+        'upvotes':       p.upvotes,
+        'downvotes':     p.downvotes,
+        'comment_count': p.comment_count,
+    }
+
+
+def _comment_data(c, username):
+    return {
+        'id':         c.id,
+        'post_id':    c.post_id,
+        'parent_id':  c.parent_id,
+        'username':   username,
+        'content':    c.content,
+        'created_at': c.created_at.isoformat(),
+    }
+
+
+def changes_since(since, limit, now=None):
+    """Entities changed after ``since``, oldest change first.
+
+    Returns ``(changes, next_since, more)``. Each entity appears once,
+    with its current data or as a tombstone (``deleted: true``). Costs
+    four queries however many changes there are.
+    """
+    rows = DBSession.query(Change.seq, Change.kind, Change.ref_id,
+                           Change.post_id, Change.created_at) \
+                    .filter(Change.seq > since) \
+                    .order_by(Change.seq).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    settled = (now or datetime.datetime.utcnow()) - \
+        datetime.timedelta(seconds=SETTLE_SECONDS)
+    next_since = since
+    for r in rows:
+        if r.created_at > settled:
+            break
+        next_since = r.seq
+    if more and next_since == since and rows:
+        # satu halaman penuh baris baru: tetap maju supaya tidak macet
+        next_since = rows[-1].seq
+
+    # satu entri per entitas, di posisi perubahan terakhirnya
+    latest = {}
+    for r in rows:
+        latest.pop((r.kind, r.ref_id), None)
+        latest[r.kind, r.ref_id] = r
+
+    post_ids    = [i for k, i in latest if k == POST]
+    comment_ids = [i for k, i in latest if k == COMMENT]
+    posts = {p.id: p for p in DBSession.query(Post)
+                                       .filter(Post.id.in_(post_ids))} \
+        if post_ids else {}
+    comments = {c.id: c for c in DBSession.query(Comment)
+                                          .filter(Comment.id.in_(comment_ids))} \
+        if comment_ids else {}
+    usernames = load_usernames(
+        {p.user_id for p in posts.values()} |
+        {c.user_id for c in comments.values()}
+    )
+
+    out = []
+    for (kind, ref_id), r in latest.items():
+        source = posts if kind == POST else comments
+        entity = source.get(ref_id)
+        item = {'seq': r.seq, 'type': kind, 'id': ref_id,
+                'post_id': r.post_id, 'deleted': entity is None}
+        if entity is not None:
+            data = _post_data if kind == POST else _comment_data
+            item['data'] = data(entity, usernames.get(entity.user_id))
+        out.append(item)
+    return out, next_since, more
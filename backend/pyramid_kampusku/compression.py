@@ -0,0 +1,177 @@
+# backend/pyramid_kampusku/compression.py
+"""Kompresi response on-the-fly (brotli/gzip) sesuai ``Accept-Encoding``.
+
+JSON feed dan thread sangat repetitif (key yang sama di setiap node,
+username berulang) sehingga gzip biasanya memangkasnya ke 10-20% ukuran
+aslinya. Tween ``CompressionTween`` mengompresi response bertipe teks
+(JSON, teks, HTML, ...) yang bodynya minimal ``min_size`` byte:
+
+* ``br`` dipakai bila klien menerimanya dan paket ``brotli`` terpasang,
+  selain itu ``gzip`` (zlib, selalu ada);
+* response streaming (``?stream=1``, panjang tidak diketahui) dikompresi
+  per chunk dengan flush, jadi tetap terkirim sedikit demi sedikit;
+  SSE (``text/event-stream``) tidak pernah dikompresi;
+* ``Vary: Accept-Encoding`` selalu ditambahkan pada tipe yang bisa
+  dikompresi, dan ETag varian terkompresi diberi akhiran ``-gzip``/``-br``
+  (representasi berbeda = ETag berbeda). Akhiran itu dibuang lagi dari
+  ``If-None-Match`` sebelum view membandingkannya, jadi 304 tetap jalan.
+
+Tween duduk di bawah rate limit dan di atas pyramid_tm: response yang
+ditolak tidak ikut dikompresi, dan kompresi tidak menahan transaksi.
+
+Konfigurasi (development.ini)::
+
+    compression.enabled        = true
+    compression.min_size       = 1024   # byte; lebih kecil: tidak dikompresi
+    compression.gzip_level     = 6      # 1 (cepat) .. 9 (kecil)
+    compression.brotli_quality = 4      # 0 .. 11; >5 mahal untuk on-the-fly
+"""
+
+import re
+import zlib
+
+from pyramid.tweens import INGRESS, MAIN
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml',
+}
+
+_ETAG_SUFFIX = re.compile(r'-(?:gzip|br)"')
+
+
+def brotli_module():
+    """The ``brotli`` module, or ``None`` if it is not installed."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compressible(content_type):
+    if not content_type or content_type == 'text/event-stream':
+        return False
+    return content_type.startswith('text/') or \
+        content_type in COMPRESSIBLE_TYPES
+
+
+class GzipEncoder(object):
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        # wbits 31 = header/trailer gzip (bukan zlib mentah)
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return c.compress(data) + c.flush()
+
+    def stream(self, chunks):
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield c.flush()
+
+
+class BrotliEncoder(object):
+    name = 'br'
+
+    def __init__(self, brotli, quality):
+        self.brotli  = brotli
+        self.quality = quality
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.quality)
+
+    def stream(self, chunks):
+        c = self.brotli.Compressor(quality=self.quality)
+        for chunk in chunks:
+            data = c.process(chunk) + c.flush()
+            if data:
+                yield data
+        yield c.finish()
+
+
+def _closing_iter(iterable, source):
+    try:
+        for data in iterable:
+            yield data
+    finally:
+        close = getattr(source, 'close', None)
+        if close is not None:
+            close()
+
+
+class CompressionTween(object):
+    """Tween compressing text responses for clients that accept it."""
+
+    def __init__(self, handler, registry):
+        settings = registry.settings
+        self.handler  = handler
+        self.min_size = int(settings.get('compression.min_size', 1024))
+        self.encoders = {
+            'gzip': GzipEncoder(int(settings.get('compression.gzip_level', 6)))
+        }
+        brotli = brotli_module()
+        if brotli is not None:
+            self.encoders['br'] = BrotliEncoder(
+                brotli, int(settings.get('compression.brotli_quality', 4)))
+        # urutan preferensi saat q sama
+        self.offers = [n for n in ('br', 'gzip') if n in self.encoders]
+
+    def negotiate(self, request):
+        """The encoder to use for ``request``, or ``None`` for identity."""
+        if 'Accept-Encoding' not in request.headers:
+            return None
+        offers = request.accept_encoding.acceptable_offers(self.offers)
+        return self.encoders[offers[0][0]] if offers else None
+
+    def __call__(self, request):
+        inm = request.headers.get('If-None-Match')
+        if inm and _ETAG_SUFFIX.search(inm):
+            request.headers['If-None-Match'] = _ETAG_SUFFIX.sub('"', inm)
+
+        response = self.handler(request)
+        if response.status_int == 304:
+            # klien memegang varian terkompresi: ETag-nya harus sama persis
+            encoder = self.negotiate(request)
+            if encoder is not None and response.etag and \
+                    inm and ('-%s"' % encoder.name) in inm:
+                response.etag = '%s-%s' % (response.etag, encoder.name)
+            return response
+        if not compressible(response.content_type):
+            return response
+        vary = tuple(response.vary or ())
+        if 'Accept-Encoding' not in vary:
+            response.vary = vary + ('Accept-Encoding',)
+        encoder = self.negotiate(request)
+        if encoder is None or response.content_encoding or \
+                response.status_int < 200 or response.status_int == 204 or \
+                request.method == 'HEAD':
+            return response
+
+        length = response.content_length
+        if length is None:
+            source = response.app_iter
+            response.app_iter = _closing_iter(encoder.stream(source), source)
+        elif length < self.min_size:
+            return response
+        else:
+            response.body = encoder.compress(response.body)
+        response.content_encoding = encoder.name
+        if response.etag:
+            response.etag = '%s-%s' % (response.etag, encoder.name)
+        return response
+
+
+def includeme(config):
+    settings = config.get_settings()
+    if settings.get('compression.enabled', 'true').lower() != 'true':
+        return
+    config.add_tween('pyramid_kampusku.compression.CompressionTween',
+                     under=('pyramid_kampusku.ratelimit.RateLimitTween',
+                            INGRESS),
+                     over=('pyramid_tm.tm_tween_factory', MAIN))
@@ -0,0 +1,102 @@
+# backend/pyramid_kampusku/counters.py
+"""Counter denormalisasi di tabel posts (comment_count, upvotes, downvotes)
+dan users (post_count, comment_count, upvotes_received).
+
+Semua perubahan memakai ``UPDATE ... SET n = n + :delta`` di transaksi
+yang sama dengan write-nya, jadi aman dari lost update tanpa lock baris
+di Python. :func:`reconcile` menghitung ulang semuanya secara bulk.
+"""
+
+from sqlalchemy import func, select
+
+from .models import DBSession, Comment, Post, User, Vote
+from .threads import subtree
+
+
+def _bump(model, id_, deltas):
+    values = {
+        getattr(model, name): getattr(model, name) + delta
+        for name, delta in deltas.items() if delta
+    }
+    if values:
+        DBSession.query(model).filter(model.id == id_) \
+                 .update(values, synchronize_session=False)
+
+
+def bump(post_id, **deltas):
+    """Atomically add ``deltas`` (e.g. ``comment_count=1``) to one post."""
+    _bump(Post, post_id, deltas)
+
+
+def bump_user(user_id, **deltas):
+    """Atomically add ``deltas`` (e.g. ``post_count=1``) to one user."""
+    _bump(User, user_id, deltas)
+
+
+def drop_comments(ids):
+    """Take the comments selected by ``ids`` (a SELECT of comment ids) off
+    their authors' ``comment_count``; call before deleting them. Returns
+    how many comments that is."""
+    rows = DBSession.query(Comment.user_id, func.count(Comment.id)) \
+                    .filter(Comment.id.in_(ids)) \
+                    .group_by(Comment.user_id).all()
+    for user_id, n in rows:
+        bump_user(user_id, comment_count=-n)
+    return sum(n for _, n in rows)
+
+
+def drop_subtree(comment_id):
+    """:func:`drop_comments` for ``comment_id`` and every reply below it;
+    returns the number of comments its deletion removes."""
+    return drop_comments(subtree(comment_id))
+
+
+def drop_post(post_id, user_id, upvotes):
+    """Take a post (by ``user_id``, with ``upvotes``) and all of its
+    comments off the user counters; call before deleting it."""
+    drop_comments(select(Comment.id).where(Comment.post_id == post_id))
+    bump_user(user_id, post_count=-1, upvotes_received=-upvotes)
+
+
+def set_vote(post_id, user_id, value):
+    """Record ``user_id``'s vote (+1, -1, or 0 to retract) on a post and
+    shift the post's tallies by the difference from the previous vote."""
+    vote = DBSession.query(Vote).get((user_id, post_id))
+    old  = vote.value if vote else 0
+    if value == old:
+        return
+    if vote is None:
+        DBSession.add(Vote(user_id=user_id, post_id=post_id, value=value))
+    elif value == 0:
+        DBSession.delete(vote)
+    else:
+        vote.value = value
+    up = (value == 1) - (old == 1)
+    bump(post_id, upvotes=up, downvotes=(value == -1) - (old == -1))
+    if up:
+        author = DBSession.query(Post.user_id).filter_by(id=post_id).scalar()
+        bump_user(author, upvotes_received=up)
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model) \
+                               .where(*criteria) \
+                               .scalar_subquery()
+
+
+def reconcile():
+    """Rebuild every post's and user's counters from the source tables in
+    two bulk UPDATEs. Returns ``(posts, users)`` touched."""
+    posts = DBSession.query(Post).update({
+        Post.comment_count: _count(Comment, Comment.post_id == Post.id),
+        Post.upvotes:   _count(Vote, Vote.post_id == Post.id, Vote.value == 1),
+        Post.downvotes: _count(Vote, Vote.post_id == Post.id, Vote.value == -1),
+    }, synchronize_session=False)
+    users = DBSession.query(User).update({
+        User.post_count:    _count(Post, Post.user_id == User.id),
+        User.comment_count: _count(Comment, Comment.user_id == User.id),
+        User.upvotes_received: select(func.coalesce(func.sum(Post.upvotes), 0))
+                               .where(Post.user_id == User.id)
+                               .scalar_subquery(),
+    }, synchronize_session=False)
+    return posts, users
@@ -0,0 +1,48 @@
+# backend/pyramid_kampusku/etag.py
+"""ETag / conditional GET untuk feed, thread komentar dan user.
+
+ETag dihitung dari versi data (``id`` + ``updated_at`` baris yang
+relevan), bukan dari body, jadi request yang dijawab 304 tidak perlu
+memuat komentar maupun men-serialisasi apa pun.
+
+``posts.updated_at`` berarti "terakhir kali post ini *atau* thread
+komentarnya berubah": edit post, tambah/hapus komentar dan vote semuanya
+menyentuhnya (lihat ``counters.bump``).
+"""
+
+import datetime
+import hashlib
+
+from pyramid.httpexceptions import HTTPNotModified
+from sqlalchemy import or_, select
+
+from .models import DBSession, Comment, Post
+
+
+def make_etag(*parts):
+    """Strong ETag value (without quotes) for the given version parts."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def not_modified(request, etag):
+    """Tag the response with ``etag``; return a 304 response if the
+    client's ``If-None-Match`` already has it, else ``None``."""
+    request.response.etag = etag
+    # selalu revalidasi, supaya browser mengirim If-None-Match
+    request.response.cache_control = 'no-cache'
+    if etag in request.if_none_match:
+        return HTTPNotModified(headers={
+            'ETag': request.response.headers['ETag'],
+            'Cache-Control': 'no-cache',
+        })
+    return None
+
+
+def touch_user_posts(user_id):
+    """Mark every post whose body shows ``user_id``'s username (own posts
+    and posts they commented on) as changed, e.g. after a rename."""
+    commented = select(Comment.post_id).where(Comment.user_id == user_id)
+    DBSession.query(Post) \
+             .filter(or_(Post.user_id == user_id, Post.id.in_(commented))) \
+             .update({Post.updated_at: datetime.datetime.utcnow()},
+                     synchronize_session=False)
@@ -0,0 +1,360 @@
+# backend/pyramid_kampusku/events.py
+"""Push perubahan feed ke browser lewat server-sent events (GET /api/events).
+
+View write mem-publish delta kecil setelah transaksinya commit (post dan
+komentar baru lewat outbox worker, lihat outbox.py)::
+
+    post.created     post baru (bentuk sama dengan respons create_post)
+    post.updated     {id, content}
+    post.deleted     {id}
+    comment.created  {id, post_id, parent_id, username, content, created_at}
+    comment.deleted  {id, post_id, removed}  (removed: komentar + balasannya)
+
+Setiap event punya id ``<epoch>-<n>``; browser mengirimnya kembali sebagai
+``Last-Event-ID`` saat reconnect dan hanya menerima event yang terlewat
+dari buffer. Kalau itu tidak mungkin (buffer sudah lewat, proses
+restart), stream diawali event ``reset`` dan client memuat ulang feed.
+
+Setiap koneksi SSE menahan satu thread waitress, jadi jumlahnya dibatasi
+(``events.max_clients``) dan tiap stream ditutup setelah ``max_age``
+detik; EventSource otomatis reconnect dan melanjutkan dari id terakhir.
+
+Konfigurasi (development.ini)::
+
+    events.backend     = memory    # memory | postgresql | paket.modul:Kelas
+    events.buffer_size = 1000      # event terakhir yang bisa di-resume
+    events.queue_size  = 100       # antrean per client sebelum diputus
+    events.heartbeat   = 15        # detik antar komentar keep-alive
+    events.max_age     = 300       # detik sebelum stream ditutup
+    events.max_clients = 4         # koneksi SSE bersamaan per proses
+    events.url         = postgresql://...   # hanya untuk backend postgresql
+"""
+
+import collections
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from pyramid.path import DottedNameResolver
+from pyramid.response import Response
+
+log = logging.getLogger(__name__)
+
+CHANNEL = 'kampusku_events'
+# batas payload NOTIFY PostgreSQL adalah 8000 byte
+MAX_NOTIFY_BYTES = 7900
+
+
+class Subscription(object):
+    """One connected client. ``reset`` is true when the events it missed
+    could not be replayed; ``lost`` when it fell behind and was dropped."""
+
+    def __init__(self, broker, size):
+        self.broker = broker
+        self.queue  = queue.Queue(size)
+        self.reset  = False
+        self.lost   = False
+
+    def get(self, timeout):
+        """Next ``(id, type, data)`` event, or ``None`` after ``timeout``."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker(object):
+    """Interface for event backends.
+
+    A backend is selected with ``events.backend = package.module:Class``;
+    ``from_settings`` receives the ``events.*`` settings with the prefix
+    stripped.
+    """
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls()
+
+    def publish(self, type_, data):
+        raise NotImplementedError
+
+    def subscribe(self, last_event_id=None):
+        """Return a :class:`Subscription`, pre-filled with the events after
+        ``last_event_id`` when resuming."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class MemoryBroker(BaseBroker):
+    """In-process pub/sub with a replay buffer of recent events.
+
+    Only clients connected to the same process see an event; use the
+    ``postgresql`` backend when running more than one process.
+    """
+
+    def __init__(self, buffer_size=1000, queue_size=100):
+        self.queue_size   = queue_size
+        self._epoch       = uuid.uuid4().hex[:8]
+        self._last        = 0
+        self._buffer      = collections.deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._lock        = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            buffer_size=int(settings.get('buffer_size', 1000)),
+            queue_size=int(settings.get('queue_size', 100)),
+        )
+
+    def publish(self, type_, data):
+        with self._lock:
+            self._last += 1
+            event = ('%s-%d' % (self._epoch, self._last), type_, data)
+            self._buffer.append((self._last, event))
+            for sub in list(self._subscribers):
+                try:
+                    sub.queue.put_nowait(event)
+                except queue.Full:
+                    # client terlalu lambat: putus, biar reconnect + resume
+                    sub.lost = True
+                    self._subscribers.discard(sub)
+
+    def _missed(self, last_event_id):
+        """Buffered events after ``last_event_id``, or ``None`` if they
+        cannot all be replayed."""
+        epoch, _, n = last_event_id.partition('-')
+        try:
+            n = int(n)
+        except ValueError:
+            return None
+        if epoch != self._epoch or n > self._last:
+            return None
+        oldest = self._buffer[0][0] if self._buffer else self._last + 1
+        if n + 1 < oldest:
+            return None
+        return [event for seq, event in self._buffer if seq > n]
+
+    def subscribe(self, last_event_id=None):
+        sub = Subscription(self, self.queue_size)
+        with self._lock:
+            if last_event_id:
+                missed = self._missed(last_event_id)
+                if missed is None or len(missed) > self.queue_size:
+                    sub.reset = True
+                else:
+                    for event in missed:
+                        sub.queue.put_nowait(event)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class PostgresBroker(MemoryBroker):
+    """Fan events out to every process through PostgreSQL LISTEN/NOTIFY.
+
+    ``publish`` sends a NOTIFY; a listener thread in each process
+    receives it and hands it to the local :class:`MemoryBroker`, which
+    numbers and buffers it. Resume therefore works against the process a
+    client reconnects to (use sticky sessions). Needs psycopg2.
+    """
+
+    def __init__(self, url, **kw):
+        super(PostgresBroker, self).__init__(**kw)
+        # URL SQLAlchemy (postgresql+psycopg2://) -> URI libpq
+        scheme, sep, rest = url.partition('://')
+        self.dsn       = scheme.split('+')[0] + sep + rest
+        self._conn     = None
+        self._send     = threading.Lock()
+        self._listener = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            settings['url'],
+            buffer_size=int(settings.get('buffer_size', 1000)),
+            queue_size=int(settings.get('queue_size', 100)),
+        )
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def publish(self, type_, data):
+        payload = json.dumps([type_, data])
+        if len(payload.encode()) > MAX_NOTIFY_BYTES:
+            # terlalu besar untuk NOTIFY: kirim id saja, client fetch ulang
+            payload = json.dumps([type_, {'id': data.get('id'),
+                                          'truncated': True}])
+        with self._send:
+            for attempt in (1, 2):
+                try:
+                    if self._conn is None:
+                        self._conn = self._connect()
+                    with self._conn.cursor() as cur:
+                        cur.execute('SELECT pg_notify(%s, %s)',
+                                    (CHANNEL, payload))
+                    return
+                except Exception:
+                    self._conn = None
+                    if attempt == 2:
+                        log.exception('NOTIFY failed, event dropped')
+
+    def subscribe(self, last_event_id=None):
+        self._start_listener()
+        return super(PostgresBroker, self).subscribe(last_event_id)
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name='kampusku-events', daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        import select
+        while True:
+            try:
+                conn = self._connect()
+                with conn.cursor() as cur:
+                    cur.execute('LISTEN %s' % CHANNEL)
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        type_, data = json.loads(conn.notifies.pop(0).payload)
+                        MemoryBroker.publish(self, type_, data)
+            except Exception:
+                log.exception('LISTEN connection lost, reconnecting')
+                time.sleep(1)
+
+
+BACKENDS = {
+    'memory':     MemoryBroker,
+    'postgresql': PostgresBroker,
+}
+
+
+def broker_from_settings(settings):
+    """Build the event backend configured by the ``events.*`` settings."""
+    options = {k[len('events.'):]: v for k, v in settings.items()
+               if k.startswith('events.')}
+    name = options.pop('backend', 'memory').strip()
+    cls  = BACKENDS.get(name) or DottedNameResolver().resolve(name)
+    return cls.from_settings(options)
+
+
+def publish(request, type_, data):
+    """Publish event ``type_`` once the request's transaction has
+    committed (nothing is sent on abort)."""
+    broker = request.registry.events
+
+    def publish_after_commit(success):
+        if success:
+            broker.publish(type_, data)
+
+    request.tm.get().addAfterCommitHook(publish_after_commit)
+
+
+def _format(event):
+    id_, type_, data = event
+    return ('id: %s\nevent: %s\ndata: %s\n\n'
+            % (id_, type_, json.dumps(data))).encode()
+
+
+class StreamLimit(object):
+    """Counts open SSE streams against ``events.max_clients``."""
+
+    def __init__(self, maximum):
+        self._slots = threading.BoundedSemaphore(maximum)
+
+    def acquire(self):
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+
+class EventStream(object):
+    """WSGI ``app_iter`` of one SSE connection.
+
+    ``close`` (called by the server when the stream ends or the client
+    goes away, even if iteration never started) frees the subscription
+    and the stream slot exactly once.
+    """
+
+    def __init__(self, sub, limit, heartbeat, max_age):
+        self.sub       = sub
+        self.limit     = limit
+        self.heartbeat = heartbeat
+        self.max_age   = max_age
+        self._closed   = False
+
+    def __iter__(self):
+        # retry: jeda reconnect EventSource (ms)
+        yield b'retry: 3000\n\n'
+        if self.sub.reset:
+            yield b'event: reset\ndata: {}\n\n'
+        deadline = time.monotonic() + self.max_age
+        while not self.sub.lost:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            event = self.sub.get(timeout=min(self.heartbeat, left))
+            yield _format(event) if event else b': keep-alive\n\n'
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.sub.close()
+            self.limit.release()
+
+
+def events_view(request):
+    """GET /api/events — the SSE stream (see module docstring)."""
+    settings  = request.registry.settings
+    heartbeat = float(settings.get('events.heartbeat', 15))
+    max_age   = float(settings.get('events.max_age', 300))
+    limit     = request.registry.events_limit
+
+    if not limit.acquire():
+        request.response.status = 503
+        request.response.headers['Retry-After'] = str(int(heartbeat))
+        return {'error': 'Too many event streams, please retry shortly'}
+
+    last_id = request.headers.get('Last-Event-ID') \
+        or request.params.get('last_event_id')
+    sub = request.registry.events.subscribe(last_id)
+
+    resp = Response(app_iter=EventStream(sub, limit, heartbeat, max_age),
+                    content_type='text/event-stream', charset='utf-8')
+    resp.cache_control = 'no-cache'
+    # jangan di-buffer reverse proxy (nginx)
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+def includeme(config):
+    settings = config.get_settings()
+    config.registry.events = broker_from_settings(settings)
+    config.registry.events_limit = StreamLimit(
+        int(settings.get('events.max_clients', 4))
+    )
+    config.add_route('events', '/api/events')
+    config.add_view(events_view, route_name='events', renderer='json',
+                    request_method='GET')
@@ -0,0 +1,144 @@
+# backend/pyramid_kampusku/hashing.py
+"""Hash/cek password bcrypt di luar thread request waitress.
+
+bcrypt sengaja mahal; kalau dijalankan langsung di thread request, lonjakan
+login pagi hari membuat semua thread waitress sibuk di ``login`` dan GET
+yang murah ikut antre. Di sini pekerjaannya dikirim ke process pool
+berukuran tetap dengan batas antrean; kalau penuh, view menjawab 503 +
+``Retry-After`` alih-alih ikut menumpuk.
+
+Konfigurasi (development.ini)::
+
+    bcrypt.rounds      = 12   # cost factor untuk hash baru
+    bcrypt.workers     = 2    # 0 = hash langsung di thread request
+    bcrypt.max_pending = 16   # job yang boleh antre di atas jumlah worker
+    bcrypt.timeout     = 10   # detik menunggu hasil sebelum dianggap sibuk
+    bcrypt.retry_after = 2    # nilai header Retry-After saat 503
+"""
+
+import concurrent.futures
+import multiprocessing
+import threading
+
+DEFAULT_ROUNDS = 12
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool's queue is full (answer with 503)."""
+
+
+def _hash(plaintext, rounds):
+    import bcrypt
+    return bcrypt.hashpw(plaintext.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _check(plaintext, hashed):
+    import bcrypt
+    return bcrypt.checkpw(plaintext.encode(), hashed.encode())
+
+
+def hash_rounds(hashed):
+    """Cost factor stored in a ``$2b$<rounds>$...`` hash."""
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class InlineHasher(object):
+    """Hashes on the calling thread (``bcrypt.workers = 0``)."""
+
+    retry_after = 0
+
+    def __init__(self, rounds=DEFAULT_ROUNDS):
+        self.rounds = rounds
+
+    def hash(self, plaintext):
+        return _hash(plaintext, self.rounds)
+
+    def check(self, plaintext, hashed):
+        return _check(plaintext, hashed)
+
+    def needs_rehash(self, hashed):
+        """True if ``hashed`` was made with a different cost factor."""
+        return hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        pass
+
+
+class PoolHasher(InlineHasher):
+    """Hashes in a size-bounded process pool.
+
+    Processes (not threads) keep the work off the GIL of the waitress
+    process. At most ``workers + max_pending`` jobs are in flight; beyond
+    that :class:`HasherBusy` is raised immediately. The pool is started
+    lazily on first use, so it is created after any pre-fork.
+    """
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=2, max_pending=16,
+                 timeout=10, retry_after=2):
+        super(PoolHasher, self).__init__(rounds)
+        self.workers     = workers
+        self.timeout     = timeout
+        self.retry_after = retry_after
+        self._slots      = threading.BoundedSemaphore(workers + max_pending)
+        self._lock       = threading.Lock()
+        self._pool       = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            raise HasherBusy()
+
+    def hash(self, plaintext):
+        return self._run(_hash, plaintext, self.rounds)
+
+    def check(self, plaintext, hashed):
+        return self._run(_check, plaintext, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+def hasher_from_settings(settings):
+    """Build the hasher configured by the ``bcrypt.*`` settings."""
+    rounds  = int(settings.get('bcrypt.rounds', DEFAULT_ROUNDS))
+    workers = int(settings.get('bcrypt.workers', 0))
+    if workers <= 0:
+        return InlineHasher(rounds)
+    return PoolHasher(
+        rounds=rounds,
+        workers=workers,
+        max_pending=int(settings.get('bcrypt.max_pending', 16)),
+        timeout=float(settings.get('bcrypt.timeout', 10)),
+        retry_after=int(settings.get('bcrypt.retry_after', 2)),
+    )
+
+
+def includeme(config):
+    config.registry.hasher = hasher_from_settings(config.get_settings())
+    config.add_request_method(
+        lambda request: request.registry.hasher, 'hasher', reify=True
+    )
@@ -0,0 +1,324 @@
+# backend/pyramid_kampusku/metrics.py
+"""Metrik per route dalam format Prometheus (GET /metrics) + log request lambat.
+
+Tween ``MetricsTween`` mengukur setiap request dan mencatat per nama route:
+
+    kampusku_request_duration_seconds      histogram latensi (termasuk commit)
+    kampusku_requests_total                jumlah request per status
+    kampusku_db_statements_total           statement SQL
+    kampusku_db_duration_seconds_total     waktu di database
+    kampusku_serialize_duration_seconds_total  waktu renderer JSON
+    kampusku_response_bytes                ukuran body (summary _sum/_count)
+
+SQL diukur lewat event ``before/after_cursor_execute`` di engine primary
+dan replica (dan engine async, lihat asgi.py); statement dikaitkan ke
+request yang sedang berjalan di thread yang sama, atau di task yang sama
+untuk request async. Respons streaming (``?stream=1``, SSE) membaca
+database setelah tween selesai, jadi hanya bagian di view yang terhitung.
+
+Request yang lebih lama dari ``slow_request_ms`` di-log (WARNING) bersama
+fingerprint query termahalnya: statement dengan angka, string, dan daftar
+``IN (...)`` dinormalisasi supaya statement yang sama terkumpul jadi satu.
+
+Biaya per request: dua ``perf_counter`` per statement plus satu update
+dict di bawah lock saat request selesai, jadi aman dinyalakan di
+production (menggantikan panel timing pyramid_debugtoolbar).
+
+Konfigurasi (development.ini)::
+
+    metrics.enabled         = true
+    metrics.endpoint        = false   # true: daftarkan GET /metrics
+    metrics.slow_request_ms = 500     # 0 = tanpa log request lambat
+
+GET /metrics tanpa autentikasi dan membuka nama route, latensi dan angka
+internal lain, jadi hanya didaftarkan bila ``metrics.endpoint = true``;
+nyalakan hanya bila route itu tidak terjangkau dari luar (mis. diblok
+proxy, hanya untuk scraper di jaringan internal).
+"""
+
+import collections
+import contextvars
+import logging
+import re
+import threading
+import time
+
+from pyramid.response import Response
+from pyramid.tweens import INGRESS
+from sqlalchemy import event
+
+from .models import DBSession, RoutingSession
+
+log = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# seperti threading.local, tapi juga terpisah per task asyncio (asgi.py)
+_current = contextvars.ContextVar('kampusku_request_stats', default=None)
+
+
+class RequestStats(object):
+    """What one request spent, filled in while it runs."""
+
+    __slots__ = ('statements', 'db_time', 'serialize_time', 'queries',
+                 'started')
+
+    def __init__(self):
+        self.statements     = 0
+        self.db_time        = 0.0
+        self.serialize_time = 0.0
+        # statement -> [count, seconds]; di-fingerprint hanya saat lambat
+        self.queries        = {}
+        self.started        = 0.0
+
+
+class RouteMetrics(object):
+    __slots__ = ('buckets', 'count', 'duration', 'statuses', 'statements',
+                 'db_time', 'serialize_time', 'bytes', 'sized')
+
+    def __init__(self):
+        self.buckets        = [0] * len(BUCKETS)
+        self.count          = 0
+        self.duration       = 0.0
+        self.statuses       = collections.Counter()
+        self.statements     = 0
+        self.db_time        = 0.0
+        self.serialize_time = 0.0
+        self.bytes          = 0
+        self.sized          = 0
+
+
+class Metrics(object):
+    """Per-route aggregates since process start."""
+
+    def __init__(self):
+        self.routes = collections.defaultdict(RouteMetrics)
+        self._lock  = threading.Lock()
+
+    def observe(self, route, status, elapsed, stats, size):
+        with self._lock:
+            m = self.routes[route]
+            m.count    += 1
+            m.duration += elapsed
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    m.buckets[i] += 1
+                    break
+            m.statuses[status] += 1
+            m.statements     += stats.statements
+            m.db_time        += stats.db_time
+            m.serialize_time += stats.serialize_time
+            if size is not None:
+                m.bytes += size
+                m.sized += 1
+
+    def snapshot(self):
+        """``[(route, RouteMetrics copy), ...]`` sorted by route."""
+        copies = []
+        with self._lock:
+            for route, m in sorted(self.routes.items()):
+                c = RouteMetrics()
+                for name in RouteMetrics.__slots__:
+                    setattr(c, name, getattr(m, name))
+                c.buckets  = list(m.buckets)
+                c.statuses = collections.Counter(m.statuses)
+                copies.append((route, c))
+        return copies
+
+
+_FINGERPRINT = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'(%\(\w+\)s|:\w+|\$\d+|%s)'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?, ...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def fingerprint(statement):
+    """``statement`` with literals and parameter lists collapsed."""
+    for pattern, repl in _FINGERPRINT:
+        statement = pattern.sub(repl, statement)
+    return statement.strip()
+
+
+def _before_execute(conn, cursor, statement, params, context, many):
+    stats = _current.get()
+    if stats is not None:
+        stats.started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, params, context, many):
+    stats = _current.get()
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - stats.started
+    stats.statements += 1
+    stats.db_time    += elapsed
+    entry = stats.queries.get(statement)
+    if entry is None:
+        stats.queries[statement] = [1, elapsed]
+    else:
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+def instrument(engine):
+    """Attach the SQL timing hooks to ``engine`` (once)."""
+    if not event.contains(engine, 'before_cursor_execute', _before_execute):
+        event.listen(engine, 'before_cursor_execute', _before_execute)
+        event.listen(engine, 'after_cursor_execute', _after_execute)
+
+
+def timed_renderer(factory):
+    """Wrap renderer ``factory`` so its render time counts as serialization
+    (applied to the ``json`` renderer by renderers.py)."""
+    def renderer_factory(info):
+        render = factory(info)
+
+        def _render(value, system):
+            started = time.perf_counter()
+            try:
+                return render(value, system)
+            finally:
+                stats = _current.get()
+                if stats is not None:
+                    stats.serialize_time += time.perf_counter() - started
+        return _render
+    return renderer_factory
+
+
+class MetricsTween(object):
+    """Tween timing each request and recording it in ``registry.metrics``."""
+
+    def __init__(self, handler, registry):
+        self.handler = handler
+        self.metrics = registry.metrics
+        self.slow    = float(registry.settings.get(
+            'metrics.slow_request_ms', 500)) / 1000.0
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status  = 500
+        response = None
+        try:
+            response = self.handler(request)
+            status = response.status_int
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            matched = getattr(request, 'matched_route', None)
+            route = matched.name if matched is not None else 'none'
+            size = response.content_length if response is not None else None
+            self.metrics.observe(route, status, elapsed, stats, size)
+            if self.slow and elapsed >= self.slow:
+                self.log_slow(request, route, status, elapsed, stats)
+
+    def log_slow(self, request, route, status, elapsed, stats):
+        grouped = collections.defaultdict(lambda: [0, 0.0])
+        for statement, (count, seconds) in stats.queries.items():
+            entry = grouped[fingerprint(statement)]
+            entry[0] += count
+            entry[1] += seconds
+        top = sorted(grouped.items(), key=lambda kv: -kv[1][1])[:3]
+        log.warning(
+            'slow request %s %s (route %s) %d: %.0f ms, %d statements, '
+            '%.0f ms db, %.0f ms serialize%s',
+            request.method, request.path, route, status, elapsed * 1000,
+            stats.statements, stats.db_time * 1000,
+            stats.serialize_time * 1000,
+            ''.join('\n  %dx %.0f ms  %s' % (n, s * 1000, fp[:300])
+                    for fp, (n, s) in top)
+        )
+
+
+def _line(out, name, labels, value):
+    label = ','.join('%s="%s"' % (k, str(v).replace('"', '\\"'))
+                     for k, v in labels)
+    out.append('%s{%s} %r' % (name, label, value))
+
+
+def metrics_view(request):
+    """GET /metrics — Prometheus text exposition of this process's metrics
+    plus the rate limiter and cache counters."""
+    out = []
+    snapshot = request.registry.metrics.snapshot()
+
+    out += ['# HELP kampusku_request_duration_seconds Request latency.',
+            '# TYPE kampusku_request_duration_seconds histogram']
+    for route, m in snapshot:
+        cumulative = 0
+        for bound, n in zip(BUCKETS, m.buckets):
+            cumulative += n
+            _line(out, 'kampusku_request_duration_seconds_bucket',
+                  [('route', route), ('le', repr(bound))], cumulative)
+        _line(out, 'kampusku_request_duration_seconds_bucket',
+              [('route', route), ('le', '+Inf')], m.count)
+        _line(out, 'kampusku_request_duration_seconds_sum',
+              [('route', route)], m.duration)
+        _line(out, 'kampusku_request_duration_seconds_count',
+              [('route', route)], m.count)
+
+    out += ['# HELP kampusku_requests_total Requests by route and status.',
+            '# TYPE kampusku_requests_total counter']
+    for route, m in snapshot:
+        for status, n in sorted(m.statuses.items()):
+            _line(out, 'kampusku_requests_total',
+                  [('route', route), ('status', status)], n)
+
+    for attr, name, help_ in (
+            ('statements', 'kampusku_db_statements_total',
+             'SQL statements executed.'),
+            ('db_time', 'kampusku_db_duration_seconds_total',
+             'Time spent executing SQL.'),
+            ('serialize_time', 'kampusku_serialize_duration_seconds_total',
+             'Time spent in the JSON renderer.')):
+        out += ['# HELP %s %s' % (name, help_), '# TYPE %s counter' % name]
+        for route, m in snapshot:
+            _line(out, name, [('route', route)], getattr(m, attr))
+
+    out += ['# HELP kampusku_response_bytes Response body size.',
+            '# TYPE kampusku_response_bytes summary']
+    for route, m in snapshot:
+        _line(out, 'kampusku_response_bytes_sum', [('route', route)], m.bytes)
+        _line(out, 'kampusku_response_bytes_count', [('route', route)],
+              m.sized)
+
+    limiter = getattr(request.registry, 'ratelimit', None)
+    if limiter is not None:
+        out += ['# HELP kampusku_ratelimit_rejected_total Requests refused '
+                'with 429 (per budget) or 503 (concurrency).',
+                '# TYPE kampusku_ratelimit_rejected_total counter']
+        for budget, n in sorted(limiter.rejected().items()):
+            _line(out, 'kampusku_ratelimit_rejected_total',
+                  [('budget', budget)], n)
+
+    cache = request.registry.cache.stats()
+    for key in ('hits', 'misses', 'evictions'):
+        name = 'kampusku_cache_%s_total' % key
+        out += ['# TYPE %s counter' % name]
+        _line(out, name, [('backend', cache['backend'])], cache[key])
+
+    resp = Response('\n'.join(out) + '\n')
+    # format teks versi 0.0.4 untuk scraper Prometheus
+    resp.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return resp
+
+
+def includeme(config):
+    settings = config.get_settings()
+    if settings.get('metrics.enabled', 'true').lower() != 'true':
+        return
+    config.registry.metrics = Metrics()
+    for engine in (DBSession.bind, RoutingSession.replica):
+        if engine is not None:
+            instrument(engine)
+    config.add_tween('pyramid_kampusku.metrics.MetricsTween', under=INGRESS,
+                     over='pyramid_kampusku.ratelimit.RateLimitTween')
+    if settings.get('metrics.endpoint', 'false').lower() == 'true':
+        config.add_route('metrics', '/metrics')
+        config.add_view(metrics_view, route_name='metrics',
+                        request_method='GET')
@@ -1,20 +1,90 @@
 # src/pyramid_kampusku/models.py
 
 from sqlalchemy import (
-    Column, Integer, Text, DateTime, String, ForeignKey
+    Boolean, Column, Float, Integer, SmallInteger, Text, DateTime, String,
+    ForeignKey, Index, engine_from_config, text
 )
 from sqlalchemy.orm import (
     relationship,
     scoped_session,
     sessionmaker,
-    declarative_base
+    declarative_base,
+    Session
 )
-import bcrypt
+from zope.sqlalchemy import register
+import contextvars
 import datetime
+import os
+import threading
 
-DBSession = scoped_session(sessionmaker())
+from .hashing import InlineHasher
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica engine when one is configured.
+
+    A request opts in with ``DBSession.info['use_replica'] = True`` (done
+    for GET/HEAD in ``main``); anything flushed still goes to the primary.
+    """
+
+    replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.replica is not None and self.info.get('use_replica') \
+                and not self._flushing:
+            return self.replica
+        return super(RoutingSession, self).get_bind(mapper, clause=clause, **kw)
+
+
+# scope DBSession: satu session per thread, kecuali request di jalur async
+# (asgi.py) yang berbagi thread event loop: masing-masing memasang scope
+# sendiri di sini selama request berjalan
+session_scope = contextvars.ContextVar('kampusku_session_scope', default=None)
+
+
+def _current_scope():
+    scope = session_scope.get()
+    return threading.get_ident() if scope is None else scope
+
+
+DBSession = scoped_session(sessionmaker(class_=RoutingSession),
+                           scopefunc=_current_scope)
+# commit/rollback diurus pyramid_tm lewat transaction manager
+register(DBSession)
 Base = declarative_base()
 
+
+def get_engine(settings, prefix='sqlalchemy.'):
+    """``engine_from_config`` plus ``<prefix>statement_timeout`` (ms).
+
+    Pool options (``pool_size``, ``max_overflow``, ``pool_timeout``,
+    ``pool_recycle``, ``pool_pre_ping``) are read by SQLAlchemy directly.
+    """
+    settings = dict(settings)
+    timeout  = settings.pop(prefix + 'statement_timeout', None)
+    kw = {}
+    if timeout and settings[prefix + 'url'].startswith('postgresql'):
+        kw['connect_args'] = {'options': '-c statement_timeout=%d' % int(timeout)}
+    return engine_from_config(settings, prefix, **kw)
+
+
+def dispose_engines():
+    """Drop the connection pools (and sessions) inherited over ``fork``.
+
+    The connections stay open for the parent: ``dispose(close=False)``
+    only makes this process open its own on first use.
+    """
+    DBSession.registry.clear()
+    for engine in (DBSession.session_factory.kw.get('bind'),
+                   RoutingSession.replica):
+        if engine is not None:
+            engine.dispose(close=False)
+
+
+# setiap proses hasil fork (kampusku_serve, gunicorn --preload,
+# multiprocessing) mulai dengan pool kosong
+os.register_at_fork(after_in_child=dispose_engines)
+
 class User(Base):
     __tablename__ = 'users'
     id       = Column(Integer, primary_key=True)
@@ -22,37 +92,78 @@ class User(Base):
     email    = Column(String(120), unique=True, nullable=False)
     _pw      = Column("password", String(60), nullable=False)
 
+    # statistik profil, dijaga bersama write-nya (lihat counters.py)
+    post_count       = Column(Integer, nullable=False, default=0, server_default='0')
+    comment_count    = Column(Integer, nullable=False, default=0, server_default='0')
+    upvotes_received = Column(Integer, nullable=False, default=0, server_default='0')
+
     posts    = relationship("Post", back_populates="author")
     comments = relationship("Comment", back_populates="author")
 
-    def set_password(self, plaintext):
-        self._pw = bcrypt.hashpw(plaintext.encode(), bcrypt.gensalt()).decode()
+    # hasher: lihat hashing.py (request.hasher); default hash di thread ini
+    def set_password(self, plaintext, hasher=None):
+        self._pw = (hasher or InlineHasher()).hash(plaintext)
+
+    def check_password(self, plaintext, hasher=None):
+        return (hasher or InlineHasher()).check(plaintext, self._pw)
 
-    def check_password(self, plaintext):
-        return bcrypt.checkpw(plaintext.encode(), self._pw.encode())
+    def password_needs_rehash(self, hasher):
+        return hasher.needs_rehash(self._pw)
 
 class Post(Base):
     __tablename__ = 'posts'
     id         = Column(Integer, primary_key=True)
     content    = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # berubah setiap kali post ATAU thread komentarnya berubah (dipakai ETag)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow)
     user_id    = Column(Integer, ForeignKey('users.id'), nullable=False)
 
+    # counter denormalisasi, dijaga di transaksi yang sama dengan write-nya
+    # (lihat counters.py); dibangun ulang dengan kampusku_reconcile_counters
+    comment_count = Column(Integer, nullable=False, default=0, server_default='0')
+    upvotes       = Column(Integer, nullable=False, default=0, server_default='0')
+    downvotes     = Column(Integer, nullable=False, default=0, server_default='0')
+
     author     = relationship("User", back_populates="posts")
     comments   = relationship(
         "Comment",
         back_populates="post",
         cascade="all, delete-orphan"
     )
+    votes      = relationship(
+        "Vote",
+        back_populates="post",
+        cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # keyset pagination feed: ORDER BY created_at DESC, id DESC
+        Index('ix_posts_created_at_id', 'created_at', 'id'),
+        # timeline profil: WHERE user_id = ? ORDER BY created_at, id
+        Index('ix_posts_user_id_created_at', 'user_id', 'created_at', 'id'),
+        # id tidak boleh dipakai ulang (SQLite): kunci job outbox memakainya
+        {'sqlite_autoincrement': True},
+    )
+
+# id leluhur sebagai segmen hex (threads.py): dibandingkan bytewise
+COMMENT_PATH = String(1800).with_variant(String(1800, collation='C'),
+                                         'postgresql')
 
 class Comment(Base):
     __tablename__ = 'comments'
     id         = Column(Integer, primary_key=True)
     content    = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow)
     user_id    = Column(Integer, ForeignKey('users.id'), nullable=False)
     post_id    = Column(Integer, ForeignKey('posts.id'), nullable=False)
     parent_id  = Column(Integer, ForeignKey('comments.id'), nullable=True)
+    # posisi di pohon balasan, diisi saat INSERT (lihat threads.py)
+    depth      = Column(Integer, nullable=False, default=0, server_default='0')
+    path       = Column(COMMENT_PATH, nullable=False, default='', server_default='')
 
     # relasi ke user & post
     author     = relationship("User", back_populates="comments")
@@ -70,3 +181,114 @@ class Comment(Base):
         back_populates="parent",
         cascade="all, delete-orphan"
     )
+
+    __table_args__ = (
+        # semua komentar beberapa post sekaligus (feed), urut created_at
+        Index('ix_comments_post_id_created_at', 'post_id', 'created_at', 'id'),
+        # halaman thread top-level: WHERE post_id = ? AND parent_id IS NULL
+        Index('ix_comments_top_level', 'post_id', 'created_at', 'id',
+              postgresql_where=text('parent_id IS NULL'),
+              sqlite_where=text('parent_id IS NULL')),
+        # anak langsung sebuah komentar (halaman balasan). Parsial: tanpa
+        # itu SQLite memakainya untuk parent_id IS NULL (semua komentar
+        # top-level di tabel) alih-alih ix_comments_top_level
+        Index('ix_comments_parent_id_created_at', 'parent_id', 'created_at',
+              postgresql_where=text('parent_id IS NOT NULL'),
+              sqlite_where=text('parent_id IS NOT NULL')),
+        # komentar satu user di profil, terbaru dulu
+        Index('ix_comments_user_id_created_at', 'user_id', 'created_at', 'id'),
+        # satu subtree = satu range path (threads.subtrees)
+        Index('ix_comments_path', 'path'),
+        {'sqlite_autoincrement': True},
+    )
+
+class Vote(Base):
+    __tablename__ = 'votes'
+    user_id    = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    post_id    = Column(Integer, ForeignKey('posts.id'), primary_key=True)
+    # +1 = upvote, -1 = downvote
+    value      = Column(SmallInteger, nullable=False)
+
+    __table_args__ = (
+        # PK (user_id, post_id) tidak membantu lookup per post
+        Index('ix_votes_post_id', 'post_id'),
+    )
+
+    post       = relationship("Post", back_populates="votes")
+
+class Change(Base):
+    """One row per write to a post or comment, for incremental sync
+    (GET /api/posts/changes). ``seq`` only grows; a deletion leaves a
+    tombstone row (``deleted``) after the source row is gone."""
+    __tablename__ = 'changes'
+    seq        = Column(Integer, primary_key=True)
+    kind       = Column(String(10), nullable=False)   # 'post' | 'comment'
+    ref_id     = Column(Integer, nullable=False)
+    post_id    = Column(Integer, nullable=False)
+    deleted    = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    # seq tidak boleh dipakai ulang walau baris terbaru terhapus (SQLite)
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class OutboxJob(Base):
+    """Side effect of a write, queued in the write's own transaction and
+    carried out later by the outbox worker (see outbox.py). ``key`` is
+    the idempotency key: one job per logical event, ever."""
+    __tablename__ = 'outbox'
+    id           = Column(Integer, primary_key=True)
+    key          = Column(String(100), unique=True, nullable=False)
+    kind         = Column(String(50), nullable=False)
+    payload      = Column(Text, nullable=False)                 # JSON
+    attempts     = Column(Integer, nullable=False, default=0, server_default='0')
+    available_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    done_at      = Column(DateTime, nullable=True)
+    last_error   = Column(Text, nullable=True)
+    created_at   = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        # antrean worker: hanya job yang belum selesai, urut id
+        Index('ix_outbox_pending', 'id',
+              postgresql_where=text('done_at IS NULL'),
+              sqlite_where=text('done_at IS NULL')),
+    )
+
+class Notification(Base):
+    """Something for ``user_id`` to see, e.g. a reply to their comment.
+    ``post_id``/``comment_id`` are plain ids (no FK) so deleting the
+    comment does not have to touch notifications."""
+    __tablename__ = 'notifications'
+    id         = Column(Integer, primary_key=True)
+    user_id    = Column(Integer, ForeignKey('users.id'), nullable=False)
+    kind       = Column(String(20), nullable=False)   # 'reply' | 'welcome'
+    actor_id   = Column(Integer, ForeignKey('users.id'), nullable=True)
+    post_id    = Column(Integer, nullable=True)
+    comment_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        # GET /api/notifications: milik satu user, terbaru dulu
+        Index('ix_notifications_user_id_created_at', 'user_id', 'created_at', 'id'),
+    )
+
+class PostRank(Base):
+    """Precomputed "hot" score of a post (see ranking.py), kept up to date
+    from the change log. ``post_id`` is a plain id (no FK): a deleted
+    post's row is dropped by the next refresh, and the feed joins
+    ``posts`` so it never shows it."""
+    __tablename__ = 'post_ranks'
+    post_id    = Column(Integer, primary_key=True, autoincrement=False)
+    score      = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        # GET /api/posts?sort=hot: ORDER BY score DESC, post_id DESC
+        Index('ix_post_ranks_score_post_id', 'score', 'post_id'),
+    )
+
+class RankState(Base):
+    """How far into the change log a ranking has been refreshed."""
+    __tablename__ = 'rank_state'
+    name         = Column(String(20), primary_key=True)   # 'hot'
+    last_seq     = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
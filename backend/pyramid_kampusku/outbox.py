@@ -0,0 +1,408 @@
+# backend/pyramid_kampusku/outbox.py
+"""Transactional outbox: efek samping write dikerjakan worker, bukan view.
+
+View write (``create_post``, ``add_comment``, ``register`` dan endpoint
+batch-nya) hanya menyisipkan barisnya sendiri plus satu baris ``outbox``
+per baris di transaksi yang sama (:func:`enqueue`, :func:`enqueue_many`). Kalau transaksi di-abort, job-nya ikut hilang;
+kalau commit, job pasti ada. Worker lalu mengambil job per batch dan
+mengerjakan efek sampingnya:
+
+    post.created     index search, users.post_count, change log, event SSE
+    comment.created  index search, counter post/user, change log,
+                     notifikasi balasan, invalidasi cache, event SSE
+    user.registered  notifikasi selamat datang
+
+Satu batch = satu transaksi: job ditandai selesai (``done_at``) di
+transaksi yang sama dengan write efek sampingnya, jadi efek di database
+terjadi tepat sekali walau beberapa worker berjalan bersamaan (klaim
+``UPDATE ... WHERE done_at IS NULL``; di PostgreSQL baris yang sedang
+dikerjakan worker lain dilewati dengan ``SKIP LOCKED``). Efek di luar
+database (event SSE, bump cache) dijalankan setelah commit, urut id job.
+Kalau batch gagal, job-nya diulang satu per satu supaya job yang rusak
+tidak menahan yang lain; job yang gagal dicoba lagi dengan jeda
+``retry_delay * 2**(attempts - 1)`` detik sampai ``max_attempts`` kali,
+lalu dibiarkan (``last_error``) sampai di-reset dengan
+``kampusku_outbox_worker --retry-failed``.
+
+``key`` tiap job (mis. ``comment.created:42``) unik, jadi event yang sama
+tidak pernah diantre dua kali. Handler membaca keadaan baris *saat ini*:
+post/komentar yang sudah dihapus sebelum job-nya jalan tidak di-index
+dan tidak di-push, tetapi counter-nya tetap diseimbangkan (penghapusan
+sudah mengurangi counter untuk baris itu).
+
+Worker:
+
+    thread  satu thread di setiap proses web, dibangunkan setiap commit
+    none    tidak ada di proses web; jalankan ``kampusku_outbox_worker``
+            (bisa beberapa proses). Event SSE lalu perlu
+            ``events.backend = postgresql`` dan cache bersama, karena
+            worker tidak berbagi memori dengan proses web.
+
+Sampai worker selesai, counter, hasil search dan change log tertinggal
+sebentar dari write-nya (biasanya beberapa milidetik dalam mode thread).
+
+Konfigurasi (development.ini)::
+
+    outbox.worker        = thread   # thread | none
+    outbox.batch_size    = 100
+    outbox.poll_interval = 1        # detik antar cek antrean saat sepi
+    outbox.max_attempts  = 5
+    outbox.retry_delay   = 5        # detik sebelum percobaan kedua
+"""
+
+import datetime
+import json
+import logging
+import threading
+
+import transaction
+from pyramid.events import NewRequest
+from sqlalchemy import insert, update
+
+from .cache import post_ns
+from .changes import COMMENT, POST, record_many
+from .counters import bump, bump_user
+from .models import DBSession, Comment, Notification, OutboxJob, Post
+from .search import index_comments, index_posts
+
+log = logging.getLogger(__name__)
+
+POST_CREATED    = 'post.created'
+COMMENT_CREATED = 'comment.created'
+USER_REGISTERED = 'user.registered'
+
+
+def enqueue(request, kind, ref_id, payload):
+    """Queue job ``kind`` for ``ref_id`` in the request's transaction and
+    wake the worker once it commits."""
+    DBSession.add(OutboxJob(key='%s:%d' % (kind, ref_id), kind=kind,
+                            payload=json.dumps(payload)))
+    _wake_after_commit(request)
+
+
+def enqueue_many(request, kind, jobs):
+    """:func:`enqueue` for every ``(ref_id, payload)`` in ``jobs``, with one
+    multi-row INSERT (batch endpoints)."""
+    if not jobs:
+        return
+    DBSession.execute(insert(OutboxJob), [
+        {'key': '%s:%d' % (kind, ref_id), 'kind': kind,
+         'payload': json.dumps(payload)}
+        for ref_id, payload in jobs
+    ])
+    _wake_after_commit(request)
+
+
+def _wake_after_commit(request):
+    worker = request.registry.outbox
+
+    def wake_after_commit(success):
+        if success:
+            worker.wake()
+
+    request.tm.get().addAfterCommitHook(wake_after_commit)
+
+
+def _per(values):
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return counts
+
+
+def post_created(worker, jobs, effects):
+    """``post.created`` for a batch of ``(job_id, payload)``."""
+    ids  = [p['id'] for _, p in jobs]
+    live = dict(DBSession.query(Post.id, Post.content)
+                         .filter(Post.id.in_(ids)).with_for_update())
+    index_posts([(i, live[i]) for i in ids if i in live])
+    for user_id, n in _per(p['user_id'] for _, p in jobs).items():
+        bump_user(user_id, post_count=n)
+    record_many([(POST, i, i) for i in ids if i in live])
+    for job_id, p in jobs:
+        if p['id'] in live:
+            effects.append((job_id, worker.publisher('post.created',
+                                                     p['event'])))
+
+
+def comment_created(worker, jobs, effects):
+    """``comment.created`` for a batch of ``(job_id, payload)``."""
+    ids  = [p['id'] for _, p in jobs]
+    rows = DBSession.query(Comment.id, Comment.post_id, Comment.parent_id,
+                           Comment.user_id, Comment.content) \
+                    .filter(Comment.id.in_(ids)).with_for_update().all()
+    live = {r.id: r for r in rows}
+    index_comments([(r.id, r.content) for r in rows])
+    for post_id, n in _per(p['post_id'] for _, p in jobs).items():
+        bump(post_id, comment_count=n)
+    for user_id, n in _per(p['user_id'] for _, p in jobs).items():
+        bump_user(user_id, comment_count=n)
+    touched = sorted({r.post_id for r in rows})
+    record_many([(COMMENT, r.id, r.post_id) for r in rows] +
+                [(POST, post_id, post_id) for post_id in touched])
+    notify_replies(rows)
+    for job_id, p in jobs:
+        if p['id'] in live:
+            effects.append((job_id, worker.invalidator(post_ns(p['post_id']))))
+            effects.append((job_id, worker.publisher('comment.created',
+                                                     p['event'])))
+
+
+def notify_replies(rows):
+    """One ``reply`` notification per comment in ``rows``, to the author
+    of the parent comment (or of the post, for a top-level comment),
+    unless they replied to themselves."""
+    parent_ids = {r.parent_id for r in rows if r.parent_id}
+    post_ids   = {r.post_id for r in rows if not r.parent_id}
+    parents = dict(DBSession.query(Comment.id, Comment.user_id)
+                            .filter(Comment.id.in_(parent_ids))) \
+        if parent_ids else {}
+    posts = dict(DBSession.query(Post.id, Post.user_id)
+                          .filter(Post.id.in_(post_ids))) \
+        if post_ids else {}
+    out = []
+    for r in rows:
+        to = parents.get(r.parent_id) if r.parent_id else posts.get(r.post_id)
+        if to is not None and to != r.user_id:
+            out.append({'user_id': to, 'kind': 'reply', 'actor_id': r.user_id,
+                        'post_id': r.post_id, 'comment_id': r.id})
+    if out:
+        DBSession.execute(insert(Notification), out)
+
+
+def user_registered(worker, jobs, effects):
+    """``user.registered``: a ``welcome`` notification per new user."""
+    DBSession.execute(insert(Notification), [
+        {'user_id': p['id'], 'kind': 'welcome'} for _, p in jobs
+    ])
+
+
+HANDLERS = {
+    POST_CREATED:    post_created,
+    COMMENT_CREATED: comment_created,
+    USER_REGISTERED: user_registered,
+}
+
+
+def prune(before):
+    """Delete jobs finished before the datetime ``before``."""
+    return DBSession.query(OutboxJob) \
+                    .filter(OutboxJob.done_at < before) \
+                    .delete(synchronize_session=False)
+
+
+def retry_failed(max_attempts):
+    """Give every job that used up its attempts a fresh start."""
+    return DBSession.query(OutboxJob) \
+                    .filter(OutboxJob.done_at.is_(None),
+                            OutboxJob.attempts >= max_attempts) \
+                    .update({OutboxJob.attempts: 0,
+                             OutboxJob.available_at: datetime.datetime.utcnow()},
+                            synchronize_session=False)
+
+
+class ClaimLost(Exception):
+    """Another worker finished some of the batch's jobs first."""
+
+
+class OutboxWorker(object):
+    """Drains the outbox in batches (see module docstring).
+
+    ``events`` and ``cache`` are the broker and cache the after-commit
+    effects go to: the app's own in ``thread`` mode, ones built from
+    the settings in ``kampusku_outbox_worker``.
+    """
+
+    def __init__(self, events, cache, batch_size=100, poll_interval=1.0,
+                 max_attempts=5, retry_delay=5.0, handlers=HANDLERS):
+        self.events        = events
+        self.cache         = cache
+        self.batch_size    = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts  = max_attempts
+        self.retry_delay   = retry_delay
+        self.handlers      = handlers
+        self._wake         = threading.Event()
+        self._thread       = None
+        self._lock         = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings, events, cache):
+        return cls(
+            events, cache,
+            batch_size=int(settings.get('outbox.batch_size', 100)),
+            poll_interval=float(settings.get('outbox.poll_interval', 1)),
+            max_attempts=int(settings.get('outbox.max_attempts', 5)),
+            retry_delay=float(settings.get('outbox.retry_delay', 5)),
+        )
+
+    def publisher(self, type_, data):
+        return lambda: self.events.publish(type_, data)
+
+    def invalidator(self, name):
+        return lambda: self.cache.bump(name)
+
+    # --- antrean ---
+
+    def _claim(self, now):
+        """Pending job rows for one batch, oldest first."""
+        return DBSession.query(OutboxJob.id, OutboxJob.kind,
+                               OutboxJob.payload, OutboxJob.attempts) \
+                        .filter(OutboxJob.done_at.is_(None),
+                                OutboxJob.available_at <= now,
+                                OutboxJob.attempts < self.max_attempts) \
+                        .order_by(OutboxJob.id) \
+                        .limit(self.batch_size) \
+                        .with_for_update(skip_locked=True) \
+                        .all()
+
+    def _mark_done(self, ids, now):
+        result = DBSession.execute(
+            update(OutboxJob)
+            .where(OutboxJob.id.in_(ids), OutboxJob.done_at.is_(None))
+            .values(done_at=now, last_error=None),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount != len(ids):
+            raise ClaimLost()
+
+    def _run(self, jobs, now):
+        """Carry out ``jobs`` in the current transaction; returns the
+        after-commit effects."""
+        self._mark_done([j.id for j in jobs], now)
+        by_kind = {}
+        for j in jobs:
+            by_kind.setdefault(j.kind, []).append((j.id, json.loads(j.payload)))
+        effects = []
+        for kind, items in by_kind.items():
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise LookupError('no outbox handler for %r' % kind)
+            handler(self, items, effects)
+        return effects
+
+    def _after_commit(self, effects):
+        for _, effect in sorted(effects, key=lambda e: e[0]):
+            try:
+                effect()
+            except Exception:
+                # transaksi sudah commit: tidak bisa diulang, cukup dicatat
+                log.exception('outbox after-commit effect failed')
+
+    def _fail(self, job, error):
+        attempts = job.attempts + 1
+        delay    = self.retry_delay * 2 ** (attempts - 1)
+        with transaction.manager:
+            DBSession.execute(
+                update(OutboxJob).where(OutboxJob.id == job.id).values(
+                    attempts=attempts, last_error=repr(error)[:1000],
+                    available_at=datetime.datetime.utcnow() +
+                    datetime.timedelta(seconds=delay)),
+                execution_options={'synchronize_session': False}
+            )
+        if attempts >= self.max_attempts:
+            log.error('outbox job %d (%s) failed %d times, giving up: %r',
+                      job.id, job.kind, attempts, error)
+        else:
+            log.warning('outbox job %d (%s) failed, retry in %.0fs: %r',
+                        job.id, job.kind, delay, error)
+
+    def run_batch(self):
+        """Process one batch; returns how many jobs were claimed."""
+        now  = datetime.datetime.utcnow()
+        jobs = []
+        try:
+            with transaction.manager:
+                jobs = self._claim(now)
+                effects = self._run(jobs, now) if jobs else []
+        except Exception:
+            if not jobs:
+                raise
+            log.info('outbox batch of %d failed, retrying job by job',
+                     len(jobs), exc_info=True)
+            self._run_each(jobs, now)
+            return len(jobs)
+        finally:
+            DBSession.remove()
+        self._after_commit(effects)
+        return len(jobs)
+
+    def _run_each(self, jobs, now):
+        # satu transaksi per job: job yang rusak tidak menahan yang lain
+        for job in jobs:
+            try:
+                with transaction.manager:
+                    effects = self._run([job], now)
+            except ClaimLost:
+                continue
+            except Exception as e:
+                DBSession.remove()
+                self._fail(job, e)
+                continue
+            finally:
+                DBSession.remove()
+            self._after_commit(effects)
+
+    def drain(self):
+        """Process batches until the outbox has nothing ready; returns the
+        number of jobs claimed."""
+        total = 0
+        while True:
+            n = self.run_batch()
+            total += n
+            if n < self.batch_size:
+                return total
+
+    # --- thread di proses web ---
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """Start the background thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self.run_forever, name='kampusku-outbox',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def run_forever(self, stop=None):
+        """Drain, then sleep until woken or ``poll_interval`` passes."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception:
+                log.exception('outbox worker error')
+            self._wake.wait(self.poll_interval)
+
+
+class NoWorker(OutboxWorker):
+    """``outbox.worker = none``: jobs wait for ``kampusku_outbox_worker``."""
+
+    def wake(self):
+        pass
+
+    def start(self):
+        pass
+
+
+def _start_worker(event):
+    event.request.registry.outbox.start()
+
+
+def includeme(config):
+    settings = config.get_settings()
+    mode = settings.get('outbox.worker', 'thread').strip()
+    cls  = {'thread': OutboxWorker, 'none': NoWorker}[mode]
+    config.registry.outbox = cls.from_settings(
+        settings, config.registry.events, config.registry.cache)
+    if mode == 'thread':
+        # thread dimulai di request pertama, bukan saat import/fork
+        config.add_subscriber(_start_worker, NewRequest)
@@ -0,0 +1,136 @@
+# backend/pyramid_kampusku/pagination.py
+"""Helper keyset pagination (cursor) untuk endpoint list."""
+
+import base64
+import datetime
+import json
+
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT     = 100
+
+
+class InvalidPageParam(ValueError):
+    """Raised when ``limit`` or ``cursor`` from the query string is invalid."""
+
+
+def parse_int_param(request, name, default, maximum, minimum=1):
+    """Read integer ``?<name>=`` from the request, clamped to ``maximum``."""
+    raw = request.params.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise InvalidPageParam('%s must be an integer' % name)
+    if value < minimum:
+        raise InvalidPageParam('%s must be at least %d' % (name, minimum))
+    return min(value, maximum)
+
+
+def parse_limit(request, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Read ``?limit=`` from the request, clamped to ``maximum``."""
+    return parse_int_param(request, 'limit', default, maximum)
+
+
+def encode_cursor(created_at, id_):
+    """Encode the ``(created_at, id)`` of the last row into an opaque token."""
+    payload = json.dumps([created_at.isoformat(), id_], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of :func:`encode_cursor`; returns ``(created_at, id)``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, id_ = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.datetime.fromisoformat(created_at), int(id_)
+    except Exception:
+        raise InvalidPageParam('invalid cursor')
+
+
+def encode_offset(offset):
+    """Opaque cursor for lists without a stable keyset (ranked search)."""
+    payload = json.dumps(['offset', offset], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_offset(token):
+    """Inverse of :func:`encode_offset`; returns the offset."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        tag, offset = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if tag != 'offset' or int(offset) < 0:
+            raise ValueError(token)
+        return int(offset)
+    except Exception:
+        raise InvalidPageParam('invalid cursor')
+
+
+def encode_rank_cursor(score, id_):
+    """Opaque cursor for lists ordered by a ``(score, id)`` keyset."""
+    payload = json.dumps(['rank', score, id_], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_rank_cursor(token):
+    """Inverse of :func:`encode_rank_cursor`; returns ``(score, id)``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        tag, score, id_ = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if tag != 'rank':
+            raise ValueError(token)
+        return float(score), int(id_)
+    except Exception:
+        raise InvalidPageParam('invalid cursor')
+
+
+def parse_cursor(request):
+    """Read ``?cursor=`` from the request; ``None`` for the first page."""
+    token = request.params.get('cursor')
+    if not token:
+        return None
+    return decode_cursor(token)
+
+
+def keyset_query(query, created_col, id_col, cursor, ascending=False):
+    """Filter ``query`` to rows after ``cursor`` and order it for paging."""
+    key = tuple_(created_col, id_col)
+    if cursor is not None:
+        query = query.filter(
+            key > tuple_(*cursor) if ascending else key < tuple_(*cursor)
+        )
+    if ascending:
+        return query.order_by(created_col.asc(), id_col.asc())
+    return query.order_by(created_col.desc(), id_col.desc())
+
+
+def keyset_page(query, created_col, id_col, cursor, limit, ascending=False):
+    """Apply ``(created_at, id)`` keyset paging to ``query``.
+
+    Newest first by default; ``ascending=True`` pages oldest first.
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the
+    last page. One extra row is fetched to know whether more remain, so
+    the cost of a page does not depend on how deep the client scrolled.
+    """
+    query = keyset_query(query, created_col, id_col, cursor, ascending)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+
+def ranked_page(query, score_col, id_col, cursor, limit):
+    """Like :func:`keyset_page`, highest ``(score, id)`` first; ``cursor``
+    comes from :func:`decode_rank_cursor` and rows must have ``score`` and
+    ``id`` attributes."""
+    query = keyset_query(query, score_col, id_col, cursor)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_rank_cursor(last.score, last.id)
@@ -0,0 +1,274 @@
+# backend/pyramid_kampusku/ranking.py
+"""Feed "hot": post diurutkan menurut aktivitas yang meluruh terhadap waktu.
+
+Skor dihitung di muka ke tabel ``post_ranks`` (bukan per request: itu
+berarti menggabungkan ``posts`` dengan seluruh ``comments``). Setiap
+aktivitas menyumbang bobot yang meluruh setengahnya tiap ``half_life``
+jam:
+
+    score = log2( 2**e(post) * (1 + max(upvotes - downvotes, 0))
+                  + sum(2**e(komentar)) )
+
+dengan ``e(t) = (t - EPOCH) / half_life``. Post baru bernilai satu unit
+aktivitas, vote bersih dihitung pada waktu post (vote tidak punya
+timestamp), tiap komentar satu unit pada waktu komentarnya. Karena semua
+eksponen diukur dari ``EPOCH`` yang tetap, "meluruh" berarti aktivitas
+baru bernilai lebih besar, bukan skor lama diperkecil: urutan tidak
+berubah seiring waktu, jadi post tanpa aktivitas baru tidak perlu
+dihitung ulang. Satu ``half_life`` lebih baru = skor +1.
+
+Refresh inkremental membaca change log (changes.py) sejak ``last_seq``
+di ``rank_state`` dan menghitung ulang skor setiap post yang tersentuh
+(post/komentar baru, edit, vote, hapus) dari keadaannya saat ini, jadi
+mengulang refresh tidak berbahaya. Baris change yang umurnya kurang dari
+``SETTLE_SECONDS`` dibaca ulang di refresh berikutnya, sama seperti
+GET /api/posts/changes. Bila change log sudah dipangkas melewati
+``last_seq`` (atau belum pernah refresh), seluruh tabel dibangun ulang.
+
+Refresh berjalan terjadwal:
+
+    thread  satu thread di setiap proses web, tiap ``refresh_interval``
+            detik (beberapa proses aman: baris ``rank_state`` dikunci)
+    none    jalankan ``kampusku_refresh_hot --loop`` (atau dari cron)
+
+Post baru masuk feed hot setelah refresh berikutnya yang melewatinya.
+
+Konfigurasi (development.ini)::
+
+    hot.refresh          = thread   # thread | none
+    hot.refresh_interval = 60       # detik
+    hot.half_life_hours  = 12       # ubah = kampusku_refresh_hot --rebuild
+"""
+
+import datetime
+import itertools
+import logging
+import math
+import threading
+
+import transaction
+from pyramid.events import NewRequest
+from sqlalchemy import insert
+
+from .changes import SETTLE_SECONDS, is_pruned
+from .models import DBSession, Change, Comment, Post, PostRank, RankState
+from .pagination import InvalidPageParam
+
+log = logging.getLogger(__name__)
+
+HOT   = 'hot'
+NEW   = 'new'
+SORTS = (NEW, HOT)
+
+EPOCH = datetime.datetime(2025, 1, 1)
+
+# post per query IN (...) saat menghitung ulang
+RESCORE_CHUNK = 500
+# baris change per putaran refresh
+REFRESH_BATCH = 10000
+# baris per INSERT saat rebuild
+REBUILD_CHUNK = 5000
+
+
+def parse_sort(request):
+    """Read ``?sort=new|hot`` from the request (default new)."""
+    sort = request.params.get('sort') or NEW
+    if sort not in SORTS:
+        raise InvalidPageParam('sort must be one of: ' + ', '.join(SORTS))
+    return sort
+
+
+class Scorer(object):
+    """Computes the hot score of one post from its activity."""
+
+    def __init__(self, half_life_hours=12):
+        self.half_life = float(half_life_hours) * 3600
+
+    def exponent(self, dt):
+        return (dt - EPOCH).total_seconds() / self.half_life
+
+    def score(self, created_at, net_votes, comment_times):
+        terms = [self.exponent(created_at) + math.log2(1 + max(net_votes, 0))]
+        terms.extend(self.exponent(t) for t in comment_times)
+        # log-sum-exp basis 2: 2**e untuk post lama/baru tidak overflow
+        top = max(terms)
+        return top + math.log2(sum(2.0 ** (x - top) for x in terms))
+
+
+def _score_rows(scorer, posts, times, now):
+    return [{'post_id': p.id,
+             'score': scorer.score(p.created_at or EPOCH,
+                                   p.upvotes - p.downvotes,
+                                   [t for t in times.get(p.id, ()) if t]),
+             'updated_at': now}
+            for p in posts]
+
+
+def rescore(scorer, post_ids, now=None):
+    """Recompute the rank of ``post_ids`` from their current rows; posts
+    that no longer exist lose their rank. Returns the number ranked."""
+    now = now or datetime.datetime.utcnow()
+    ids = sorted(set(post_ids))
+    ranked = 0
+    for i in range(0, len(ids), RESCORE_CHUNK):
+        chunk = ids[i:i + RESCORE_CHUNK]
+        posts = DBSession.query(Post.id, Post.created_at, Post.upvotes,
+                                Post.downvotes) \
+                         .filter(Post.id.in_(chunk)).all()
+        times = {}
+        for post_id, created_at in DBSession.query(Comment.post_id,
+                                                   Comment.created_at) \
+                                            .filter(Comment.post_id.in_(chunk)):
+            times.setdefault(post_id, []).append(created_at)
+        DBSession.query(PostRank).filter(PostRank.post_id.in_(chunk)) \
+                 .delete(synchronize_session=False)
+        rows = _score_rows(scorer, posts, times, now)
+        if rows:
+            DBSession.execute(insert(PostRank), rows)
+        ranked += len(rows)
+    return ranked
+
+
+def _settled_head(settled):
+    # dari seq terbesar turun: hanya melewati baris yang belum mengendap
+    return DBSession.query(Change.seq) \
+                    .filter(Change.created_at <= settled) \
+                    .order_by(Change.seq.desc()).limit(1).scalar() or 0
+
+
+def rebuild(scorer, now=None):
+    """Recompute every post's rank in bulk. Returns the number ranked."""
+    now = now or datetime.datetime.utcnow()
+    last_seq = _settled_head(now - datetime.timedelta(seconds=SETTLE_SECONDS))
+
+    DBSession.query(PostRank).delete(synchronize_session=False)
+    posts = {p.id: p for p in DBSession.query(Post.id, Post.created_at,
+                                              Post.upvotes, Post.downvotes)}
+    comments = DBSession.query(Comment.post_id, Comment.created_at) \
+                        .order_by(Comment.post_id).yield_per(REBUILD_CHUNK)
+    rows, ranked = [], 0
+
+    def flush():
+        nonlocal rows, ranked
+        if rows:
+            DBSession.execute(insert(PostRank), rows)
+            ranked += len(rows)
+            rows = []
+
+    for post_id, group in itertools.groupby(comments, lambda c: c.post_id):
+        p = posts.pop(post_id, None)
+        if p is None:
+            continue
+        rows.extend(_score_rows(scorer, [p], {p.id: [c.created_at for c in group]},
+                                now))
+        if len(rows) >= REBUILD_CHUNK:
+            flush()
+    # post tanpa komentar
+    rows.extend(_score_rows(scorer, list(posts.values()), {}, now))
+    flush()
+
+    DBSession.merge(RankState(name=HOT, last_seq=last_seq, refreshed_at=now))
+    return ranked
+
+
+def refresh(scorer, now=None, batch=REFRESH_BATCH):
+    """Rescore the posts touched since the last refresh (or rebuild when
+    the change log no longer reaches back that far). Returns
+    ``(posts rescored, rebuilt)``."""
+    now = now or datetime.datetime.utcnow()
+    state = DBSession.query(RankState).filter_by(name=HOT) \
+                     .with_for_update().first()
+    if state is None or is_pruned(state.last_seq):
+        return rebuild(scorer, now), True
+
+    settled = now - datetime.timedelta(seconds=SETTLE_SECONDS)
+    since, touched = state.last_seq, set()
+    while True:
+        rows = DBSession.query(Change.seq, Change.post_id, Change.created_at) \
+                        .filter(Change.seq > since) \
+                        .order_by(Change.seq).limit(batch).all()
+        touched.update(r.post_id for r in rows)
+        last = since
+        for r in rows:
+            if r.created_at > settled:
+                break
+            last = r.seq
+        if len(rows) < batch or last == since:
+            # sisanya belum mengendap: dibaca ulang di refresh berikutnya
+            since = last
+            break
+        since = last
+
+    rescore(scorer, touched, now)
+    state.last_seq     = since
+    state.refreshed_at = now
+    return len(touched), False
+
+
+class HotRefresher(object):
+    """Runs :func:`refresh` every ``interval`` seconds, each in its own
+    transaction."""
+
+    def __init__(self, scorer, interval=60):
+        self.scorer   = scorer
+        self.interval = interval
+        self._thread  = None
+        self._lock    = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(Scorer(float(settings.get('hot.half_life_hours', 12))),
+                   interval=float(settings.get('hot.refresh_interval', 60)))
+
+    def refresh(self):
+        try:
+            with transaction.manager:
+                return refresh(self.scorer)
+        finally:
+            DBSession.remove()
+
+    def rebuild(self):
+        try:
+            with transaction.manager:
+                return rebuild(self.scorer)
+        finally:
+            DBSession.remove()
+
+    def start(self):
+        """Start the background thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self.run_forever, name='kampusku-hot-refresh',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def run_forever(self, stop=None):
+        """Refresh, then sleep ``interval`` seconds."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                n, rebuilt = self.refresh()
+                if rebuilt:
+                    log.info('hot ranking rebuilt: %d posts', n)
+            except Exception:
+                log.exception('hot ranking refresh failed')
+            stop.wait(self.interval)
+
+
+def _start_refresher(event):
+    event.request.registry.hot_refresher.start()
+
+
+def includeme(config):
+    settings = config.get_settings()
+    mode = settings.get('hot.refresh', 'thread').strip()
+    if mode not in ('thread', 'none'):
+        raise ValueError('hot.refresh must be thread or none, not %r' % mode)
+    config.registry.hot_refresher = HotRefresher.from_settings(settings)
+    if mode == 'thread':
+        # thread dimulai di request pertama, bukan saat import/fork
+        config.add_subscriber(_start_refresher, NewRequest)
@@ -0,0 +1,256 @@
+# backend/pyramid_kampusku/ratelimit.py
+"""Rate limit per client dan admission control, sebagai tween terluar.
+
+Setiap request dipetakan ke satu *budget* menurut nama route dan method:
+
+    login   POST /api/login, /api/register  (per IP: tebak password)
+    write   request non-GET lainnya          (per user jika ada token, dan per IP)
+    feed    GET feed/thread/search/changes   (per user jika ada token, dan per IP)
+    read    GET lainnya
+
+Budget ``N/S`` = token bucket berisi ``N`` token yang terisi ``N`` per
+``S`` detik. Request yang kehabisan token dijawab 429 + ``Retry-After``.
+Selain itu ``max_concurrent`` membatasi request yang sedang diproses per
+proses; kelebihannya langsung dijawab 503 alih-alih antre di thread
+waitress. Keduanya terjadi sebelum pyramid_tm membuka transaksi, jadi
+request yang ditolak tidak pernah mengambil koneksi database.
+
+Konfigurasi (development.ini)::
+
+    ratelimit.backend         = memory   # memory | paket.modul:Kelas
+    ratelimit.max_concurrent  = 16       # tidak diset / 0 = tanpa batas
+    ratelimit.login           = 10/60    # tidak diset / 0 = tanpa batas
+    ratelimit.write           = 60/60
+    ratelimit.feed            = 120/60
+    ratelimit.read            = 300/60
+    ratelimit.trust_forwarded = false    # true hanya di belakang proxy
+    ratelimit.trusted_proxies = 1        # jumlah proxy di depan app
+
+Dengan ``trust_forwarded`` IP client diambil dari ``X-Forwarded-For``:
+setiap proxy menambahkan alamat lawan bicaranya di kanan, jadi entri ke-
+``trusted_proxies`` dari kanan adalah yang ditulis proxy terluar kita.
+Entri di kirinya dikirim client sendiri dan bisa dipalsukan.
+"""
+
+import collections
+import json
+import threading
+import time
+
+from pyramid.interfaces import IRoutesMapper
+from pyramid.path import DottedNameResolver
+from pyramid.response import Response
+from pyramid.tweens import INGRESS
+
+LOGIN = 'login'
+WRITE = 'write'
+FEED  = 'feed'
+READ  = 'read'
+
+BUDGETS = (LOGIN, WRITE, FEED, READ)
+
+# route GET yang mahal (banyak query per request)
+FEED_ROUTES = {'posts', 'comments', 'search', 'post_changes', 'user_posts',
+               'user_comments'}
+LOGIN_ROUTES = {'login', 'register'}
+EXEMPT_ROUTES = {'cors-preflight'}
+
+
+class Budget(object):
+    """``burst`` requests, refilled at ``rate`` per second."""
+
+    def __init__(self, burst, seconds):
+        self.burst = float(burst)
+        self.rate  = self.burst / float(seconds)
+
+    @classmethod
+    def parse(cls, spec):
+        """``'10/60'`` -> 10 requests per 60 seconds; ``None`` if off."""
+        spec = (spec or '').strip()
+        if spec in ('', '0'):
+            return None
+        burst, _, seconds = spec.partition('/')
+        return cls(int(burst), float(seconds or 1))
+
+
+class BaseLimiter(object):
+    """Interface for token bucket stores.
+
+    A store shared between processes (e.g. Redis) subclasses this,
+    implements :meth:`hit` and is selected with ``ratelimit.backend =
+    package.module:Class``; ``from_settings`` receives the
+    ``ratelimit.*`` settings with the prefix stripped.
+    """
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls()
+
+    def hit(self, key, budget):
+        """Take one token from bucket ``key``. Returns 0 when allowed,
+        otherwise the seconds until a token is available."""
+        raise NotImplementedError
+
+
+class MemoryLimiter(BaseLimiter):
+    """In-process token buckets, split over ``shards`` independently
+    locked dicts so concurrent requests rarely wait on the same lock.
+
+    Each shard keeps at most ``max_keys / shards`` buckets and drops the
+    least recently used one first; a bucket idle long enough to be
+    dropped would have refilled anyway. Limits are per process: with N
+    waitress processes a client effectively gets N times the budget.
+    """
+
+    def __init__(self, shards=16, max_keys=100000):
+        self._shards    = [(threading.Lock(), collections.OrderedDict())
+                           for _ in range(shards)]
+        self._per_shard = max(1, max_keys // shards)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            shards=int(settings.get('shards', 16)),
+            max_keys=int(settings.get('max_keys', 100000)),
+        )
+
+    def hit(self, key, budget, now=None):
+        now = time.monotonic() if now is None else now
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            tokens, last = buckets.pop(key, (budget.burst, now))
+            tokens = min(budget.burst, tokens + (now - last) * budget.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / budget.rate
+            buckets[key] = (tokens, now)
+            if len(buckets) > self._per_shard:
+                buckets.popitem(last=False)
+        return wait
+
+
+BACKENDS = {
+    'memory': MemoryLimiter,
+}
+
+
+def limiter_from_settings(settings):
+    """Build the bucket store configured by the ``ratelimit.*`` settings."""
+    options = {k[len('ratelimit.'):]: v for k, v in settings.items()
+               if k.startswith('ratelimit.')}
+    name = options.pop('backend', 'memory').strip()
+    cls  = BACKENDS.get(name) or DottedNameResolver().resolve(name)
+    return cls.from_settings(options)
+
+
+class ConcurrencyLimit(object):
+    """Admits at most ``maximum`` requests at a time, without waiting."""
+
+    def __init__(self, maximum):
+        self._slots = threading.BoundedSemaphore(maximum)
+
+    def acquire(self):
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+
+def _json_error(status, message, retry_after):
+    resp = Response(json.dumps({'error': message}), status=status,
+                    content_type='application/json', charset='utf-8')
+    resp.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return resp
+
+
+class RateLimitTween(object):
+    """Tween answering 429/503 before the request reaches pyramid_tm."""
+
+    def __init__(self, handler, registry):
+        settings = registry.settings
+        self.handler  = handler
+        self.registry = registry
+        self.limiter  = limiter_from_settings(settings)
+        self.budgets  = {
+            name: Budget.parse(settings.get('ratelimit.' + name))
+            for name in BUDGETS
+        }
+        maximum = int(settings.get('ratelimit.max_concurrent', 0))
+        self.concurrency = ConcurrencyLimit(maximum) if maximum else None
+        self.trust_forwarded = settings.get('ratelimit.trust_forwarded',
+                                            'false').lower() == 'true'
+        self.trusted_proxies = max(1, int(settings.get(
+            'ratelimit.trusted_proxies', 1)))
+        # jumlah request ditolak sejak start, per budget (+ 'concurrency');
+        # ditambah dari semua thread waitress sekaligus
+        self._rejected      = collections.Counter()
+        self._rejected_lock = threading.Lock()
+        registry.ratelimit = self
+
+    def _reject(self, name):
+        with self._rejected_lock:
+            self._rejected[name] += 1
+
+    def rejected(self):
+        """Requests refused since start, ``{budget: count}`` (a copy)."""
+        with self._rejected_lock:
+            return dict(self._rejected)
+
+    def _route_name(self, request):
+        info = self.registry.getUtility(IRoutesMapper)(request)
+        return info['route'].name if info['route'] is not None else None
+
+    def budget_for(self, request, route):
+        if route in LOGIN_ROUTES:
+            return LOGIN
+        if request.method not in ('GET', 'HEAD'):
+            return WRITE
+        return FEED if route in FEED_ROUTES else READ
+
+    def client_ip(self, request):
+        if self.trust_forwarded:
+            hops = [h.strip() for h in
+                    request.headers.get('X-Forwarded-For', '').split(',')]
+            hops = [h for h in hops if h]
+            if hops:
+                return hops[max(0, len(hops) - self.trusted_proxies)]
+        return request.remote_addr
+
+    def check(self, request):
+        """Return a 429 response if ``request`` is over its budget."""
+        route = self._route_name(request)
+        if route in EXEMPT_ROUTES:
+            return None
+        name   = self.budget_for(request, route)
+        budget = self.budgets[name]
+        if budget is None:
+            return None
+        keys = ['ip:%s:%s' % (self.client_ip(request), name)]
+        if name != LOGIN and request.identity is not None:
+            keys.append('user:%d:%s' % (request.identity['id'], name))
+        wait = max(self.limiter.hit(key, budget) for key in keys)
+        if wait:
+            self._reject(name)
+            return _json_error(429, 'Too many requests, slow down', wait)
+        return None
+
+    def __call__(self, request):
+        resp = self.check(request)
+        if resp is not None:
+            return resp
+        if self.concurrency is None:
+            return self.handler(request)
+        if not self.concurrency.acquire():
+            self._reject('concurrency')
+            return _json_error(503, 'Server busy, please retry shortly', 1)
+        try:
+            return self.handler(request)
+        finally:
+            self.concurrency.release()
+
+
+def includeme(config):
+    config.add_tween('pyramid_kampusku.ratelimit.RateLimitTween',
+                     under=INGRESS)
@@ -0,0 +1,77 @@
+# backend/pyramid_kampusku/renderers.py
+"""Renderer ``json`` yang lebih cepat dan lebih ringkas.
+
+Renderer bawaan Pyramid memakai ``json.dumps`` dengan separator default
+(``', '`` dan ``': '``) dan menghasilkan ``str`` yang masih harus
+di-encode lagi ke UTF-8. Di sini serializer-nya diganti:
+
+    orjson   ``orjson.dumps`` langsung ke bytes; datetime, date dan UUID
+             ditangani native (ISO 8601, sama dengan ``isoformat()``)
+    stdlib   ``json.dumps`` tanpa spasi; datetime lewat ``isoformat()``
+
+``auto`` memilih orjson bila paketnya terpasang (``pip install
+pyramid_kampusku[fast]``), selain itu stdlib. Adapter dan ``__json__``
+Pyramid tetap berlaku lewat argumen ``default``. Bila metrics aktif,
+waktu serialisasi dicatat seperti sebelumnya (lihat metrics.py).
+
+Konfigurasi (development.ini)::
+
+    json.renderer = auto    # auto | orjson | stdlib
+"""
+
+import datetime
+import json
+import logging
+
+from pyramid.renderers import JSON
+
+from .metrics import timed_renderer
+
+log = logging.getLogger(__name__)
+
+
+def _stdlib_default(default):
+    def _default(obj):
+        if isinstance(obj, (datetime.datetime, datetime.date)):
+            return obj.isoformat()
+        return default(obj)
+    return _default
+
+
+def stdlib_dumps(value, default=None, **kw):
+    """``json.dumps`` without whitespace, encoding dates as ISO 8601."""
+    return json.dumps(value, default=_stdlib_default(default),
+                      separators=(',', ':'), **kw)
+
+
+def orjson_serializer():
+    """Serializer for :class:`pyramid.renderers.JSON` backed by orjson
+    (raises ImportError if it is not installed)."""
+    import orjson
+    # key int di dict (mis. peta users) ditulis sebagai string, seperti json
+    option = orjson.OPT_NON_STR_KEYS
+
+    def orjson_dumps(value, default=None, **kw):
+        return orjson.dumps(value, default=default, option=option)
+    return orjson_dumps
+
+
+def serializer_from_settings(settings):
+    """The ``json.renderer`` serializer (``auto`` falls back to stdlib)."""
+    name = settings.get('json.renderer', 'auto').strip()
+    if name == 'stdlib':
+        return stdlib_dumps
+    try:
+        return orjson_serializer()
+    except ImportError:
+        if name == 'orjson':
+            raise
+        log.info('orjson not installed, using the stdlib json renderer')
+        return stdlib_dumps
+
+
+def includeme(config):
+    factory = JSON(serializer=serializer_from_settings(config.get_settings()))
+    if getattr(config.registry, 'metrics', None) is not None:
+        factory = timed_renderer(factory)
+    config.add_renderer('json', factory)
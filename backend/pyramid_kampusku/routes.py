@@ -3,11 +3,25 @@ def includeme(config):
     config.add_route('register', '/api/register')
     config.add_route('login',    '/api/login')
     config.add_route('user',     '/api/users/{id}')
+    config.add_route('user_posts',    '/api/users/{id}/posts')
+    config.add_route('user_comments', '/api/users/{id}/comments')
 
     # Posts
     config.add_route('posts',    '/api/posts')
+    # harus sebelum 'post', kalau tidak {id} menangkap 'changes'
+    config.add_route('post_changes', '/api/posts/changes')
+    config.add_route('posts_batch',  '/api/posts/batch')
     config.add_route('post',     '/api/posts/{id}')
+    config.add_route('post_vote', '/api/posts/{id}/vote')
 
     # Comments
     config.add_route('comments', '/api/posts/{post_id}/comments')
+    config.add_route('comments_batch', '/api/comments/batch')
     config.add_route('comment',  '/api/comments/{id}')
+    config.add_route('comment_replies', '/api/comments/{id}/replies')
+
+    # Notifikasi milik user token (ditulis outbox worker)
+    config.add_route('notifications', '/api/notifications')
+
+    # Search
+    config.add_route('search',   '/api/search')
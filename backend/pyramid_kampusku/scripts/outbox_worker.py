@@ -0,0 +1,84 @@
+# backend/pyramid_kampusku/scripts/outbox_worker.py
+"""Drain the transactional outbox (post/comment/register side effects).
+
+    kampusku_outbox_worker development.ini               # 1 proses, terus jalan
+    kampusku_outbox_worker development.ini --processes 4
+    kampusku_outbox_worker development.ini --once        # kosongkan lalu keluar
+    kampusku_outbox_worker development.ini --retry-failed --prune-days 7
+
+Dipakai dengan ``outbox.worker = none``; lihat outbox.py. Beberapa proses
+aman berjalan bersamaan: setiap job dikerjakan tepat sekali.
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import sys
+
+import transaction
+from pyramid.paster import get_appsettings, setup_logging
+
+from ..cache import cache_from_settings
+from ..events import broker_from_settings
+from ..models import DBSession, get_engine
+from ..outbox import OutboxWorker, prune, retry_failed
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config_uri', help='Configuration file, e.g. development.ini')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='worker processes (default 1)')
+    parser.add_argument('--once', action='store_true',
+                        help='drain what is ready, then exit')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='reset jobs that used up outbox.max_attempts')
+    parser.add_argument('--prune-days', type=int,
+                        help='delete jobs finished more than N days ago, '
+                             'then exit')
+    return parser.parse_args(argv[1:])
+
+
+def make_worker(settings):
+    # engine dibuat di proses worker itu sendiri (setelah fork)
+    DBSession.configure(bind=get_engine(settings))
+    return OutboxWorker.from_settings(settings, broker_from_settings(settings),
+                                      cache_from_settings(settings))
+
+
+def run(settings, once):
+    worker = make_worker(settings)
+    if once:
+        return worker.drain()
+    worker.run_forever()
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    settings = get_appsettings(args.config_uri)
+
+    if args.retry_failed or args.prune_days is not None:
+        worker = make_worker(settings)
+        with transaction.manager:
+            if args.retry_failed:
+                print('Reset %d failed jobs' % retry_failed(worker.max_attempts))
+            if args.prune_days is not None:
+                before = datetime.datetime.utcnow() - \
+                    datetime.timedelta(days=args.prune_days)
+                print('Pruned %d finished jobs' % prune(before))
+        if args.prune_days is not None:
+            return
+        DBSession.get_bind().dispose()
+
+    if args.processes <= 1:
+        done = run(settings, args.once)
+        if args.once:
+            print('Processed %d jobs' % done)
+        return
+    procs = [multiprocessing.Process(target=run, args=(dict(settings), args.once))
+             for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
@@ -0,0 +1,38 @@
+# backend/pyramid_kampusku/scripts/prune_changes.py
+"""Delete change-log rows (and tombstones) older than N days.
+
+    kampusku_prune_changes development.ini --days 30
+
+Clients that last synced before the cut get ``reset: true`` from
+GET /api/posts/changes and reload the feed.
+"""
+
+import argparse
+import datetime
+import sys
+
+import transaction
+from pyramid.paster import get_appsettings, setup_logging
+
+from ..changes import prune
+from ..models import DBSession, get_engine
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config_uri', help='Configuration file, e.g. development.ini')
+    parser.add_argument('--days', type=int, default=30,
+                        help='keep this many days of changes (default 30)')
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    settings = get_appsettings(args.config_uri)
+    DBSession.configure(bind=get_engine(settings))
+
+    before = datetime.datetime.utcnow() - datetime.timedelta(days=args.days)
+    with transaction.manager:
+        deleted = prune(before)
+    print('Pruned %d change rows' % deleted)
@@ -0,0 +1,31 @@
+# backend/pyramid_kampusku/scripts/reconcile_counters.py
+"""Rebuild the post and user counters from the source tables.
+
+    kampusku_reconcile_counters development.ini
+"""
+
+import argparse
+import sys
+
+import transaction
+from pyramid.paster import get_appsettings, setup_logging
+
+from ..counters import reconcile
+from ..models import DBSession, get_engine
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config_uri', help='Configuration file, e.g. development.ini')
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    settings = get_appsettings(args.config_uri)
+    DBSession.configure(bind=get_engine(settings))
+
+    with transaction.manager:
+        posts, users = reconcile()
+    print('Reconciled counters on %d posts and %d users' % (posts, users))
@@ -0,0 +1,43 @@
+# backend/pyramid_kampusku/scripts/refresh_hot.py
+"""Refresh the "hot" feed ranking from the change log.
+
+    kampusku_refresh_hot development.ini             # sekali (mis. dari cron)
+    kampusku_refresh_hot development.ini --loop      # tiap hot.refresh_interval
+    kampusku_refresh_hot development.ini --rebuild   # hitung ulang semua post
+
+Dipakai dengan ``hot.refresh = none``; lihat ranking.py.
+"""
+
+import argparse
+import sys
+
+from pyramid.paster import get_appsettings, setup_logging
+
+from ..models import DBSession, get_engine
+from ..ranking import HotRefresher
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config_uri', help='Configuration file, e.g. development.ini')
+    parser.add_argument('--loop', action='store_true',
+                        help='keep refreshing every hot.refresh_interval seconds')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='recompute every post instead of the changed ones')
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    settings = get_appsettings(args.config_uri)
+    DBSession.configure(bind=get_engine(settings))
+    refresher = HotRefresher.from_settings(settings)
+
+    if args.rebuild:
+        print('Ranked %d posts' % refresher.rebuild())
+    if args.loop:
+        refresher.run_forever()
+    elif not args.rebuild:
+        n, rebuilt = refresher.refresh()
+        print('%s %d posts' % ('Ranked' if rebuilt else 'Rescored', n))
@@ -0,0 +1,169 @@
+# backend/pyramid_kampusku/scripts/serve.py
+"""Serve the WSGI app with waitress in several preloaded worker processes.
+
+    kampusku_serve production.ini --workers 4
+    kampusku_serve production.ini --workers 4 --threads 8 --listen 0.0.0.0:6543
+    kampusku_serve production.ini --workers 4 --no-preload
+
+Proses master memuat app sekali (import, app factory, konfigurasi mapper),
+membekukan objeknya dari GC (``gc.freeze``), membuka socket, lalu
+``fork`` sebanyak ``--workers``. Setiap worker melayani socket yang sama
+dengan waitress ``--threads`` thread. Memori hasil preload dibagi
+copy-on-write, dan worker pengganti (bila ada yang mati) siap dalam
+milidetik, bukan selama app factory. Pool koneksi database dibuang di
+setiap worker setelah fork (models.dispose_engines), jadi tidak ada
+koneksi yang dipakai bersama dua proses; thread latar (outbox, refresh
+feed hot, listener event) baru dimulai di request pertama tiap worker.
+
+Dengan ``--no-preload`` setiap worker memuat app sendiri setelah fork
+(seperti menjalankan beberapa pserve): untuk perbandingan, lihat
+``tools/bench_startup.py``.
+
+SIGTERM/SIGINT ke master menghentikan semua worker. Cache, rate limit dan
+``ratelimit.max_concurrent`` berlaku per worker. ``events.backend = memory``
+ditolak bila ``--workers`` > 1: event hanya sampai ke client SSE di worker
+yang menulis; pakai ``postgresql`` (atau ``events.max_clients = 0``).
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from pyramid.paster import get_app, get_appsettings, setup_logging
+
+log = logging.getLogger(__name__)
+
+# worker yang mati lebih cepat dari ini setelah start dianggap gagal start
+MIN_UPTIME = 1.0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config_uri', help='Configuration file, e.g. production.ini')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='waitress threads per worker (default 8)')
+    parser.add_argument('--listen', default='0.0.0.0:6543',
+                        help='host:port (default 0.0.0.0:6543)')
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--no-preload', action='store_true',
+                        help='load the app in each worker after fork')
+    return parser.parse_args(argv[1:])
+
+
+def check_events_backend(config_uri, workers):
+    """Error message if ``workers`` processes cannot share the configured
+    events backend, else ``None``."""
+    settings = get_appsettings(config_uri)
+    backend  = settings.get('events.backend', 'memory').strip()
+    # max_clients = 0: SSE mati, tidak ada client yang bisa ketinggalan
+    sse = int(settings.get('events.max_clients', 4)) > 0
+    if workers > 1 and backend == 'memory' and sse:
+        return ('events.backend = memory only reaches SSE clients of the '
+                'worker that published; use events.backend = postgresql '
+                'or --workers 1')
+    return None
+
+
+def bind(listen, backlog):
+    host, _, port = listen.rpartition(':')
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host or '0.0.0.0', int(port)))
+    sock.listen(backlog)
+    return sock
+
+
+def load(config_uri):
+    """Load the app named by ``config_uri`` (``[app:main]``)."""
+    return get_app(config_uri)
+
+
+def serve_worker(app, config_uri, sock, args):
+    """Body of one worker process; never returns."""
+    from waitress.server import create_server
+
+    # handler master (stop) tidak berlaku di worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        if app is None:
+            app = load(config_uri)
+        server = create_server(app, sockets=[sock], threads=args.threads)
+        signal.signal(signal.SIGTERM, lambda *a: server.close() or os._exit(0))
+        server.run()
+    except Exception:
+        log.exception('worker %d failed', os.getpid())
+        os._exit(1)
+    os._exit(0)
+
+
+def spawn(app, config_uri, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        serve_worker(app, config_uri, sock, args)
+    return pid
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    error = check_events_backend(args.config_uri, args.workers)
+    if error:
+        log.error(error)
+        return 1
+
+    app = None
+    if not args.no_preload:
+        t0  = time.perf_counter()
+        app = load(args.config_uri)
+        log.info('app loaded in %.0f ms', (time.perf_counter() - t0) * 1000)
+        # objek hasil preload tidak lagi disentuh GC: halamannya tetap
+        # dibagi copy-on-write dengan worker
+        gc.collect()
+        gc.freeze()
+    sock = bind(args.listen, args.backlog)
+
+    workers  = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.workers):
+        workers[spawn(app, args.config_uri, sock, args)] = time.monotonic()
+    log.info('serving on %s with %d workers (%s)', args.listen, args.workers,
+             'no preload' if args.no_preload else 'preloaded')
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        if time.monotonic() - started < MIN_UPTIME:
+            log.error('worker %d exited right after start (status %d); '
+                      'not restarting', pid, status)
+            continue
+        log.warning('worker %d exited (status %d); restarting', pid, status)
+        workers[spawn(app, args.config_uri, sock, args)] = time.monotonic()
+    sock.close()
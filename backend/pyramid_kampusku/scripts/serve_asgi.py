@@ -0,0 +1,44 @@
+# backend/pyramid_kampusku/scripts/serve_asgi.py
+"""Serve the app through the ASGI entry point (uvicorn).
+
+    kampusku_serve_asgi production.ini
+    kampusku_serve_asgi production.ini --port 6543 --workers 4
+
+GET feed/komentar/profil dilayani di event loop dengan driver database
+async, sisanya di thread pool; lihat pyramid_kampusku/asgi.py. Dengan
+``--workers`` setiap proses membangun app-nya sendiri (engine dibuat
+setelah fork); ``events.backend = memory`` ditolak bila ``--workers`` > 1.
+"""
+
+import argparse
+import os
+import sys
+
+from .serve import check_events_backend
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config_uri', help='Configuration file, e.g. production.ini')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=6543)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes (default 1)')
+    parser.add_argument('--backlog', type=int, default=2048,
+                        help='listen backlog (default 2048)')
+    return parser.parse_args(argv[1:])
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    error = check_events_backend(args.config_uri, args.workers)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    import uvicorn
+
+    # dibaca asgi.from_env di setiap proses worker
+    os.environ['KAMPUSKU_INI'] = os.path.abspath(args.config_uri)
+    uvicorn.run('pyramid_kampusku.asgi:from_env', factory=True,
+                host=args.host, port=args.port, workers=args.workers,
+                backlog=args.backlog, log_config=None, access_log=False)
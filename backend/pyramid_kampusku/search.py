@@ -0,0 +1,211 @@
+# backend/pyramid_kampusku/search.py
+"""Full-text search atas isi post dan komentar.
+
+Index disimpan di tabel ``search_index`` di luar model ORM:
+
+* PostgreSQL: tabel biasa ``(kind, ref_id, document tsvector)`` + index GIN,
+  di-rank dengan ``ts_rank``;
+* SQLite (lokal/testing): virtual table FTS5, di-rank dengan ``bm25``.
+  ``rowid`` = ``id * 2`` untuk post dan ``id * 2 + 1`` untuk komentar,
+  jadi update/hapus satu dokumen tidak men-scan index.
+
+Post dan komentar *baru* di-index worker outbox (:func:`index_posts`/
+:func:`index_comments`, lihat outbox.py), bukan di transaksi write-nya:
+sampai job-nya jalan (biasanya beberapa milidetik dengan
+``outbox.worker = thread``, lebih lama bila worker tertinggal atau mati)
+hasil search belum memuatnya. Edit dan hapus tetap dijaga di transaksi
+yang sama (lihat view post/comment): :func:`index_post` setelah update,
+dan :func:`unindex_post`/:func:`unindex_comment` *sebelum* baris dihapus,
+karena id komentar di bawahnya masih perlu dibaca. Konfigurasi teks
+``simple`` dipakai karena PostgreSQL tidak punya stemmer bahasa Indonesia.
+"""
+
+import re
+
+from sqlalchemy import event, text
+from zope.sqlalchemy import mark_changed
+
+from .threads import subtree
+from .models import DBSession, Base, Comment
+
+POST    = 'post'
+COMMENT = 'comment'
+KINDS   = (POST, COMMENT)
+
+TS_CONFIG = 'simple'
+
+DDL = {
+    'postgresql': [
+        "CREATE TABLE search_index ("
+        " kind VARCHAR(10) NOT NULL,"
+        " ref_id INTEGER NOT NULL,"
+        " document TSVECTOR NOT NULL,"
+        " PRIMARY KEY (kind, ref_id))",
+        "CREATE INDEX ix_search_index_document ON search_index"
+        " USING gin (document)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "content, kind UNINDEXED, ref_id UNINDEXED,"
+        " tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+}
+
+
+@event.listens_for(Base.metadata, 'after_create')
+def _create_index(target, connection, **kw):
+    for statement in DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Base.metadata, 'before_drop')
+def _drop_index(target, connection, **kw):
+    if connection.dialect.name in DDL:
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+
+
+def _dialect(session):
+    return session.get_bind().dialect.name
+
+
+def _write(session, sql, params=None):
+    # zope.sqlalchemy hanya melihat write lewat ORM; tanpa mark_changed
+    # transaksi yang cuma berisi SQL mentah ini di-rollback saat commit
+    result = session.execute(text(sql), params)
+    if session is DBSession:
+        mark_changed(session())
+    return result
+
+
+def _rowid(kind, ref_id):
+    return ref_id * 2 + (kind == COMMENT)
+
+
+def _index(kind, docs, session):
+    """Add or refresh ``docs`` (``[(ref_id, content), ...]``) with one
+    executemany per statement."""
+    if not docs:
+        return
+    if _dialect(session) == 'postgresql':
+        _write(session,
+               "INSERT INTO search_index (kind, ref_id, document)"
+               " VALUES (:kind, :ref_id, to_tsvector(:config, :content))"
+               " ON CONFLICT (kind, ref_id)"
+               " DO UPDATE SET document = EXCLUDED.document",
+               [{'kind': kind, 'ref_id': ref_id, 'content': content,
+                 'config': TS_CONFIG} for ref_id, content in docs])
+    else:
+        rows = [{'rowid': _rowid(kind, ref_id), 'content': content,
+                 'kind': kind, 'ref_id': ref_id} for ref_id, content in docs]
+        _write(session, "DELETE FROM search_index WHERE rowid = :rowid",
+               [{'rowid': r['rowid']} for r in rows])
+        _write(session,
+               "INSERT INTO search_index (rowid, content, kind, ref_id)"
+               " VALUES (:rowid, :content, :kind, :ref_id)", rows)
+
+
+def _unindex(kind, ref_ids, session):
+    if not ref_ids:
+        return
+    if _dialect(session) == 'postgresql':
+        _write(session,
+               "DELETE FROM search_index WHERE kind = :kind"
+               " AND ref_id = ANY(:ref_ids)",
+               {'kind': kind, 'ref_ids': list(ref_ids)})
+    else:
+        _write(session, "DELETE FROM search_index WHERE rowid = :rowid",
+               [{'rowid': _rowid(kind, i)} for i in ref_ids])
+
+
+def index_post(post_id, content, session=DBSession):
+    """Add or refresh a post in the index (call after flush)."""
+    _index(POST, [(post_id, content)], session)
+
+
+def index_posts(docs, session=DBSession):
+    """:func:`index_post` for many ``(post_id, content)`` pairs at once."""
+    _index(POST, docs, session)
+
+
+def index_comment(comment_id, content, session=DBSession):
+    """Add or refresh a comment in the index (call after flush)."""
+    _index(COMMENT, [(comment_id, content)], session)
+
+
+def index_comments(docs, session=DBSession):
+    """:func:`index_comment` for many ``(comment_id, content)`` pairs."""
+    _index(COMMENT, docs, session)
+
+
+def unindex_post(post_id, session=DBSession):
+    """Drop a post and all of its comments from the index."""
+    _unindex(POST, [post_id], session)
+    _unindex(COMMENT, [cid for cid, in session.query(Comment.id)
+                                              .filter_by(post_id=post_id)],
+             session)
+
+
+def unindex_comment(comment_id, session=DBSession):
+    """Drop a comment and every reply below it from the index."""
+    ids = [cid for cid, in session.execute(subtree(comment_id, session))]
+    _unindex(COMMENT, ids, session)
+
+
+def fts5_query(q):
+    """Turn free text into an FTS5 query matching all of its words.
+
+    Each word is quoted so FTS5 operators and punctuation in user input
+    are treated as plain text.
+    """
+    words = re.findall(r'\w+', q)
+    return ' '.join('"%s"' % w for w in words)
+
+
+def search(q, kind=None, limit=20, offset=0, session=DBSession):
+    """Return ``[(kind, ref_id, score), ...]``, best match first.
+
+    ``score`` is higher for better matches. ``limit + 1`` rows may be
+    asked for by the caller to detect a further page.
+    """
+    params = {'q': q, 'kind': kind, 'limit': limit, 'offset': offset}
+    kind_filter = ' AND kind = :kind' if kind else ''
+    if _dialect(session) == 'postgresql':
+        params['config'] = TS_CONFIG
+        sql = (
+            "SELECT kind, ref_id, ts_rank(document, query) AS score"
+            " FROM search_index, plainto_tsquery(:config, :q) query"
+            " WHERE document @@ query" + kind_filter +
+            " ORDER BY score DESC, kind, ref_id"
+            " LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params['q'] = fts5_query(q)
+        if not params['q']:
+            return []
+        # kolom rank FTS5 = bm25(), makin kecil makin cocok
+        sql = (
+            "SELECT kind, ref_id, -rank AS score FROM search_index"
+            " WHERE search_index MATCH :q" + kind_filter +
+            " ORDER BY rank, rowid LIMIT :limit OFFSET :offset"
+        )
+    return [(r.kind, int(r.ref_id), float(r.score))
+            for r in session.execute(text(sql), params)]
+
+
+def rebuild(session=DBSession):
+    """Rebuild the whole index from ``posts`` and ``comments`` in bulk.
+    Returns the number of documents indexed."""
+    _write(session, "DELETE FROM search_index")
+    if _dialect(session) == 'postgresql':
+        select_sql = ("SELECT '{kind}', id, to_tsvector(:config, content)"
+                      " FROM {table}")
+        insert_sql = "INSERT INTO search_index (kind, ref_id, document) "
+    else:
+        select_sql = "SELECT id * 2 + {odd}, content, '{kind}', id FROM {table}"
+        insert_sql = "INSERT INTO search_index (rowid, content, kind, ref_id) "
+    total = 0
+    for kind, table in ((POST, 'posts'), (COMMENT, 'comments')):
+        sql = insert_sql + select_sql.format(kind=kind, table=table,
+                                             odd=int(kind == COMMENT))
+        total += _write(session, sql, {'config': TS_CONFIG}).rowcount
+    return total
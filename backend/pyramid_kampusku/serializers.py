@@ -0,0 +1,437 @@
+# backend/pyramid_kampusku/serializers.py
+"""Batched loading + serialisasi post dan pohon komentar.
+
+Semua data satu halaman diambil dalam jumlah query yang tetap
+(posts, komentar untuk semua post itu, user yang direferensikan),
+lalu pohon komentar dirakit di memori dari ``parent_id``.
+
+Bentuk ``compact`` (``?shape=compact`` di feed dan thread) tidak
+mengulang username dan key di setiap node: penulis dikumpulkan sekali di
+peta ``users`` (``{user_id: username}``), post membawa ``user_id``, dan
+komentar dikirim sebagai array datar berurutan ``COMMENT_FIELDS``
+(``parent_id`` menggantikan ``replies`` bersarang; waktu dalam detik
+epoch UTC).
+
+Pohon komentar tidak pernah dikirim utuh: feed dipotong di
+``FEED_MAX_*``, thread di ``?depth=``/``?replies=`` (paling banyak
+``THREAD_MAX_*``). Yang terpotong dilaporkan di ``more_comments`` (post)
+dan ``more_replies`` (komentar), lalu dimuat sesuai kebutuhan lewat
+GET /api/comments/{id}/replies. Pemotongan per parent dikerjakan SQL
+(window function), jadi thread viral tidak ikut terkirim ke Python.
+"""
+
+import calendar
+from collections import namedtuple
+
+from sqlalchemy import Integer, and_, bindparam, func, or_, select, true
+from sqlalchemy.orm import aliased
+
+from .cache import post_ns
+from .models import DBSession, Comment, Post, User
+from .pagination import InvalidPageParam
+from .threads import subtrees
+
+# batas default (dan maksimum) untuk GET /api/posts/{post_id}/comments
+# dan /api/comments/{id}/replies
+THREAD_MAX_DEPTH   = 10
+THREAD_MAX_REPLIES = 50
+
+# pohon komentar di feed dipotong lebih pendek; sisanya lewat endpoint
+# thread/replies (``more_comments`` di post, ``more_replies`` di komentar)
+FEED_MAX_COMMENTS = 20   # komentar top-level per post
+FEED_MAX_DEPTH    = 3
+FEED_MAX_REPLIES  = 10
+
+FULL    = 'full'
+COMPACT = 'compact'
+SHAPES  = (FULL, COMPACT)
+
+# kolom tiap komentar dalam bentuk compact
+COMMENT_FIELDS = ('id', 'parent_id', 'user_id', 'content', 'created_at',
+                  'more_replies')
+
+
+def parse_shape(request):
+    """Read ``?shape=full|compact`` from the request (default full)."""
+    shape = request.params.get('shape') or FULL
+    if shape not in SHAPES:
+        raise InvalidPageParam('shape must be one of: ' + ', '.join(SHAPES))
+    return shape
+
+
+def epoch(dt):
+    """Seconds since the epoch for a naive UTC datetime."""
+    return calendar.timegm(dt.utctimetuple())
+
+
+def load_usernames(user_ids, session=DBSession):
+    """Return ``{user_id: username}`` for ``user_ids`` in one query."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = session.query(User.id, User.username) \
+                    .filter(User.id.in_(user_ids)) \
+                    .all()
+    return dict(rows)
+
+
+def _tree_statement(dialect, roots, session):
+    # dibangun sekali per dialect (segmen path di SQL berbeda) dan sumber
+    # root; parameter diisi saat execute, jadi tidak ada biaya membangun
+    # ekspresi per request
+    stmt = _TREE_STATEMENTS.get((dialect, roots))
+    if stmt is not None:
+        return stmt
+    if roots == FEED:
+        root_ids = _feed_roots(dialect)
+    else:
+        root_ids = bindparam('root_ids', expanding=True)
+    base  = bindparam('base_depth', type_=Integer)
+    depth = bindparam('max_depth', type_=Integer)
+    fan   = bindparam('max_replies', type_=Integer)
+    part  = (Comment.post_id, Comment.parent_id)
+    order = (Comment.created_at, Comment.id)
+    # window hanya atas kolom yang perlu (baris sempit = sort lebih
+    # murah); user_id/content diambil untuk baris yang lolos saja
+    tree  = select(
+        Comment.id, Comment.post_id, Comment.parent_id, Comment.created_at,
+        (Comment.depth - base).label('depth'),
+        func.row_number().over(partition_by=part, order_by=order).label('rn'),
+        func.count().over(partition_by=part).label('siblings')
+    ).where(
+        Comment.id.in_(subtrees(root_ids, session)),
+        Comment.depth <= base + depth + 1
+    ).subquery('tree')
+    keep = or_(
+        tree.c.depth == 0,
+        and_(tree.c.depth > 0, tree.c.depth <= depth, tree.c.rn <= fan),
+        and_(tree.c.depth == depth + 1, tree.c.rn == 1)
+    )
+    stmt = _TREE_STATEMENTS[dialect, roots] = select(
+        tree.c.id, tree.c.post_id, tree.c.parent_id, Comment.user_id,
+        Comment.content, tree.c.created_at, tree.c.depth, tree.c.rn,
+        tree.c.siblings
+    ).join(Comment, Comment.id == tree.c.id) \
+     .where(keep).order_by(tree.c.created_at, tree.c.id)
+    return stmt
+
+
+_TREE_STATEMENTS = {}
+
+# baris pohon komentar sebagai tuple biasa: atribut Row SQLAlchemy jauh
+# lebih mahal, dan tiap baris dibaca belasan kali sampai jadi JSON
+TreeRow = namedtuple('TreeRow', ('id', 'post_id', 'parent_id', 'user_id',
+                                 'content', 'created_at', 'depth', 'rn',
+                                 'siblings'))
+# sumber root _tree_statement: daftar id, atau komentar pertama post di feed
+IDS  = 'ids'
+FEED = 'feed'
+
+
+def load_tree_rows(root_ids, max_depth, max_replies, base_depth=0,
+                   session=DBSession):
+    """The threads at ``root_ids``, cut to what will be shown, in one query.
+
+    The roots sit at ``base_depth`` (siblings, or top-level comments).
+    Their subtrees are read by path range (:func:`threads.subtrees`) and
+    rows come out oldest first with ``depth`` relative to the roots and
+    ``siblings``, the length of the reply list they belong to. All roots
+    are returned; per parent only the first ``max_replies`` replies, down
+    to ``max_depth`` levels, plus one probe row per parent one level
+    deeper whose ``siblings`` tells how many replies were cut there. The
+    database still reads the subtrees down to that level, but only rows
+    that can be shown cross the wire; see :func:`cut_tree`.
+    """
+    stmt = _tree_statement(session.get_bind().dialect.name, IDS, session)
+    return _tree_rows(session, stmt, {
+        'root_ids':    list(root_ids),
+        'base_depth':  base_depth,
+        'max_depth':   max_depth,
+        'max_replies': max_replies,
+    })
+
+
+def _tree_rows(session, stmt, params):
+    return [TreeRow._make(r) for r in session.execute(stmt, params)]
+
+
+def cut_tree(rows, max_depth, max_replies):
+    """Decide what of :func:`load_tree_rows` is shown.
+
+    Returns ``(shown, children, more)``: the shown rows (oldest first),
+    ``{parent_id: [shown child rows]}`` and ``{comment_id: replies left
+    out}``. A reply whose parent was cut is dropped with it.
+    """
+    shown, children, more, kept = [], {}, {}, set()
+    for r in rows:
+        if r.depth > max_depth:
+            # probe: hanya jumlah balasan di bawah batas depth
+            if r.parent_id in kept:
+                more[r.parent_id] = r.siblings
+            continue
+        if r.depth > 0:
+            if r.parent_id not in kept:
+                continue
+            children.setdefault(r.parent_id, []).append(r)
+            if r.siblings > max_replies:
+                more[r.parent_id] = r.siblings - max_replies
+        kept.add(r.id)
+        shown.append(r)
+    return shown, children, more
+
+
+def _feed_roots(dialect):
+    # komentar top-level tertua per post: LIMIT per post di
+    # ix_comments_top_level, jadi post viral tidak dibaca seluruhnya.
+    # SQLite tidak punya LATERAL; subquery IN berkorelasinya dijalankan
+    # sekali per post
+    first = select(_first.id) \
+        .where(_first.post_id == Post.id, _first.parent_id.is_(None)) \
+        .order_by(_first.created_at, _first.id) \
+        .limit(FEED_MAX_COMMENTS)
+    posts = Post.id.in_(bindparam('post_ids', expanding=True))
+    if dialect == 'postgresql':
+        first = first.lateral('first')
+        stmt = select(first.c.id).select_from(Post).join(first, true())
+    else:
+        stmt = select(Comment.id).select_from(Post) \
+            .join(Comment, Comment.id.in_(first.correlate(Post)))
+    # dipakai di dalam SELECT ... FROM comments (threads.subtrees)
+    return stmt.where(posts).correlate(None)
+
+
+_first = aliased(Comment, name='first')
+
+
+def load_feed_rows(post_ids, session=DBSession):
+    """The comments of ``post_ids`` shown in the feed, as
+    :func:`load_tree_rows` rows, in one query: the threads of the oldest
+    ``FEED_MAX_COMMENTS`` top-level comments of each post."""
+    if not post_ids:
+        return []
+    stmt = _tree_statement(session.get_bind().dialect.name, FEED, session)
+    return _tree_rows(session, stmt, {
+        'post_ids':    list(post_ids),
+        'base_depth':  0,
+        'max_depth':   FEED_MAX_DEPTH,
+        'max_replies': FEED_MAX_REPLIES,
+    })
+
+
+def left_out(posts, shown):
+    """``{post_id: comments not shown}`` from the posts' ``comment_count``."""
+    counts = {}
+    for r in shown:
+        counts[r.post_id] = counts.get(r.post_id, 0) + 1
+    return {p.id: max((p.comment_count or 0) - counts.get(p.id, 0), 0)
+            for p in posts}
+
+
+def comment_dict(row, username):
+    """Serialize one comment (ORM object or row) without its replies."""
+    return {
+        'id':         row.id,
+        'username':   username,
+        'content':    row.content,
+        'created_at': row.created_at.isoformat(),
+        'replies':    [],
+        # jumlah balasan yang tidak ikut dikirim ("N more replies")
+        'more_replies': 0
+    }
+
+
+def comment_row(row, more_replies=0):
+    """One comment as a ``COMMENT_FIELDS`` array (compact shape)."""
+    return [row.id, row.parent_id, row.user_id, row.content,
+            epoch(row.created_at), more_replies]
+
+
+def users_map(usernames, user_ids):
+    """``{user_id: username}`` for ``user_ids``, keyed by string so the
+    map is the same before and after a JSON round trip (cache)."""
+    return {str(uid): usernames.get(uid) for uid in user_ids}
+
+
+def build_comment_trees(shown, children, more, usernames):
+    """Assemble ``{post_id: [top-level comment dicts]}`` from
+    :func:`cut_tree` output, every ``replies`` list oldest first."""
+    nodes = {}
+    trees = {}
+    for r in shown:
+        nodes[r.id] = comment_dict(r, usernames.get(r.user_id))
+        nodes[r.id]['more_replies'] = more.get(r.id, 0)
+        if r.depth == 0:
+            trees.setdefault(r.post_id, []).append(nodes[r.id])
+    for parent_id, kids in children.items():
+        nodes[parent_id]['replies'] = [nodes[c.id] for c in kids]
+    return trees
+
+
+def post_dict(p, username, comments, more_comments=0):
+    """Serialize one post with its (already built) comment list."""
+    return {
+        'id':         p.id,
+        'username':   username,
+        'content':    p.content,
+        'created_at': p.created_at.isoformat(),
+        'upvotes':    p.upvotes,
+        'downvotes':  p.downvotes,
+        'comment_count': p.comment_count,
+        'comments':   comments,
+        # komentar (semua level) yang tidak ikut dikirim di feed
+        'more_comments': more_comments
+    }
+
+
+def serialize_posts(posts, session=DBSession):
+    """Serialize a page of posts with their comment trees, cut at
+    ``FEED_MAX_COMMENTS`` top-level comments, ``FEED_MAX_DEPTH`` levels
+    and ``FEED_MAX_REPLIES`` replies per comment (see ``more_comments``
+    and ``more_replies``).
+
+    Costs two queries on top of the one that loaded ``posts``, no matter
+    how many posts, comments or distinct authors the page has.
+    """
+    rows = load_feed_rows([p.id for p in posts], session)
+    shown, children, more = cut_tree(rows, FEED_MAX_DEPTH, FEED_MAX_REPLIES)
+    usernames = load_usernames(
+        {p.user_id for p in posts} | {r.user_id for r in shown}, session
+    )
+    trees = build_comment_trees(shown, children, more, usernames)
+    left  = left_out(posts, shown)
+    return [
+        post_dict(p, usernames.get(p.user_id), trees.get(p.id, []),
+                  left.get(p.id, 0))
+        for p in posts
+    ]
+
+
+def serialize_posts_compact(posts, session=DBSession):
+    """Serialize a page of posts in the compact shape.
+
+    Same queries and cuts as :func:`serialize_posts`. Each post carries
+    its own ``users`` map (author plus commenters) so it can be cached
+    alone; :func:`compact_page` merges them for the response.
+    """
+    rows = load_feed_rows([p.id for p in posts], session)
+    shown, _, more = cut_tree(rows, FEED_MAX_DEPTH, FEED_MAX_REPLIES)
+    usernames = load_usernames(
+        {p.user_id for p in posts} | {r.user_id for r in shown}, session
+    )
+    left     = left_out(posts, shown)
+    comments = {}
+    for r in shown:
+        comments.setdefault(r.post_id, []).append(
+            comment_row(r, more.get(r.id, 0)))
+    out = []
+    for p in posts:
+        flat = comments.get(p.id, [])
+        out.append({
+            'id':         p.id,
+            'user_id':    p.user_id,
+            'content':    p.content,
+            'created_at': epoch(p.created_at),
+            'upvotes':    p.upvotes,
+            'downvotes':  p.downvotes,
+            'comment_count': p.comment_count,
+            'more_comments': left.get(p.id, 0),
+            'comments':   flat,
+            'users':      users_map(usernames,
+                                    {p.user_id} | {c[2] for c in flat}),
+        })
+    return out
+
+
+def compact_page(posts):
+    """Split cached compact posts into ``(posts, users)``: the posts without
+    their own ``users`` map, and one map for the whole page."""
+    users, out = {}, []
+    for d in posts:
+        users.update(d['users'])
+        # salinan dangkal: dict dari cache tidak boleh diubah
+        out.append({k: v for k, v in d.items() if k != 'users'})
+    return out, users
+
+
+def _post_key(cache, pid, updated_at, shape):
+    name = 'post' if shape == FULL else 'post-' + shape
+    return cache.key(name, pid, updated_at.isoformat(), gens=[post_ns(pid)])
+
+
+def cached_posts(cache, versions, session=DBSession, shape=FULL):
+    """Serialized posts for ``[(id, updated_at), ...]``, in that order.
+
+    Each post is cached on its own so a write to one post does not throw
+    away the other pages; only the misses are loaded and serialized.
+    With ``shape=COMPACT`` the posts come from
+    :func:`serialize_posts_compact` (pass them to :func:`compact_page`).
+    """
+    keys  = {pid: _post_key(cache, pid, updated_at, shape)
+             for pid, updated_at in versions}
+    found = {pid: cache.get(key) for pid, key in keys.items()}
+    missing = [pid for pid, d in found.items() if d is None]
+    if missing:
+        serialize = serialize_posts if shape == FULL \
+            else serialize_posts_compact
+        qs = session.query(Post).filter(Post.id.in_(missing)).all()
+        for d in serialize(qs, session):
+            cache.set(keys[d['id']], d)
+            found[d['id']] = d
+    return [found[pid] for pid, _ in versions if found.get(pid)]
+
+
+def _cut_threads(roots, max_depth, max_replies, session):
+    """Load the threads at ``roots`` (siblings or top-level comments, with
+    ``id`` and ``depth``) and decide what is shown; returns
+    :func:`cut_tree` output."""
+    if not roots:
+        return [], {}, {}
+    rows = load_tree_rows([r.id for r in roots], max_depth, max_replies,
+                          base_depth=roots[0].depth, session=session)
+    return cut_tree(rows, max_depth, max_replies)
+
+
+def serialize_thread(roots, max_depth=THREAD_MAX_DEPTH,
+                     max_replies=THREAD_MAX_REPLIES, session=DBSession):
+    """Serialize the comment threads rooted at ``roots``.
+
+    Each thread is cut at ``max_depth`` levels below its root and at
+    ``max_replies`` replies per comment; whatever is left out is reported
+    in ``more_replies`` so the client can show "N more replies" (and load
+    them from /api/comments/{id}/replies). Costs a constant two queries
+    however big the threads are.
+    """
+    rows, children, more = _cut_threads(roots, max_depth, max_replies,
+                                        session)
+    usernames = load_usernames({r.user_id for r in rows}, session)
+
+    nodes = {}
+    for r in rows:
+        nodes[r.id] = comment_dict(r, usernames.get(r.user_id))
+        nodes[r.id]['more_replies'] = more.get(r.id, 0)
+    for parent_id, shown in children.items():
+        nodes[parent_id]['replies'] = [nodes[c.id] for c in shown]
+    return [nodes[r.id] for r in roots if r.id in nodes]
+
+
+def serialize_thread_compact(roots, max_depth=THREAD_MAX_DEPTH,
+                             max_replies=THREAD_MAX_REPLIES,
+                             session=DBSession):
+    """Like :func:`serialize_thread` in the compact shape.
+
+    Returns ``(comments, users)``: the shown comments as flat
+    ``COMMENT_FIELDS`` arrays, each thread depth-first (a parent always
+    comes before its replies), and the ``users`` map of their authors.
+    """
+    rows, children, more = _cut_threads(roots, max_depth, max_replies,
+                                        session)
+    by_id = {r.id: r for r in rows}
+    out   = []
+    stack = [by_id[r.id] for r in reversed(roots) if r.id in by_id]
+    while stack:
+        r = stack.pop()
+        out.append(comment_row(r, more.get(r.id, 0)))
+        stack.extend(reversed(children.get(r.id, ())))
+    user_ids  = {c[2] for c in out}
+    usernames = load_usernames(user_ids, session)
+    return out, users_map(usernames, user_ids)
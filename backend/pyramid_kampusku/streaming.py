@@ -0,0 +1,118 @@
+# backend/pyramid_kampusku/streaming.py
+"""Mode streaming (``?stream=1``) untuk feed dan thread komentar.
+
+Renderer ``json`` membangun seluruh list dict lalu satu string besar
+sebelum byte pertama terkirim. Dalam mode streaming view mengembalikan
+``Response`` dengan ``app_iter``: baris dibaca dari server-side cursor
+(``yield_per``) per ``CHUNK_SIZE`` baris, tiap chunk diserialisasi lalu
+langsung ditulis, jadi memori puncak sebanding dengan satu chunk, bukan
+dengan ukuran halaman, dan header + awal body terkirim lebih dulu.
+
+``app_iter`` baru dijalankan waitress setelah view selesai, ketika
+transaksi pyramid_tm sudah ditutup; karena itu generator memakai session
+read-only miliknya sendiri (ke replica jika dikonfigurasi) yang ditutup
+saat iterasi selesai atau klien memutus koneksi.
+
+Mode ini tidak memakai ETag maupun cache halaman: keduanya butuh body
+(atau daftar versinya) utuh sebelum mengirim apa pun.
+"""
+
+import json
+
+from pyramid.response import Response
+from sqlalchemy.orm import Session
+
+from .models import DBSession
+from .pagination import encode_cursor
+
+# limit maksimum dalam mode streaming (mode biasa: pagination.MAX_LIMIT)
+STREAM_MAX_LIMIT = 1000
+# baris per fetch dari cursor = dict per serialisasi
+CHUNK_SIZE       = 50
+# kumpulkan potongan JSON sampai sebesar ini sebelum di-yield ke waitress
+FLUSH_BYTES      = 16 * 1024
+
+
+def wants_stream(request):
+    """True if the client asked for ``?stream=1``."""
+    return request.params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+class StreamedPage(object):
+    """Iterate a keyset page in chunks straight from the DB cursor.
+
+    ``query`` must already be filtered and ordered (see
+    :func:`pagination.keyset_query`). Iterating yields lists of at most
+    ``size`` rows; once exhausted, :attr:`next_cursor` holds the cursor of
+    the following page (``None`` on the last page).
+    """
+
+    def __init__(self, query, limit, size=CHUNK_SIZE):
+        self.query       = query
+        self.limit       = limit
+        self.size        = size
+        self.next_cursor = None
+
+    def __iter__(self):
+        rows = self.query.limit(self.limit + 1) \
+                         .execution_options(stream_results=True) \
+                         .yield_per(self.size)
+        chunk, last, seen = [], None, 0
+        for row in rows:
+            if seen == self.limit:
+                # baris ekstra: masih ada halaman berikutnya
+                self.next_cursor = encode_cursor(last.created_at, last.id)
+                break
+            seen += 1
+            last = row
+            chunk.append(row)
+            if len(chunk) == self.size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def iter_json(key, chunks, tail):
+    """Encode ``{key: [...], **tail()}`` incrementally as UTF-8 bytes.
+
+    ``chunks`` yields lists of JSON-compatible dicts; ``tail`` is called
+    after it is exhausted, so it may depend on what was streamed (e.g.
+    ``next_cursor``).
+    """
+    yield ('{"%s": [' % key).encode()
+    buf, size, sep = [], 0, ''
+    for items in chunks:
+        for item in items:
+            piece = sep + json.dumps(item)
+            sep   = ', '
+            buf.append(piece)
+            size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buf).encode()
+            buf, size = [], 0
+    rest = json.dumps(tail())
+    buf.append('], ' + rest[1:] if rest != '{}' else ']}')
+    yield ''.join(buf).encode()
+
+
+def stream_response(request, key, produce):
+    """Return a streaming JSON ``Response``.
+
+    ``produce(session)`` is called lazily with a private read-only session
+    and must return ``(chunks, tail)`` as taken by :func:`iter_json`.
+    """
+    # engine dipilih sekarang, selagi request (dan flag replica) masih aktif
+    bind = DBSession.get_bind()
+
+    def app_iter():
+        session = Session(bind=bind)
+        try:
+            chunks, tail = produce(session)
+            for data in iter_json(key, chunks, tail):
+                yield data
+        finally:
+            session.close()
+
+    return Response(app_iter=app_iter(), content_type='application/json',
+                    charset='utf-8')
@@ -0,0 +1,91 @@
+# backend/pyramid_kampusku/threads.py
+"""Posisi komentar di pohon balasan: ``depth`` + materialized ``path``.
+
+Setiap komentar menyimpan ``depth`` (0 untuk komentar top-level) dan
+``path``: id semua leluhurnya dari root ke parent, masing-masing sebagai
+segmen hex lebar tetap ``%08x.``. Komentar 7 yang membalas 3 yang
+membalas 1 punya ``path = '00000001.00000003.'`` dan ``depth = 2``.
+Keduanya diisi saat INSERT dari baris parent (:func:`placement`), jadi
+tidak perlu UPDATE setelah id-nya diketahui.
+
+Semua keturunan komentar ``c`` punya path yang diawali
+``c.path + segmen(c.id)``, jadi satu subtree = satu range di index
+``ix_comments_path``, tanpa CTE rekursif. :func:`subtrees` menghitung
+range itu di SQL dari baris root-nya, jadi statement-nya sama untuk satu
+atau seratus root (cache compile SQLAlchemy tetap kena). Id 32 bit muat
+di 8 digit hex, jadi urutan string sama dengan urutan angka; di
+PostgreSQL kolomnya ber-collation ``C`` supaya perbandingannya bytewise.
+
+Balasan hanya boleh bersarang ``MAX_NESTING`` level (path paling panjang
+``MAX_NESTING * 9`` karakter, di bawah batas key btree PostgreSQL).
+"""
+
+from sqlalchemy import and_, func, select, union_all
+from sqlalchemy.orm import aliased
+
+from .models import DBSession, Comment
+
+SEGMENT = '%08x.'
+# lebih besar dari semua karakter segmen (0-9, a-f, '.')
+PATH_END = '~'
+
+MAX_NESTING = 200
+
+# root subtree di :func:`subtrees` (dibuat sekali: aliased() tidak murah)
+_top = aliased(Comment, name='top')
+
+
+class InvalidParent(ValueError):
+    """Raised when a reply's ``parent_id`` cannot take a reply."""
+
+
+def subtree_prefix(comment):
+    """The path prefix shared by every reply below ``comment`` (any object
+    with ``id`` and ``path``)."""
+    return comment.path + SEGMENT % comment.id
+
+
+def segment(id_col, session=DBSession):
+    """SQL expression for the path segment of ``id_col`` (``SEGMENT``)."""
+    if session.get_bind().dialect.name == 'postgresql':
+        return func.lpad(func.to_hex(id_col), 8, '0').concat('.')
+    return func.printf(SEGMENT, id_col)
+
+
+def placement(post_id, parent_id, session=DBSession):
+    """``(path, depth)`` for a new comment on ``post_id`` replying to
+    ``parent_id`` (``None`` for a top-level comment)."""
+    if parent_id is None:
+        return '', 0
+    parent = session.query(Comment.id, Comment.post_id, Comment.path,
+                           Comment.depth) \
+                    .filter_by(id=parent_id).first()
+    if parent is None or parent.post_id != post_id:
+        raise InvalidParent('Parent comment not found')
+    return place_under(parent)
+
+
+def place_under(parent):
+    """``(path, depth)`` for a reply to the already loaded ``parent``."""
+    if parent.depth + 1 > MAX_NESTING:
+        raise InvalidParent('replies nest at most %d levels deep'
+                            % MAX_NESTING)
+    return subtree_prefix(parent), parent.depth + 1
+
+
+def subtrees(comment_ids, session=DBSession):
+    """SELECT of the ids of ``comment_ids`` and every reply below them:
+    the comments themselves plus one path range per comment."""
+    prefix = _top.path.concat(segment(_top.id, session))
+    return union_all(
+        select(Comment.id).where(Comment.id.in_(comment_ids)),
+        select(Comment.id)
+        .join(_top, and_(Comment.path >= prefix,
+                         Comment.path < prefix.concat(PATH_END)))
+        .where(_top.id.in_(comment_ids))
+    )
+
+
+def subtree(comment_id, session=DBSession):
+    """SELECT of the ids of ``comment_id`` and every reply below it."""
+    return subtrees([comment_id], session)
@@ -0,0 +1,40 @@
+# backend/pyramid_kampusku/views/__init__.py
+"""View JSON API, didaftarkan eksplisit lewat ``config.include('.views')``.
+
+Tanpa ``config.scan``: scan mengimpor venusian dan memeriksa setiap
+atribut setiap modul di setiap proses yang start. Daftar di bawah juga
+jadi satu tempat untuk melihat method + permission setiap route (route-nya
+sendiri di routes.py).
+"""
+
+from . import comment, notification, post, search, user
+
+
+def includeme(config):
+    def add(view, route_name, request_method, **kw):
+        config.add_view(view, route_name=route_name, renderer='json',
+                        request_method=request_method, **kw)
+
+    add(post.get_posts,              'posts',           'GET')
+    add(post.create_post,            'posts',           'POST',   permission='write')
+    add(post.create_posts_batch,     'posts_batch',     'POST',   permission='write')
+    add(post.get_changes,            'post_changes',    'GET')
+    add(post.update_post,            'post',            'PUT',    permission='write')
+    add(post.delete_post,            'post',            'DELETE', permission='write')
+    add(post.vote_post,              'post_vote',       'POST',   permission='write')
+
+    add(comment.get_comments,        'comments',        'GET')
+    add(comment.add_comment,         'comments',        'POST',   permission='write')
+    add(comment.add_comments_batch,  'comments_batch',  'POST',   permission='write')
+    add(comment.get_replies,         'comment_replies', 'GET')
+    add(comment.delete_comment,      'comment',         'DELETE', permission='write')
+
+    add(user.register,               'register',        'POST')
+    add(user.login,                  'login',           'POST')
+    add(user.get_user,               'user',            'GET')
+    add(user.update_user,            'user',            'PUT',    permission='write')
+    add(user.get_user_posts,         'user_posts',      'GET')
+    add(user.get_user_comments,      'user_comments',   'GET')
+
+    add(notification.get_notifications, 'notifications', 'GET',   permission='private')
+    add(search.search_view,          'search',          'GET')
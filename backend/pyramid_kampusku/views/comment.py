@@ -1,73 +1,304 @@
 # pyramid_kampusku/views/comment.py
-from pyramid.view import view_config
-from ..models import DBSession, Comment, User
+from ..models import DBSession, Comment, Post
+from ..counters import bump, drop_subtree
+from ..threads import InvalidParent, placement, subtree
+from ..cache import invalidate, post_ns
+from ..etag import make_etag, not_modified
+from ..events import publish
+from ..changes import COMMENT, POST, record
+from ..search import unindex_comment
+from ..batch import InvalidBatch, create_comments, parse_items
+from ..outbox import COMMENT_CREATED, enqueue, enqueue_many
+from ..pagination import (
+    MAX_LIMIT, InvalidPageParam, keyset_page, keyset_query, parse_cursor,
+    parse_int_param, parse_limit
+)
+from ..serializers import (
+    COMMENT_FIELDS, COMPACT, THREAD_MAX_DEPTH, THREAD_MAX_REPLIES,
+    comment_dict, parse_shape, serialize_thread, serialize_thread_compact
+)
+from ..streaming import (
+    STREAM_MAX_LIMIT, StreamedPage, stream_response, wants_stream
+)
 
-@view_config(route_name='comments', renderer='json', request_method='GET')
 def get_comments(request):
+    """GET /api/posts/{post_id}/comments?limit=&cursor=&depth=&replies=&stream=
+
+    One page of top-level threads (oldest first, keyset paging), each cut
+    at ``depth`` levels and ``replies`` replies per comment. ``stream=1``
+    writes the threads in chunks as they are read (see streaming.py).
+    ``?shape=compact`` returns the comments as flat arrays plus a ``users``
+    map (see serializers.py); not available in stream mode.
+
+    The cached thread (and its ETag, via ``Post.updated_at``) only moves
+    on for a new comment once the outbox worker has run its job: until
+    then this may still serve the thread without it.
+    """
     post_id = int(request.matchdict['post_id'])
-    qs = DBSession.query(Comment)\
-                 .filter_by(post_id=post_id, parent_id=None)\
-                 .all()
-    def serialize(c):
-        return {
-            'id': c.id,
-            'username': c.author.username,
-            'content': c.content,
-            'created_at': c.created_at.isoformat(),
-            'replies': [serialize(r) for r in c.replies]
-        }
-    return [serialize(c) for c in qs]
-
-@view_config(route_name='comments', renderer='json', request_method='POST')
-def add_comment(request):
+    stream  = wants_stream(request)
+    try:
+        limit       = parse_limit(request, maximum=STREAM_MAX_LIMIT
+                                  if stream else MAX_LIMIT)
+        cursor      = parse_cursor(request)
+        max_depth   = parse_int_param(request, 'depth', THREAD_MAX_DEPTH,
+                                      THREAD_MAX_DEPTH, minimum=0)
+        max_replies = parse_int_param(request, 'replies', THREAD_MAX_REPLIES,
+                                      THREAD_MAX_REPLIES)
+        shape       = parse_shape(request)
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return {'error': str(e)}
+    if stream and shape == COMPACT:
+        request.response.status = 400
+        return {'error': 'shape=compact is not available with stream=1'}
+
+    # juga untuk stream=1: post yang tidak ada = 404, bukan thread kosong
+    row = DBSession.query(Post.updated_at).filter_by(id=post_id).first()
+    if row is None:
+        request.response.status = 404
+        return {'error': 'Post not found'}
+
+    roots = DBSession.query(Comment.id, Comment.created_at, Comment.depth) \
+                     .filter_by(post_id=post_id, parent_id=None)
+    if stream:
+        def produce(session):
+            page = StreamedPage(
+                keyset_query(roots.with_session(session), Comment.created_at,
+                             Comment.id, cursor, ascending=True),
+                limit
+            )
+            chunks = (serialize_thread(rows, max_depth, max_replies, session)
+                      for rows in page)
+            return chunks, lambda: {'next_cursor': page.next_cursor}
+
+        return stream_response(request, 'comments', produce)
+
+    updated_at = row.updated_at
+    resp = not_modified(request, make_etag(
+        'thread', post_id, updated_at, limit, request.params.get('cursor', ''),
+        max_depth, max_replies, shape
+    ))
+    if resp is not None:
+        return resp
+
+    key = request.cache.key(
+        'thread', post_id, updated_at, limit, request.params.get('cursor', ''),
+        max_depth, max_replies, shape, gens=[post_ns(post_id)]
+    )
+    out = request.cache.get(key)
+    if out is None:
+        page, next_cursor = keyset_page(
+            roots, Comment.created_at, Comment.id, cursor, limit,
+            ascending=True
+        )
+        if shape == COMPACT:
+            comments, users = serialize_thread_compact(page, max_depth,
+                                                       max_replies)
+            out = {
+                'comments':       comments,
+                'users':          users,
+                'comment_fields': COMMENT_FIELDS,
+                'next_cursor':    next_cursor
+            }
+        else:
+            out = {
+                'comments':    serialize_thread(page, max_depth, max_replies),
+                'next_cursor': next_cursor
+            }
+        request.cache.set(key, out)
+    return out
+
+def get_replies(request):
+    """GET /api/comments/{id}/replies?limit=&cursor=&depth=&replies=&shape=
+
+    One page of the direct replies to a comment (oldest first, keyset
+    paging), each with its own replies cut like the thread endpoint. This
+    is what a client calls for a comment's ``more_replies``; the page's
+    own ``more_replies`` counts the direct replies after it.
+    """
+    cid = int(request.matchdict['id'])
     try:
-        DBSession.rollback()
-    except:
-        pass
+        limit       = parse_limit(request)
+        cursor      = parse_cursor(request)
+        max_depth   = parse_int_param(request, 'depth', THREAD_MAX_DEPTH,
+                                      THREAD_MAX_DEPTH, minimum=0)
+        max_replies = parse_int_param(request, 'replies', THREAD_MAX_REPLIES,
+                                      THREAD_MAX_REPLIES)
+        shape       = parse_shape(request)
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return {'error': str(e)}
+
+    found = DBSession.query(Comment.post_id, Post.updated_at) \
+                     .join(Post, Post.id == Comment.post_id) \
+                     .filter(Comment.id == cid).first()
+    if found is None:
+        request.response.status = 404
+        return {'error': 'Comment not found'}
+    post_id, updated_at = found
+
+    resp = not_modified(request, make_etag(
+        'replies', cid, updated_at, limit, request.params.get('cursor', ''),
+        max_depth, max_replies, shape
+    ))
+    if resp is not None:
+        return resp
+
+    key = request.cache.key(
+        'replies', cid, updated_at, limit, request.params.get('cursor', ''),
+        max_depth, max_replies, shape, gens=[post_ns(post_id)]
+    )
+    out = request.cache.get(key)
+    if out is None:
+        replies = DBSession.query(Comment.id, Comment.created_at,
+                                  Comment.depth) \
+                           .filter_by(parent_id=cid)
+        page, next_cursor = keyset_page(
+            replies, Comment.created_at, Comment.id, cursor, limit,
+            ascending=True
+        )
+        more = 0
+        if next_cursor is not None:
+            last = page[-1]
+            more = keyset_query(replies, Comment.created_at, Comment.id,
+                                (last.created_at, last.id), ascending=True) \
+                .order_by(None).count()
+        if shape == COMPACT:
+            comments, users = serialize_thread_compact(page, max_depth,
+                                                       max_replies)
+            out = {
+                'comments':       comments,
+                'users':          users,
+                'comment_fields': COMMENT_FIELDS,
+                'more_replies':   more,
+                'next_cursor':    next_cursor
+            }
+        else:
+            out = {
+                'comments':     serialize_thread(page, max_depth, max_replies),
+                'more_replies': more,
+                'next_cursor':  next_cursor
+            }
+        request.cache.set(key, out)
+    return out
+
+def add_comment(request):
+    """POST /api/posts/{post_id}/comments — body {content, parent_id?}.
+
+    Only the comment and its outbox job are written here; counters,
+    indexing, notifications, cache invalidation and the SSE event follow
+    from the worker (outbox.py). 404 when the post does not exist.
+    """
     post_id = int(request.matchdict['post_id'])
     data = request.json_body
-    user = DBSession.query(User).get(data.get('user_id'))
-    if user is None:
+    user = request.identity
+    # FOR KEY SHARE (PostgreSQL): post tidak bisa dihapus sebelum commit,
+    # tetapi update counter/vote ke baris post tidak ikut menunggu
+    if DBSession.query(Post.id).filter_by(id=post_id) \
+                .with_for_update(read=True, key_share=True).first() is None:
         request.response.status = 404
-        return {'error': 'User not found'}
+        return {'error': 'Post not found'}
+    try:
+        path, depth = placement(post_id, data.get('parent_id'))
+    except InvalidParent as e:
+        request.response.status = 400
+        return {'error': str(e)}
     c = Comment(
         content=data.get('content', ''),
-        author=user,
+        user_id=user['id'],
         post_id=post_id,
-        parent_id=data.get('parent_id')
+        parent_id=data.get('parent_id'),
+        path=path,
+        depth=depth
     )
     DBSession.add(c)
     DBSession.flush()
-    DBSession.commit()
-    return {
-        'id': c.id,
-        'username': user.username,
-        'content': c.content,
-        'created_at': c.created_at.isoformat(),
-        'replies': []
-    }
-
-@view_config(route_name='comment', renderer='json', request_method='DELETE')
+    out = comment_dict(c, request.username)
+    enqueue(request, COMMENT_CREATED, c.id, {
+        'id':      c.id,
+        'post_id': post_id,
+        'user_id': user['id'],
+        'event': {
+            'id':         c.id,
+            'post_id':    post_id,
+            'parent_id':  c.parent_id,
+            'username':   request.username,
+            'content':    c.content,
+            'created_at': out['created_at'],
+        },
+    })
+    return out
+
+def add_comments_batch(request):
+    """POST /api/comments/batch — body {comments: [{post_id, content,
+    parent_id?}, ...]}; creates up to ``BATCH_MAX_ITEMS`` comments as the
+    token's user in one transaction.
+
+    Returns one result per item, in order: ``{index, id}`` or ``{index,
+    error}``. The status is 400 only when no item could be created.
+    """
+    try:
+        items = parse_items(request, 'comments')
+    except InvalidBatch as e:
+        request.response.status = 400
+        return {'error': str(e)}
+
+    user = request.identity
+    results, created = create_comments(user['id'], items)
+    # efek sampingnya sama dengan add_comment: lewat worker outbox
+    enqueue_many(request, COMMENT_CREATED, [
+        (id_, {
+            'id':      id_,
+            'post_id': post_id,
+            'user_id': user['id'],
+            'event': {
+                'id':         id_,
+                'post_id':    post_id,
+                'parent_id':  parent_id,
+                'username':   request.username,
+                'content':    content,
+                'created_at': created_at.isoformat(),
+            },
+        })
+        for _, id_, post_id, parent_id, content, created_at in created
+    ])
+    if not created:
+        request.response.status = 400
+    return {'results': results, 'created': len(created),
+            'failed': len(items) - len(created)}
+
 def delete_comment(request):
-    """DELETE /api/comments/{id} — delete a comment."""
-    cid = int(request.matchdict['id'])
-    c   = DBSession.query(Comment).get(cid)
-    if c is None:
-        request.response.status = 404
-        return {'error': 'Comment not found'}
+    """DELETE /api/comments/{id} — delete one of the token user's comments
+    and every reply below it."""
+    cid  = int(request.matchdict['id'])
+    user = request.identity
 
-    data    = request.json_body
-    user_id = data.get('user_id')
-    # ownership check
-    if c.user_id != user_id:
+    # cek kepemilikan + kunci baris dalam satu query ber-index
+    post_id = DBSession.query(Comment.post_id) \
+                       .filter(Comment.id == cid,
+                               Comment.user_id == user['id']) \
+                       .with_for_update().scalar()
+    if post_id is None:
+        if DBSession.query(Comment.id).filter_by(id=cid).first() is None:
+            request.response.status = 404
+            return {'error': 'Comment not found'}
         request.response.status = 403
         return {'error': "Forbidden: cannot delete others' comments"}
 
     try:
-        DBSession.delete(c)
-        DBSession.commit()
+        removed = drop_subtree(cid)
+        unindex_comment(cid)
+        DBSession.query(Comment) \
+                 .filter(Comment.id.in_(subtree(cid))) \
+                 .delete(synchronize_session=False)
+        bump(post_id, comment_count=-removed)
+        record(COMMENT, cid, post_id, deleted=True)
+        record(POST, post_id, post_id)
+        DBSession.flush()
+        invalidate(request, post_ns(post_id))
+        publish(request, 'comment.deleted',
+                {'id': cid, 'post_id': post_id, 'removed': removed})
         return {'status': 'deleted'}
     except Exception:
-        DBSession.rollback()
         request.response.status = 500
-        return {'error': 'Server error deleting comment'}
\ No newline at end of file
+        return {'error': 'Server error deleting comment'}
@@ -0,0 +1,40 @@
+# backend/pyramid_kampusku/views/notification.py
+
+from ..models      import DBSession, Notification
+from ..pagination  import (
+    InvalidPageParam, keyset_page, parse_cursor, parse_limit
+)
+from ..serializers import load_usernames
+
+def get_notifications(request):
+    """GET /api/notifications?limit=&cursor= — the token user's
+    notifications, newest first.
+
+    Written by the outbox worker (see outbox.py): ``reply`` when someone
+    comments on the user's post or replies to their comment, ``welcome``
+    after registering.
+    """
+    try:
+        limit  = parse_limit(request)
+        cursor = parse_cursor(request)
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return {'error': str(e)}
+
+    page, next_cursor = keyset_page(
+        DBSession.query(Notification)
+                 .filter(Notification.user_id == request.identity['id']),
+        Notification.created_at, Notification.id, cursor, limit
+    )
+    usernames = load_usernames({n.actor_id for n in page if n.actor_id})
+    return {
+        'notifications': [{
+            'id':         n.id,
+            'kind':       n.kind,
+            'actor':      usernames.get(n.actor_id),
+            'post_id':    n.post_id,
+            'comment_id': n.comment_id,
+            'created_at': n.created_at.isoformat(),
+        } for n in page],
+        'next_cursor': next_cursor
+    }
@@ -1,148 +1,308 @@
 # backend/pyramid_kampusku/views/post.py
 
-from pyramid.view     import view_config
 from pyramid.response import Response
-from ..models         import DBSession, Post, User
+from sqlalchemy       import update
+from ..models         import DBSession, Comment, Post, PostRank, Vote
+from ..pagination     import (
+    MAX_LIMIT, InvalidPageParam, decode_rank_cursor, keyset_page,
+    keyset_query, parse_cursor, parse_int_param, parse_limit, ranked_page
+)
+from ..ranking        import HOT, parse_sort
+from ..serializers    import (
+    COMMENT_FIELDS, COMPACT, cached_posts, compact_page, parse_shape
+)
+from ..batch          import InvalidBatch, create_posts, parse_items
+from ..counters       import drop_post, set_vote
+from ..cache          import invalidate, post_ns
+from ..etag           import make_etag, not_modified
+from ..events         import publish
+from ..changes        import (
+    POST, changes_since, head, is_pruned, record
+)
+from ..search         import index_post, unindex_post
+from ..outbox         import POST_CREATED, enqueue, enqueue_many
+from ..streaming      import (
+    STREAM_MAX_LIMIT, StreamedPage, stream_response, wants_stream
+)
 
-def serialize_comment(c):
-    """Recursively serialize a Comment and its replies."""
-    return {
-        'id':         c.id,
-        'username':   c.author.username,
-        'content':    c.content,
-        'created_at': c.created_at.isoformat(),
-        'replies':    sorted(
-            [serialize_comment(r) for r in c.replies],
-            key=lambda x: x['created_at']
+def get_posts(request):
+    """GET /api/posts?limit=&cursor=&sort=&stream=&shape= — one page of
+    posts with nested comments.
+
+    Paging is keyset-based on ``(created_at, id)``; pass the returned
+    ``next_cursor`` back as ``cursor`` to get the next page. ``sort=hot``
+    orders by the precomputed hot score instead, paging on ``(score,
+    id)`` (see ranking.py). With ``stream=1`` the page (up to
+    ``STREAM_MAX_LIMIT`` posts) is written in chunks as it is read; see
+    streaming.py. ``shape=compact`` returns authors in a side ``users``
+    map and comments as flat arrays (see serializers.py). Neither
+    ``sort=hot`` nor ``shape=compact`` is available in stream mode.
+    """
+    stream = wants_stream(request)
+    try:
+        limit  = parse_limit(request,
+                             maximum=STREAM_MAX_LIMIT if stream else MAX_LIMIT)
+        sort   = parse_sort(request)
+        shape  = parse_shape(request)
+        if sort == HOT:
+            token  = request.params.get('cursor')
+            cursor = decode_rank_cursor(token) if token else None
+        else:
+            cursor = parse_cursor(request)
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return {'error': str(e)}
+    if stream and (shape == COMPACT or sort == HOT):
+        request.response.status = 400
+        return {'error': '%s is not available with stream=1'
+                         % ('shape=compact' if shape == COMPACT else 'sort=hot')}
+
+    if sort == HOT:
+        query = DBSession.query(Post.id, Post.updated_at, PostRank.score) \
+                         .join(PostRank, PostRank.post_id == Post.id)
+        page, next_cursor = ranked_page(
+            query, PostRank.score, PostRank.post_id, cursor, limit
         )
-    }
+        return _feed_page(request, page, next_cursor, limit, shape, sort)
 
-@view_config(route_name='posts', renderer='json', request_method='GET')
-def get_posts(request):
-    """GET /api/posts — return all posts with nested comments."""
-    qs = DBSession.query(Post).order_by(Post.created_at.desc()).all()
-    out = []
-    for p in qs:
-        # top-level comments only (parent_id is None)
-        top = [c for c in p.comments if c.parent_id is None]
-        serialized = {
-            'id':         p.id,
-            'username':   p.author.username,
-            'content':    p.content,
-            'created_at': p.created_at.isoformat(),
-            'upvotes':    getattr(p, 'upvotes', 0),
-            'downvotes':  getattr(p, 'downvotes', 0),
-            'comments':   sorted(
-                [serialize_comment(c) for c in top],
-                key=lambda x: x['created_at']
+    query = DBSession.query(Post.id, Post.created_at, Post.updated_at)
+    if stream:
+        cache = request.cache
+
+        def produce(session):
+            page = StreamedPage(
+                keyset_query(query.with_session(session),
+                             Post.created_at, Post.id, cursor),
+                limit
             )
+            chunks = (cached_posts(cache, [(r.id, r.updated_at) for r in rows],
+                                    session)
+                      for rows in page)
+            return chunks, lambda: {'next_cursor': page.next_cursor}
+
+        return stream_response(request, 'posts', produce)
+
+    # query ringan (id, updated_at) lewat index keyset: cukup untuk ETag
+    # dan untuk tahu post mana yang ada di halaman ini
+    page, next_cursor = keyset_page(
+        query, Post.created_at, Post.id, cursor, limit
+    )
+    return _feed_page(request, page, next_cursor, limit, shape, sort)
+
+def _feed_page(request, page, next_cursor, limit, shape, sort):
+    versions = [(r.id, r.updated_at) for r in page]
+    resp = not_modified(request, make_etag('feed', limit, versions, next_cursor,
+                                           shape, sort))
+    if resp is not None:
+        return resp
+
+    posts = cached_posts(request.cache, versions, shape=shape)
+    if shape == COMPACT:
+        posts, users = compact_page(posts)
+        return {
+            'posts':          posts,
+            'users':          users,
+            'comment_fields': COMMENT_FIELDS,
+            'next_cursor':    next_cursor
         }
-        out.append(serialized)
-    return out
+    return {
+        'posts':       posts,
+        'next_cursor': next_cursor
+    }
 
-@view_config(route_name='posts', renderer='json', request_method='POST')
-def create_post(request):
-    """POST /api/posts — create a new post."""
-    # clear any pending TX
+def get_changes(request):
+    """GET /api/posts/changes?since=&limit= — posts and comments created,
+    edited or deleted after change sequence ``since``.
+
+    Without ``since`` only the current ``next_since`` is returned: load
+    the feed, then poll from there. ``reset: true`` means the log no
+    longer reaches back to ``since`` and the feed must be reloaded.
+    """
     try:
-        DBSession.rollback()
-    except:
-        pass
+        since = parse_int_param(request, 'since', None, 2 ** 63, minimum=0)
+        limit = parse_limit(request, default=MAX_LIMIT)
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return {'error': str(e)}
+
+    if since is None:
+        return {'changes': [], 'next_since': head(), 'more': False,
+                'reset': False}
+    if is_pruned(since):
+        return {'changes': [], 'next_since': head(), 'more': False,
+                'reset': True}
+    changes, next_since, more = changes_since(since, limit)
+    return {'changes': changes, 'next_since': next_since, 'more': more,
+            'reset': False}
 
+def create_post(request):
+    """POST /api/posts — create a new post as the token's user.
+
+    Only the post and its outbox job are written here; indexing, counters,
+    the change log and the SSE event follow from the worker (outbox.py).
+    """
     try:
         data = request.json_body
-        user = DBSession.query(User).get(data.get('user_id'))
-        if not user:
-            request.response.status = 404
-            return {'error': 'User not found'}
+        user = request.identity
 
-        p = Post(content=data.get('content', ''), author=user)
+        p = Post(content=data.get('content', ''), user_id=user['id'])
         DBSession.add(p)
         DBSession.flush()
-        DBSession.commit()
 
-        return {
+        out = {
             'id':         p.id,
-            'username':   user.username,
+            'username':   request.username,
             'content':    p.content,
             'created_at': p.created_at.isoformat(),
             'upvotes':    0,
             'downvotes':  0,
+            'comment_count': 0,
             'comments':   []
         }
+        enqueue(request, POST_CREATED, p.id,
+                {'id': p.id, 'user_id': user['id'], 'event': out})
+        return out
 
     except Exception:
-        DBSession.rollback()
         request.response.status = 500
         return {'error': 'Server error creating post'}
 
-@view_config(route_name='post', renderer='json', request_method='PUT')
-def update_post(request):
-    """PUT /api/posts/{id} — update an existing post."""
-    # rollback pending TX
+def create_posts_batch(request):
+    """POST /api/posts/batch — body {posts: [{content}, ...]}; creates up to
+    ``BATCH_MAX_ITEMS`` posts as the token's user in one transaction.
+
+    Returns one result per item, in order: ``{index, id}`` or ``{index,
+    error}``. The status is 400 only when no item could be created.
+    """
     try:
-        DBSession.rollback()
-    except:
-        pass
+        items = parse_items(request, 'posts')
+    except InvalidBatch as e:
+        request.response.status = 400
+        return {'error': str(e)}
+
+    user = request.identity
+    results, created = create_posts(user['id'], items)
+    # efek sampingnya sama dengan create_post: lewat worker outbox
+    enqueue_many(request, POST_CREATED, [
+        (id_, {'id': id_, 'user_id': user['id'], 'event': {
+            'id':         id_,
+            'username':   request.username,
+            'content':    content,
+            'created_at': created_at.isoformat(),
+            'upvotes':    0,
+            'downvotes':  0,
+            'comment_count': 0,
+            'comments':   []
+        }})
+        for _, id_, content, created_at in created
+    ])
+    if not created:
+        request.response.status = 400
+    return {'results': results, 'created': len(created),
+            'failed': len(items) - len(created)}
 
-    pid = int(request.matchdict['id'])
-    p   = DBSession.query(Post).get(pid)
-    if not p:
+def _not_owned(request, pid, action):
+    # write ber-guard tidak mengenai baris: bedakan "tidak ada" dari "bukan milikmu"
+    if DBSession.query(Post.id).filter_by(id=pid).first() is None:
         request.response.status = 404
         return {'error': 'Post not found'}
+    request.response.status = 403
+    return {'error': "Forbidden: cannot %s others' posts" % action}
 
-    data    = request.json_body
-    user_id = data.get('user_id')
-    # ownership check
-    if p.user_id != user_id:
-        request.response.status = 403
-        return {'error': "Forbidden: cannot edit others' posts"}
+def update_post(request):
+    """PUT /api/posts/{id} — update one of the token user's posts.
+
+    Ownership is checked by the UPDATE itself (``WHERE id = ? AND
+    user_id = ?``); only when it matches nothing is the post looked up to
+    tell 404 from 403.
+    """
+    pid  = int(request.matchdict['id'])
+    user = request.identity
+    data = request.json_body
 
     try:
-        p.content = data.get('content', p.content)
-        DBSession.flush()
-        DBSession.commit()
+        row = DBSession.execute(
+            update(Post)
+            .where(Post.id == pid, Post.user_id == user['id'])
+            .values(content=data.get('content', Post.content))
+            .returning(Post.content, Post.created_at, Post.upvotes,
+                       Post.downvotes, Post.comment_count),
+            execution_options={'synchronize_session': False}
+        ).first()
+        if row is None:
+            return _not_owned(request, pid, 'edit')
+
+        index_post(pid, row.content)
+        record(POST, pid, pid)
+        invalidate(request, post_ns(pid))
+        publish(request, 'post.updated', {'id': pid, 'content': row.content})
         return {
-            'id':         p.id,
-            'username':   p.author.username,
-            'content':    p.content,
-            'created_at': p.created_at.isoformat(),
-            'upvotes':    getattr(p, 'upvotes', 0),
-            'downvotes':  getattr(p, 'downvotes', 0),
+            'id':         pid,
+            'username':   request.username,
+            'content':    row.content,
+            'created_at': row.created_at.isoformat(),
+            'upvotes':    row.upvotes,
+            'downvotes':  row.downvotes,
+            'comment_count': row.comment_count,
             'comments':   []  # atau serialisasi ulang jika perlu
         }
     except Exception:
-        DBSession.rollback()
         request.response.status = 500
         return {'error': 'Server error updating post'}
 
-@view_config(route_name='post', renderer='json', request_method='DELETE')
 def delete_post(request):
-    """DELETE /api/posts/{id} — delete a post."""
-    # rollback pending TX
+    """DELETE /api/posts/{id} — delete one of the token user's posts with
+    its votes and comments, in bulk statements."""
+    pid  = int(request.matchdict['id'])
+    user = request.identity
+
+    # cek kepemilikan + kunci baris dalam satu query ber-index
+    upvotes = DBSession.query(Post.upvotes) \
+                       .filter(Post.id == pid, Post.user_id == user['id']) \
+                       .with_for_update().scalar()
+    if upvotes is None:
+        return _not_owned(request, pid, 'delete')
+
     try:
-        DBSession.rollback()
-    except:
-        pass
+        unindex_post(pid)
+        drop_post(pid, user['id'], upvotes)
+        for model in (Vote, Comment):
+            DBSession.query(model).filter(model.post_id == pid) \
+                     .delete(synchronize_session=False)
+        DBSession.query(Post).filter(Post.id == pid) \
+                 .delete(synchronize_session=False)
+        record(POST, pid, pid, deleted=True)
+        DBSession.flush()
+        invalidate(request, post_ns(pid))
+        publish(request, 'post.deleted', {'id': pid})
+        return {'status': 'deleted'}
+    except Exception:
+        request.response.status = 500
+        return {'error': 'Server error deleting post'}
+
+def vote_post(request):
+    """POST /api/posts/{id}/vote — body {value: 1 | -1 | 0}, as the
+    token's user."""
+    pid  = int(request.matchdict['id'])
+    data = request.json_body
+    value = data.get('value')
+    if value not in (1, -1, 0):
+        request.response.status = 400
+        return {'error': 'value must be 1, -1 or 0'}
 
-    pid = int(request.matchdict['id'])
-    p   = DBSession.query(Post).get(pid)
-    if not p:
+    if not DBSession.query(Post.id).filter_by(id=pid).first():
         request.response.status = 404
         return {'error': 'Post not found'}
 
-    data    = request.json_body
-    user_id = data.get('user_id')
-    # ownership check
-    if p.user_id != user_id:
-        request.response.status = 403
-        return {'error': "Forbidden: cannot delete others' posts"}
-
     try:
-        DBSession.delete(p)
-        DBSession.commit()
-        return {'status': 'deleted'}
+        set_vote(pid, request.identity['id'], value)
+        record(POST, pid, pid)
+        DBSession.flush()
+        upvotes, downvotes = DBSession.query(Post.upvotes, Post.downvotes) \
+                                      .filter_by(id=pid).one()
+        invalidate(request, post_ns(pid))
+        return {'id': pid, 'upvotes': upvotes, 'downvotes': downvotes,
+                'vote': value}
     except Exception:
-        DBSession.rollback()
         request.response.status = 500
-        return {'error': 'Server error deleting post'}
\ No newline at end of file
+        return {'error': 'Server error voting on post'}
@@ -0,0 +1,71 @@
+# backend/pyramid_kampusku/views/search.py
+
+from ..models     import DBSession, Comment, Post
+from ..pagination import (
+    InvalidPageParam, decode_offset, encode_offset, parse_limit
+)
+from ..search      import COMMENT, KINDS, POST, search
+from ..serializers import load_usernames
+
+# halaman yang lebih dalam dari ini jarang berguna dan makin mahal
+MAX_OFFSET = 1000
+
+def search_view(request):
+    """GET /api/search?q=&type=post|comment&limit=&cursor= — ranked
+    full-text search over posts and comments.
+
+    Results are ordered by relevance, so paging is by offset (hidden in
+    ``cursor``) and stops after ``MAX_OFFSET`` results.
+    """
+    q    = request.params.get('q', '').strip()
+    kind = request.params.get('type') or None
+    try:
+        if not q:
+            raise InvalidPageParam('q is required')
+        if kind is not None and kind not in KINDS:
+            raise InvalidPageParam('type must be post or comment')
+        limit  = parse_limit(request)
+        token  = request.params.get('cursor')
+        offset = decode_offset(token) if token else 0
+        if offset > MAX_OFFSET:
+            raise InvalidPageParam('cannot page past %d results' % MAX_OFFSET)
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return {'error': str(e)}
+
+    hits = search(q, kind, limit + 1, offset)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_offset(offset + limit)
+
+    # isi & penulis dibaca dari tabel aslinya: satu query per jenis
+    ids = {k: [i for hk, i, _ in hits if hk == k] for k in KINDS}
+    rows = {}
+    if ids[POST]:
+        for r in DBSession.query(Post.id, Post.user_id, Post.content,
+                                 Post.created_at) \
+                          .filter(Post.id.in_(ids[POST])):
+            rows[POST, r.id] = (r, r.id)
+    if ids[COMMENT]:
+        for r in DBSession.query(Comment.id, Comment.post_id, Comment.user_id,
+                                 Comment.content, Comment.created_at) \
+                          .filter(Comment.id.in_(ids[COMMENT])):
+            rows[COMMENT, r.id] = (r, r.post_id)
+    usernames = load_usernames({r.user_id for r, _ in rows.values()})
+
+    results = []
+    for k, ref_id, score in hits:
+        if (k, ref_id) not in rows:
+            continue
+        r, post_id = rows[k, ref_id]
+        results.append({
+            'type':       k,
+            'id':         r.id,
+            'post_id':    post_id,
+            'username':   usernames.get(r.user_id),
+            'content':    r.content,
+            'created_at': r.created_at.isoformat(),
+            'score':      score,
+        })
+    return {'results': results, 'next_cursor': next_cursor}
@@ -1,20 +1,31 @@
 # backend/pyramid_kampusku/views/user.py
 
 import logging
-from pyramid.view      import view_config
 from pyramid.response  import Response
-from ..models          import DBSession, User
+from ..models          import DBSession, Comment, Post, User
+from ..cache           import invalidate
+from ..etag            import make_etag, not_modified, touch_user_posts
+from ..hashing         import HasherBusy
+from ..outbox          import USER_REGISTERED, enqueue
+from ..pagination      import (
+    InvalidPageParam, keyset_page, parse_cursor, parse_limit
+)
+from ..serializers     import cached_posts
 
 log = logging.getLogger(__name__)
 
-@view_config(route_name='register', renderer='json', request_method='POST')
-def register(request):
-    # clear any pending transaction
-    try:
-        DBSession.rollback()
-    except:
-        pass
+def _session(request, u):
+    # dikembalikan register/login/update: data user + token Bearer baru
+    return {'id': u.id, 'username': u.username, 'email': u.email,
+            'token': request.registry.token_signer.issue(u.id)}
+
+def _hasher_busy(request):
+    # antrean hashing bcrypt penuh: minta client coba lagi nanti
+    request.response.status = 503
+    request.response.headers['Retry-After'] = str(request.hasher.retry_after)
+    return {'error': 'Server busy, please retry shortly'}
 
+def register(request):
     # parse JSON
     try:
         data = request.json_body
@@ -41,28 +52,22 @@ def register(request):
 
         # create & persist
         u = User(username=username, email=email)
-        u.set_password(pw)
+        u.set_password(pw, request.hasher)
         DBSession.add(u)
         DBSession.flush()
-        DBSession.commit()
+        enqueue(request, USER_REGISTERED, u.id, {'id': u.id})
 
-        return {'id': u.id, 'username': u.username, 'email': u.email}
+        return _session(request, u)
 
+    except HasherBusy:
+        return _hasher_busy(request)
     except Exception:
         log.exception("Error in register")
-        DBSession.rollback()
         request.response.status = 500
         return {'error': 'Server error during registration'}
 
 
-@view_config(route_name='login', renderer='json', request_method='POST')
 def login(request):
-    # clear any pending transaction
-    try:
-        DBSession.rollback()
-    except:
-        pass
-
     # parse JSON
     try:
         data = request.json_body
@@ -78,20 +83,27 @@ def login(request):
 
     try:
         u = DBSession.query(User).filter_by(username=username).first()
-        if not u or not u.check_password(pw):
+        if not u or not u.check_password(pw, request.hasher):
             request.response.status = 401
             return {'error': 'Invalid credentials'}
 
-        return {'id': u.id, 'username': u.username, 'email': u.email}
+        # cost factor berubah di konfigurasi: hash ulang selagi plaintext ada
+        if u.password_needs_rehash(request.hasher):
+            try:
+                u.set_password(pw, request.hasher)
+            except HasherBusy:
+                pass  # coba lagi di login berikutnya
 
+        return _session(request, u)
+
+    except HasherBusy:
+        return _hasher_busy(request)
     except Exception:
         log.exception("Error in login")
-        DBSession.rollback()
         request.response.status = 500
         return {'error': 'Server error during login'}
 
 
-@view_config(route_name='user', renderer='json', request_method='GET')
 def get_user(request):
     # GET /api/users/{id}
     uid = request.matchdict.get('id')
@@ -104,17 +116,94 @@ def get_user(request):
         request.response.status = 404
         return {'error': 'User not found'}
 
-    return {'id': u.id, 'username': u.username, 'email': u.email}
+    stats = {
+        'post_count':       u.post_count,
+        'comment_count':    u.comment_count,
+        'upvotes_received': u.upvotes_received,
+    }
+    resp = not_modified(request, make_etag(
+        'user', u.id, u.username, u.email, sorted(stats.items())
+    ))
+    if resp is not None:
+        return resp
+    return dict({'id': u.id, 'username': u.username, 'email': u.email},
+                **stats)
+
+
+def _page_params(request):
+    uid = request.matchdict.get('id')
+    try:
+        u = DBSession.query(User).get(int(uid))
+    except Exception:
+        u = None
+    if not u:
+        request.response.status = 404
+        return None, None, None, {'error': 'User not found'}
+    try:
+        return u, parse_limit(request), parse_cursor(request), None
+    except InvalidPageParam as e:
+        request.response.status = 400
+        return None, None, None, {'error': str(e)}
+
+
+def get_user_posts(request):
+    """GET /api/users/{id}/posts?limit=&cursor= — the user's posts, newest
+    first, keyset-paged on ``(user_id, created_at, id)``."""
+    u, limit, cursor, error = _page_params(request)
+    if error:
+        return error
+
+    page, next_cursor = keyset_page(
+        DBSession.query(Post.id, Post.created_at, Post.updated_at)
+                 .filter(Post.user_id == u.id),
+        Post.created_at, Post.id, cursor, limit
+    )
+    versions = [(r.id, r.updated_at) for r in page]
+    resp = not_modified(request, make_etag(
+        'user_posts', u.id, limit, versions, next_cursor
+    ))
+    if resp is not None:
+        return resp
+    return {
+        'posts':       cached_posts(request.cache, versions),
+        'next_cursor': next_cursor
+    }
+
+
+def get_user_comments(request):
+    """GET /api/users/{id}/comments?limit=&cursor= — the user's comments,
+    newest first, without replies."""
+    u, limit, cursor, error = _page_params(request)
+    if error:
+        return error
+
+    page, next_cursor = keyset_page(
+        DBSession.query(Comment.id, Comment.post_id, Comment.parent_id,
+                        Comment.content, Comment.created_at,
+                        Comment.updated_at)
+                 .filter(Comment.user_id == u.id),
+        Comment.created_at, Comment.id, cursor, limit
+    )
+    resp = not_modified(request, make_etag(
+        'user_comments', u.id, u.username, limit,
+        [(r.id, r.updated_at) for r in page], next_cursor
+    ))
+    if resp is not None:
+        return resp
+    return {
+        'comments': [{
+            'id':         r.id,
+            'post_id':    r.post_id,
+            'parent_id':  r.parent_id,
+            'username':   u.username,
+            'content':    r.content,
+            'created_at': r.created_at.isoformat(),
+        } for r in page],
+        'next_cursor': next_cursor
+    }
 
 
-@view_config(route_name='user', renderer='json', request_method='PUT')
 def update_user(request):
-    # clear any pending transaction
-    try:
-        DBSession.rollback()
-    except:
-        pass
-
     # parse JSON
     try:
         data = request.json_body
@@ -123,11 +212,10 @@ def update_user(request):
         return {'error': 'Invalid JSON body'}
 
     uid = request.matchdict.get('id')
-    try:
-        u = DBSession.query(User).get(int(uid))
-    except Exception:
-        u = None
-
+    if uid != str(request.identity['id']):
+        request.response.status = 403
+        return {'error': "Forbidden: cannot edit other users"}
+    u = DBSession.query(User).get(request.identity['id'])
     if not u:
         request.response.status = 404
         return {'error': 'User not found'}
@@ -152,10 +240,11 @@ def update_user(request):
         u.username = new_username
         u.email    = new_email
         DBSession.flush()
-        DBSession.commit()
-        return {'id': u.id, 'username': u.username, 'email': u.email}
+        touch_user_posts(u.id)
+        # username tertanam di semua entry feed/thread yang di-cache
+        invalidate(request, 'all')
+        return _session(request, u)
     except Exception:
         log.exception("Error in update_user")
-        DBSession.rollback()
         request.response.status = 500
         return {'error': 'Server error during update'}
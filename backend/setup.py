@@ -9,14 +9,44 @@ setup(
     "pyramid",
     "pyramid_jinja2",
     "pyramid_debugtoolbar",
+    "pyramid_tm",
     "sqlalchemy",
+    "zope.sqlalchemy",
     "psycopg2-binary",
     "bcrypt",
     "waitress",
   ],
+  extras_require={
+    "dev": [
+      "WebTest",
+    ],
+    # renderer JSON orjson + Content-Encoding br (lihat renderers.py, compression.py)
+    "fast": [
+      "orjson",
+      "brotli",
+    ],
+    # entry point ASGI + driver database async (lihat asgi.py)
+    "asgi": [
+      "uvicorn[standard]",
+      "a2wsgi",
+      "aiosqlite",
+      "asyncpg",
+      "greenlet",
+    ],
+  },
   entry_points={
     "paste.app_factory": [
-      "main = pyramid_kampusku:main"
+      "main = pyramid_kampusku:main",
+      "production = pyramid_kampusku:production_main",
+    ],
+    "console_scripts": [
+      "kampusku_reconcile_counters = pyramid_kampusku.scripts.reconcile_counters:main",
+      "kampusku_rebuild_search = pyramid_kampusku.scripts.rebuild_search:main",
+      "kampusku_prune_changes = pyramid_kampusku.scripts.prune_changes:main",
+      "kampusku_outbox_worker = pyramid_kampusku.scripts.outbox_worker:main",
+      "kampusku_refresh_hot = pyramid_kampusku.scripts.refresh_hot:main",
+      "kampusku_serve = pyramid_kampusku.scripts.serve:main",
+      "kampusku_serve_asgi = pyramid_kampusku.scripts.serve_asgi:main",
     ]
   }
 )
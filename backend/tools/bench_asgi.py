@@ -0,0 +1,293 @@
+# backend/tools/bench_asgi.py
+"""Open-connection capacity: waitress (WSGI) vs the ASGI entry point.
+
+Seeds a throwaway database, then serves the real app from a child
+process, once under waitress (``--threads`` threads, waitress's own
+``--connection-limit``) and once under uvicorn with
+``pyramid_kampusku.asgi`` (feed, comment and profile reads through the
+async driver). For each, an asyncio client opens ``--connections``
+keep-alive connections at once and has every connection loop over
+
+    GET /api/posts?limit=20
+    GET /api/posts/{id}/comments   (random post)
+    GET /api/users/{id}            (random user)
+
+pausing ``--think-ms`` between requests (an open browser tab, not a
+benchmark loop), for ``--duration`` seconds. Reported per server:
+
+    open       connections the client managed to open
+    served     connections that got at least one response
+    requests   responses received (status < 400), and req/s
+    errors     status >= 400, resets and requests that took longer
+               than ``--timeout`` seconds (the connection is dropped)
+    p50, p99   latency of the received responses
+
+Waitress stops accepting once ``--connection-limit`` connections are
+open; the rest wait in the listen backlog and time out.
+
+    python -m tools.bench_asgi
+    python -m tools.bench_asgi --connections 2000 --think-ms 20000
+    python -m tools.bench_asgi --servers asgi --url postgresql://.../kampusku_bench
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import sys
+import tempfile
+import time
+import warnings
+
+from pyramid_kampusku import main as wsgi_main
+
+from .bench_login import percentile
+from .common import make_app, seed
+
+SERVERS = ('waitress', 'asgi')
+
+APP_SETTINGS = {
+    'auth.secret': 'kampusku-tools',
+    'cache.backend': 'none',
+    'metrics.slow_request_ms': '0',
+}
+
+
+def raise_fd_limit(wanted):
+    """Raise RLIMIT_NOFILE towards ``wanted``; returns the new soft limit."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+
+def listen(backlog):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(backlog)
+    return sock
+
+
+def serve(kind, url, sock, args):
+    """Child process: build the app from scratch and serve ``sock``."""
+    warnings.simplefilter('ignore')
+    settings = dict(APP_SETTINGS, **{'sqlalchemy.url': url,
+                                     'hot.refresh': 'none',
+                                     'outbox.worker': 'none'})
+    if kind == 'waitress':
+        from waitress.server import create_server
+        # "connection limit" dan "task queue depth": memang itu bebannya
+        logging.getLogger('waitress').setLevel(logging.ERROR)
+        create_server(wsgi_main({}, **settings), sockets=[sock],
+                      threads=args.threads,
+                      connection_limit=args.connection_limit).run()
+        return
+
+    import uvicorn
+    from pyramid_kampusku.asgi import main as asgi_main
+    settings['asgi.wsgi_threads'] = str(args.threads)
+    config = uvicorn.Config(asgi_main({}, **settings), log_level='error',
+                            access_log=False, timeout_keep_alive=60)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.opened    = 0
+        self.served    = 0
+        self.latencies = []
+        self.errors    = 0
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def connection(i, port, ctx, stats, args, deadline, gate):
+    rnd = random.Random(i)
+    async with gate:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection('127.0.0.1', port), args.timeout)
+        except (OSError, asyncio.TimeoutError):
+            stats.errors += 1
+            return
+    stats.opened += 1
+    served = False
+    # mulai tersebar supaya tidak semua koneksi mengirim bersamaan
+    await asyncio.sleep(rnd.uniform(0, args.think_ms / 1000.0))
+    try:
+        while time.perf_counter() < deadline:
+            pick = rnd.random()
+            if pick < 0.4:
+                path = '/api/posts?limit=20'
+            elif pick < 0.8:
+                path = '/api/posts/%d/comments' % rnd.randint(1, ctx['posts'])
+            else:
+                path = '/api/users/%d' % rnd.randint(1, ctx['users'])
+            t0 = time.perf_counter()
+            writer.write(b'GET %s HTTP/1.1\r\nHost: bench\r\n\r\n'
+                         % path.encode())
+            try:
+                status = await asyncio.wait_for(read_response(reader),
+                                                args.timeout)
+            except (OSError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError):
+                stats.errors += 1
+                return
+            if status >= 400:
+                stats.errors += 1
+            else:
+                stats.latencies.append(time.perf_counter() - t0)
+                if not served:
+                    served = True
+                    stats.served += 1
+            await asyncio.sleep(args.think_ms / 1000.0)
+    finally:
+        writer.close()
+
+
+async def drive(port, ctx, args):
+    stats    = Stats()
+    gate     = asyncio.Semaphore(args.connect_rate)
+    deadline = time.perf_counter() + args.duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*[
+        connection(i, port, ctx, stats, args, deadline, gate)
+        for i in range(args.connections)
+    ])
+    return stats, time.perf_counter() - t0
+
+
+def wait_ready(port, timeout=30):
+    """Block until the server answers one request."""
+    stop = time.time() + timeout
+    while time.time() < stop:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+                s.sendall(b'GET /api/users/1 HTTP/1.1\r\nHost: bench\r\n'
+                          b'Connection: close\r\n\r\n')
+                if s.recv(16).startswith(b'HTTP/1.1'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(kind, url, ctx, args):
+    sock = listen(args.backlog)
+    port = sock.getsockname()[1]
+    proc = multiprocessing.get_context('fork').Process(
+        target=serve, args=(kind, url, sock, args), daemon=True)
+    proc.start()
+    sock.close()
+    try:
+        wait_ready(port)
+        stats, elapsed = asyncio.run(drive(port, ctx, args))
+    finally:
+        proc.terminate()
+        proc.join()
+    lat = stats.latencies
+    return {
+        'open':     stats.opened,
+        'served':   stats.served,
+        'requests': len(lat),
+        'errors':   stats.errors,
+        'rps':      len(lat) / elapsed,
+        'p50_ms':   percentile(lat, 50) * 1000 if lat else None,
+        'p99_ms':   percentile(lat, 99) * 1000 if lat else None,
+    }
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: SQLite temp file)')
+    parser.add_argument('--servers', default=','.join(SERVERS),
+                        help='comma-separated subset of ' + ', '.join(SERVERS))
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--comments-per-post', type=int, default=10)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--think-ms', type=float, default=10000,
+                        help='pause between requests on one connection')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--timeout', type=float, default=10,
+                        help='seconds before a request counts as an error')
+    parser.add_argument('--connect-rate', type=int, default=200,
+                        help='connection attempts in flight at once')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='waitress threads (and asgi.wsgi_threads)')
+    parser.add_argument('--connection-limit', type=int, default=100,
+                        help='waitress connection_limit (waitress default 100)')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--output', help='write the results as JSON here')
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    servers = [s.strip() for s in args.servers.split(',') if s.strip()]
+    unknown = set(servers) - set(SERVERS)
+    if unknown:
+        parser.error('unknown server(s): %s' % ', '.join(sorted(unknown)))
+    limit = raise_fd_limit(2 * args.connections + 256)
+    if limit < 2 * args.connections + 64:
+        print('warning: open file limit %d is low for %d connections'
+              % (limit, args.connections))
+
+    path = None
+    url  = args.url
+    if not url:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        url = 'sqlite:///' + path
+    _, engine = make_app(url, **APP_SETTINGS)
+    seed(users=args.users, posts=args.posts,
+         comments_per_post=args.comments_per_post)
+    # proses server membuka koneksinya sendiri setelah fork
+    engine.dispose()
+    ctx = {'posts': args.posts, 'users': args.users}
+
+    print('%d connections, %g ms think time, %g s'
+          % (args.connections, args.think_ms, args.duration))
+    results = {}
+    try:
+        for kind in servers:
+            results[kind] = r = run(kind, url, ctx, args)
+            print('%-9s open %5d  served %5d  %7d requests %8.1f req/s  '
+                  'p50 %s  p99 %s  %d errors'
+                  % (kind, r['open'], r['served'], r['requests'], r['rps'],
+                     _ms(r['p50_ms']), _ms(r['p99_ms']), r['errors']))
+    finally:
+        if path:
+            os.remove(path)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2,
+                      sort_keys=True)
+    return 0
+
+
+def _ms(value):
+    return '-' if value is None else '%.1f ms' % value
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# backend/tools/bench_batch.py
+"""Bulk write throughput: one request per item vs. the batch endpoints.
+
+Creates ``--items`` posts and then as many comments through the real app,
+first with POST /api/posts and /api/posts/{id}/comments (one request and
+one commit per item), then with POST /api/posts/batch and
+/api/comments/batch in batches of ``--batch-size``. Exits 1 when the
+batch path is less than ``--min-speedup`` times faster, or when it
+leaves different side effects than the single path (checked first: a
+reply through each path must bump ``comment_count`` and notify the post
+author once the outbox worker ran).
+
+    python -m tools.bench_batch --items 2000
+    python -m tools.bench_batch --url postgresql://.../kampusku_bench
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+from webtest import TestApp
+
+from pyramid_kampusku.batch import BATCH_MAX_ITEMS
+
+from .common import make_app, seed
+
+
+def single(client, n, post_ids):
+    for i in range(n):
+        client.post_json('/api/posts', {'content': 'single post %d' % i})
+    for i in range(n):
+        client.post_json('/api/posts/%d/comments' % post_ids[i % len(post_ids)],
+                         {'content': 'single comment %d' % i})
+
+
+def batched(client, n, post_ids, size):
+    for start in range(0, n, size):
+        client.post_json('/api/posts/batch', {'posts': [
+            {'content': 'batch post %d' % i}
+            for i in range(start, min(n, start + size))
+        ]})
+    for start in range(0, n, size):
+        client.post_json('/api/comments/batch', {'comments': [
+            {'post_id': post_ids[i % len(post_ids)],
+             'content': 'batch comment %d' % i}
+            for i in range(start, min(n, start + size))
+        ]})
+
+
+def check_parity():
+    """Reply once through POST /api/posts/{id}/comments and once through
+    /api/comments/batch; returns ``(comment_count, reply notifications)``
+    seen by the post author (both should be 2)."""
+    app, engine = make_app(**{'cache.backend': 'none'})
+    seed(users=2, posts=0, comments_per_post=0)
+    signer  = app.registry.token_signer
+    author  = TestApp(app)
+    replier = TestApp(app)
+    author.authorization  = ('Bearer', signer.issue(1))
+    replier.authorization = ('Bearer', signer.issue(2))
+
+    post_id = author.post_json('/api/posts', {'content': 'parity'}).json['id']
+    replier.post_json('/api/posts/%d/comments' % post_id, {'content': 'single'})
+    replier.post_json('/api/comments/batch', {'comments': [
+        {'post_id': post_id, 'content': 'batch'}
+    ]})
+    app.registry.outbox.drain()
+
+    count = author.get('/api/posts').json['posts'][0]['comment_count']
+    notes = author.get('/api/notifications').json['notifications']
+    engine.dispose()
+    return count, sum(1 for n in notes if n['kind'] == 'reply')
+
+
+def run(url, mode, args):
+    app, engine = make_app(url, **{'cache.backend': 'none'})
+    seed(users=1, posts=20, comments_per_post=0)
+    client = TestApp(app)
+    client.authorization = ('Bearer',
+                            app.registry.token_signer.issue(1))
+    post_ids = [p['id'] for p in
+                client.get('/api/posts', {'limit': 20}).json['posts']]
+
+    t0 = time.perf_counter()
+    if mode == 'single':
+        single(client, args.items, post_ids)
+    else:
+        batched(client, args.items, post_ids, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    engine.dispose()
+    return 2 * args.items / elapsed
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: SQLite temp file)')
+    parser.add_argument('--items', type=int, default=2000,
+                        help='posts, and again comments, to create per mode')
+    parser.add_argument('--batch-size', type=int, default=BATCH_MAX_ITEMS)
+    parser.add_argument('--min-speedup', type=float, default=10)
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    count, replies = check_parity()
+    print('parity  comment_count %d, reply notifications %d  (%s)'
+          % (count, replies, 'ok' if (count, replies) == (2, 2) else 'FAIL'))
+    if (count, replies) != (2, 2):
+        return 1
+
+    rates = {}
+    for mode in ('single', 'batch'):
+        path = None
+        url  = args.url
+        if not url:
+            fd, path = tempfile.mkstemp(suffix='.db')
+            os.close(fd)
+            url = 'sqlite:///' + path
+        rates[mode] = run(url, mode, args)
+        if path:
+            os.remove(path)
+        print('%-7s %10.1f items/s' % (mode, rates[mode]))
+
+    speedup = rates['batch'] / rates['single']
+    ok = speedup >= args.min_speedup
+    print('speedup %9.1fx  (%s, need >= %gx)'
+          % (speedup, 'ok' if ok else 'FAIL', args.min_speedup))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
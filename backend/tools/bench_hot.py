@@ -0,0 +1,239 @@
+# backend/tools/bench_hot.py
+"""Cost of the "hot" feed: rebuild, incremental refresh and reads.
+
+Bulk-loads ``--posts`` posts and ``--comments`` comments (1M by default)
+spread over ``--days`` days, uniformly or, with ``--shape skewed``, by a
+Zipf law so a few posts hold most comments. Then measures:
+
+    rebuild      computing every post's score (ranking.rebuild)
+    refresh      the incremental refresh after ``--new-comments`` new
+                 comments and ``--new-votes`` votes, picked with the same
+                 distribution as the seed, read from the change log
+    hot page     GET /api/posts?sort=hot&limit=20 through the real app
+                 (and sort=new for comparison), cache off: this includes
+                 serializing the comment trees of the top posts
+    top 20 ids   the ranking part of that page, read from post_ranks
+    naive ids    the same ranking computed per request by joining posts
+                 to comments (what the ranking table replaces)
+
+Exits 1 when the incremental refresh takes longer than
+``--max-refresh-seconds``.
+
+    python -m tools.bench_hot
+    python -m tools.bench_hot --shape skewed
+    python -m tools.bench_hot --url postgresql://.../kampusku_bench
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+import transaction
+from sqlalchemy import insert, text
+from webtest import TestApp
+
+from pyramid_kampusku import ranking
+from pyramid_kampusku.changes import COMMENT, POST
+from pyramid_kampusku.models import DBSession, Change, Comment, Post, User
+
+from .bench_login import percentile
+from .common import make_app
+
+CHUNK = 50000
+
+# peluruhan mirip ranking.Scorer, dihitung SQL per request (hiperbolik,
+# bukan 2**x: SQLite tidak selalu punya fungsi matematika)
+NAIVE_SQL = """
+SELECT p.id
+FROM posts p LEFT JOIN comments c ON c.post_id = p.id
+GROUP BY p.id
+ORDER BY SUM(CASE WHEN c.id IS NULL THEN 0
+                  ELSE 1.0 / (1 + {age} / :half_life) END) DESC, p.id DESC
+LIMIT 20
+"""
+
+RANKED_SQL = """
+SELECT p.id
+FROM posts p JOIN post_ranks r ON r.post_id = p.id
+ORDER BY r.score DESC, r.post_id DESC
+LIMIT 20
+"""
+
+AGE_HOURS = {
+    'postgresql': "EXTRACT(EPOCH FROM (CAST(:now AS timestamp) - c.created_at)) / 3600",
+    'sqlite':     "(julianday(:now) - julianday(c.created_at)) * 24",
+}
+
+
+def picker(rnd, posts, shape):
+    """Function returning a random post id, uniform or Zipf-weighted."""
+    ids = list(range(1, posts + 1))
+    if shape == 'uniform':
+        return lambda: rnd.randint(1, posts)
+    cum, total = [], 0.0
+    for i in ids:
+        total += 1.0 / i
+        cum.append(total)
+    return lambda: rnd.choices(ids, cum_weights=cum)[0]
+
+
+def bulk_seed(engine, args, now):
+    """Insert users, posts and comments with multi-row INSERTs."""
+    rnd   = random.Random(1)
+    start = now - datetime.timedelta(days=args.days)
+    span  = args.days * 86400
+
+    def ts():
+        return start + datetime.timedelta(seconds=rnd.uniform(0, span))
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'username': 'user%d' % i, 'email': 'user%d@example.com' % i,
+             'password': 'x' * 60}
+            for i in range(args.users)
+        ])
+        posts = [{'content': 'post', 'user_id': rnd.randint(1, args.users),
+                  'created_at': ts(), 'upvotes': rnd.choice((0, 0, 1, 3, 10)),
+                  'downvotes': rnd.choice((0, 0, 1))}
+                 for _ in range(args.posts)]
+        conn.execute(insert(Post), posts)
+
+        pick = picker(rnd, args.posts, args.shape)
+        done = 0
+        while done < args.comments:
+            n = min(CHUNK, args.comments - done)
+            rows = []
+            for _ in range(n):
+                post_id = pick()
+                created = max(ts(), posts[post_id - 1]['created_at'])
+                rows.append({'content': 'comment', 'post_id': post_id,
+                             'user_id': rnd.randint(1, args.users),
+                             'created_at': created})
+            conn.execute(insert(Comment), rows)
+            done += n
+    return pick
+
+
+def new_activity(engine, args, pick, now):
+    """Comments and votes written after the last refresh, logged in the
+    change log the way the outbox worker and vote view do."""
+    rnd = random.Random(2)
+    with engine.begin() as conn:
+        comments = [{'content': 'new', 'post_id': pick(),
+                     'user_id': rnd.randint(1, args.users), 'created_at': now}
+                    for _ in range(args.new_comments)]
+        conn.execute(insert(Comment), comments)
+        changes = [{'kind': COMMENT, 'ref_id': 0, 'post_id': c['post_id'],
+                    'deleted': False, 'created_at': now} for c in comments]
+        for _ in range(args.new_votes):
+            post_id = pick()
+            conn.execute(text('UPDATE posts SET upvotes = upvotes + 1 '
+                              'WHERE id = :id'), {'id': post_id})
+            changes.append({'kind': POST, 'ref_id': post_id,
+                            'post_id': post_id, 'deleted': False,
+                            'created_at': now})
+        conn.execute(insert(Change), changes)
+    return len({c['post_id'] for c in changes})
+
+
+def timed(fn, n=1):
+    """``(result of the last call, seconds per call)``."""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        result = fn()
+    return result, (time.perf_counter() - t0) / n
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: SQLite temp file)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--shape', choices=('uniform', 'skewed'),
+                        default='uniform')
+    parser.add_argument('--new-comments', type=int, default=1000)
+    parser.add_argument('--new-votes', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50,
+                        help='measured hot page requests')
+    parser.add_argument('--max-refresh-seconds', type=float, default=2.0)
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    path = None
+    url  = args.url
+    if not url:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        url = 'sqlite:///' + path
+
+    app, engine = make_app(url, **{'cache.backend': 'none',
+                                   'metrics.slow_request_ms': '0'})
+    refresher = app.registry.hot_refresher
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    pick, seeded = timed(lambda: bulk_seed(engine, args, now))
+    print('seed         %8.2f s    %d posts, %d comments (%s)'
+          % (seeded, args.posts, args.comments, args.shape))
+
+    ranked, took = timed(refresher.rebuild)
+    print('rebuild      %8.2f s    %d posts ranked' % (took, ranked))
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+
+    touched = new_activity(engine, args, pick, now)
+    # change baru harus "mengendap" dulu, lihat ranking.refresh
+    later = now + datetime.timedelta(seconds=60)
+
+    def refresh():
+        try:
+            with transaction.manager:
+                return ranking.refresh(refresher.scorer, now=later)
+        finally:
+            DBSession.remove()
+
+    (rescored, rebuilt), refresh_took = timed(refresh)
+    assert not rebuilt and rescored == touched, (rescored, touched)
+    print('refresh      %8.3f s    %d new comments + %d votes, %d posts rescored'
+          % (refresh_took, args.new_comments, args.new_votes, rescored))
+
+    client = TestApp(app)
+    for sort in ('hot', 'new'):
+        latencies = []
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            client.get('/api/posts', {'sort': sort, 'limit': 20})
+            latencies.append(time.perf_counter() - t0)
+        print('%s page     %8.2f ms   p50 (p99 %.2f ms), with comment trees'
+              % (sort, percentile(latencies, 50) * 1000,
+                 percentile(latencies, 99) * 1000))
+
+    ranked_sql = text(RANKED_SQL)
+    naive = text(NAIVE_SQL.format(age=AGE_HOURS[engine.dialect.name]))
+    with engine.connect() as conn:
+        _, ranked_took = timed(lambda: conn.execute(ranked_sql).fetchall(),
+                               n=args.requests)
+        _, naive_took = timed(lambda: conn.execute(naive, {
+            'now': later, 'half_life': refresher.scorer.half_life / 3600,
+        }).fetchall(), n=3)
+    print('top 20 ids   %8.2f ms   from post_ranks' % (ranked_took * 1000))
+    print('naive ids    %8.2f ms   ranking computed per request'
+          % (naive_took * 1000))
+
+    engine.dispose()
+    if path:
+        os.remove(path)
+
+    ok = refresh_took <= args.max_refresh_seconds
+    print('incremental refresh %.3f s (%s, need <= %g s)'
+          % (refresh_took, 'ok' if ok else 'FAIL', args.max_refresh_seconds))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
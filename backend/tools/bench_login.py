@@ -0,0 +1,115 @@
+# backend/tools/bench_login.py
+"""Login throughput with bcrypt inline vs. in the hashing process pool.
+
+Runs the real app in-process with ``--threads`` request threads (like
+waitress) hammering POST /api/login, while one extra thread measures the
+latency of a cheap GET /api/users/{id} that has to share the process.
+
+    python -m tools.bench_login --rounds 12 --threads 8 --seconds 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+import transaction
+from webtest import TestApp
+
+from pyramid_kampusku.hashing import InlineHasher
+from pyramid_kampusku.models import DBSession, User
+
+from .common import make_app
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def run(workers, args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app, engine = make_app('sqlite:///' + path, **{
+        'bcrypt.rounds':      str(args.rounds),
+        'bcrypt.workers':     str(workers),
+        'bcrypt.max_pending': str(args.threads),
+    })
+    hashed = InlineHasher(args.rounds).hash('secret')
+    with transaction.manager:
+        DBSession.add_all([User(username='u%d' % i, email='u%d@x' % i,
+                                _pw=hashed)
+                           for i in range(args.threads)])
+    DBSession.remove()
+    # start the pool's worker processes before the clock runs
+    for _ in range(workers):
+        app.registry.hasher.check('secret', hashed)
+
+    stop   = time.monotonic() + args.seconds
+    logins = []
+    busy   = []
+    reads  = []
+
+    def login_loop(i):
+        client = TestApp(app)
+        while time.monotonic() < stop:
+            r = client.post_json('/api/login',
+                                 {'username': 'u%d' % i, 'password': 'secret'},
+                                 expect_errors=True)
+            (logins if r.status_int == 200 else busy).append(1)
+        DBSession.remove()
+
+    def read_loop():
+        client = TestApp(app)
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            client.get('/api/users/1')
+            reads.append(time.perf_counter() - t0)
+            time.sleep(0.01)
+        DBSession.remove()
+
+    threads = [threading.Thread(target=login_loop, args=(i,))
+               for i in range(args.threads)]
+    threads.append(threading.Thread(target=read_loop))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    app.registry.hasher.shutdown()
+    engine.dispose()
+    os.remove(path)
+    return {
+        'mode':      'pool(%d)' % workers if workers else 'inline',
+        'login/s':   len(logins) / args.seconds,
+        '503':       len(busy),
+        'get p50ms': statistics.median(reads) * 1000 if reads else float('nan'),
+        'get p99ms': percentile(reads, 99) * 1000,
+    }
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds',  type=int, default=12)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    for workers in (0, args.workers):
+        r = run(workers, args)
+        print('%-10s %8.1f login/s  %4d x 503  GET p50 %7.1f ms  p99 %7.1f ms'
+              % (r['mode'], r['login/s'], r['503'], r['get p50ms'],
+                 r['get p99ms']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
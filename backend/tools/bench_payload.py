@@ -0,0 +1,111 @@
+# backend/tools/bench_payload.py
+"""Payload size and CPU per request of GET /api/posts by response format.
+
+Runs the feed (``--limit`` posts with their comment trees) through the
+real app in-process for every combination of JSON renderer (``stdlib``,
+``orjson`` if installed), response shape (``full``, ``compact``) and
+``Accept-Encoding`` (identity, gzip, br if installed), with the cache
+off so every request serializes. Reports bytes on the wire, CPU time
+per request and the renderer's share of it (from metrics.py). Exits 1
+when compact + gzip is not at least ``--min-reduction`` times smaller
+than the full shape uncompressed.
+
+    python -m tools.bench_payload --shape deep
+    python -m tools.bench_payload --url postgresql://.../kampusku_bench
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+from webob import Request
+
+from pyramid_kampusku.compression import brotli_module
+from pyramid_kampusku.renderers import orjson_serializer
+
+from .common import SHAPES, make_app, seed
+
+
+def available_renderers():
+    try:
+        orjson_serializer()
+    except ImportError:
+        return ['stdlib']
+    return ['stdlib', 'orjson']
+
+
+def available_encodings():
+    return ['identity', 'gzip'] + (['br'] if brotli_module() else [])
+
+
+def measure(app, path, encoding, n):
+    """``(bytes, cpu seconds per request, serialize seconds per request)``."""
+    headers = {} if encoding == 'identity' else {'Accept-Encoding': encoding}
+    metrics = app.registry.metrics
+    before  = sum(m.serialize_time for _, m in metrics.snapshot())
+    size    = None
+    t0 = time.process_time()
+    for _ in range(n):
+        resp = Request.blank(path, headers=headers).get_response(app)
+        assert resp.status_int == 200, resp.status
+        size = len(resp.body)
+    cpu   = (time.process_time() - t0) / n
+    after = sum(m.serialize_time for _, m in metrics.snapshot())
+    return size, cpu, (after - before) / n
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: SQLite temp file)')
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--comments-per-post', type=int, default=20)
+    parser.add_argument('--shape', dest='seed_shape', choices=SHAPES,
+                        default='random', help='seed shape, see tools.common')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='measured requests per combination')
+    parser.add_argument('--min-reduction', type=float, default=5)
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    results = {}
+    for renderer in available_renderers():
+        path = None
+        url  = args.url
+        if not url:
+            fd, path = tempfile.mkstemp(suffix='.db')
+            os.close(fd)
+            url = 'sqlite:///' + path
+        app, engine = make_app(url, **{
+            'cache.backend': 'none',
+            'json.renderer': renderer,
+            'metrics.slow_request_ms': '0',
+        })
+        seed(users=50, posts=args.posts,
+             comments_per_post=args.comments_per_post, shape=args.seed_shape)
+        for shape in ('full', 'compact'):
+            feed = '/api/posts?limit=%d&shape=%s' % (args.limit, shape)
+            measure(app, feed, 'identity', 5)   # warmup
+            for encoding in available_encodings():
+                key = (renderer, shape, encoding)
+                results[key] = r = measure(app, feed, encoding, args.requests)
+                print('%-7s %-8s %-9s %9d bytes  %7.2f ms cpu  %6.2f ms json'
+                      % (key + (r[0], r[1] * 1000, r[2] * 1000)))
+        engine.dispose()
+        if path:
+            os.remove(path)
+
+    base = results[('stdlib', 'full', 'identity')][0]
+    best = results[('stdlib', 'compact', 'gzip')][0]
+    reduction = base / float(best)
+    ok = reduction >= args.min_reduction
+    print('compact+gzip is %.1fx smaller than full  (%s, need >= %gx)'
+          % (reduction, 'ok' if ok else 'FAIL', args.min_reduction))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
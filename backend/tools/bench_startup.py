@@ -0,0 +1,275 @@
+# backend/tools/bench_startup.py
+"""Startup time of the app factories and memory per worker process.
+
+Part 1 runs each app factory (``main``, ``production_main``) ``--runs``
+times in a fresh interpreter and reports the median of
+
+    import      ``import pyramid_kampusku``
+    factory     calling the factory (config, views, make_wsgi_app)
+    rss         resident memory of that process afterwards
+    modules     entries in ``sys.modules`` (and whether jinja2 / bcrypt
+                were imported)
+
+Part 2 seeds a SQLite database and starts ``kampusku_serve`` with
+``--workers`` waitress workers, once preloaded (app loaded in the master,
+then fork) and once with ``--no-preload`` (each worker loads the app
+itself). After ``--requests`` GETs spread over the workers it reads
+``/proc/<pid>/smaps_rollup`` of every worker:
+
+    ready       seconds from launch until the server answered
+    respawn     seconds from killing every worker until the replacements
+                (forked by the master) answered again: the cost paid on
+                each worker restart
+    rss         resident memory per worker (counts shared pages in full)
+    pss         proportional set size per worker (shared pages divided
+                by the number of processes sharing them)
+    uss         memory private to the worker
+    total pss   master + all workers: what the deployment really costs
+
+Linux only (``/proc``).
+
+    python -m tools.bench_startup
+    python -m tools.bench_startup --workers 8 --runs 10
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import warnings
+
+from pyramid_kampusku.scripts.serve import MIN_UPTIME
+
+from .common import make_app, seed
+
+FACTORIES = ('main', 'production_main')
+
+APP_SETTINGS = {
+    'auth.secret':   'kampusku-tools',
+    'cache.backend': 'none',
+    # tanpa SSE: kampusku_serve menolak backend memory untuk > 1 worker
+    'events.max_clients': '0',
+    'hot.refresh':   'none',
+    'outbox.worker': 'none',
+}
+
+FACTORY_CODE = textwrap.dedent('''
+    import json, resource, sys, time, warnings
+    warnings.simplefilter('ignore')
+    t0 = time.perf_counter()
+    import pyramid_kampusku
+    t1 = time.perf_counter()
+    getattr(pyramid_kampusku, sys.argv[1])({}, **json.loads(sys.argv[2]))
+    t2 = time.perf_counter()
+    print(json.dumps({
+        'import_ms':  (t1 - t0) * 1000,
+        'factory_ms': (t2 - t1) * 1000,
+        'rss_mb':     resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'modules':    len(sys.modules),
+        'jinja2':     'jinja2' in sys.modules,
+        'bcrypt':     'bcrypt' in sys.modules,
+    }))
+''')
+
+SERVE_CODE = 'from pyramid_kampusku.scripts.serve import main; main()'
+
+
+def time_factory(factory, settings, runs):
+    samples = []
+    # satu putaran pertama dibuang: cache file sistem operasi
+    for _ in range(runs + 1):
+        out = subprocess.run(
+            [sys.executable, '-c', FACTORY_CODE, factory, json.dumps(settings)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    samples = samples[1:]
+    result = {k: statistics.median(s[k] for s in samples)
+              for k in ('import_ms', 'factory_ms', 'rss_mb', 'modules')}
+    result['jinja2'] = samples[0]['jinja2']
+    result['bcrypt'] = samples[0]['bcrypt']
+    return result
+
+
+def write_ini(path, url):
+    lines = ['[app:main]', 'use = call:pyramid_kampusku:production_main',
+             'sqlalchemy.url = ' + url]
+    lines += ['%s = %s' % item for item in sorted(APP_SETTINGS.items())]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, proc, timeout=60):
+    stop = time.time() + timeout
+    while time.time() < stop:
+        if proc.poll() is not None:
+            raise RuntimeError('kampusku_serve exited with %d' % proc.returncode)
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/api/users/1')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError('server did not start')
+
+
+def children(pid):
+    """Pids whose parent is ``pid``."""
+    found = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % name) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # field ke-4 setelah "(comm)"
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            found.append(int(name))
+    return found
+
+
+def memory(pid):
+    """``(rss, pss, uss)`` of ``pid`` in MB, from smaps_rollup."""
+    fields = {}
+    with open('/proc/%d/smaps_rollup' % pid) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    uss = fields['Private_Clean'] + fields['Private_Dirty']
+    return fields['Rss'] / 1024.0, fields['Pss'] / 1024.0, uss / 1024.0
+
+
+def warm(port, args):
+    """Send ``--requests`` GETs over fresh connections (so every worker
+    gets some)."""
+    rnd = random.Random(1)
+    for i in range(args.requests):
+        pick = i % 3
+        if pick == 0:
+            path = '/api/posts?limit=20'
+        elif pick == 1:
+            path = '/api/posts/%d/comments' % rnd.randint(1, args.posts)
+        else:
+            path = '/api/users/%d' % rnd.randint(1, args.users)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request('GET', path)
+        conn.getresponse().read()
+        conn.close()
+
+
+def run_server(ini, preload, args):
+    port = free_port()
+    cmd  = [sys.executable, '-c', SERVE_CODE, ini, '--workers', str(args.workers),
+            '--threads', str(args.threads), '--listen', '127.0.0.1:%d' % port]
+    if not preload:
+        cmd.append('--no-preload')
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, proc)
+        ready = time.perf_counter() - t0
+        warm(port, args)
+        workers = children(proc.pid)
+        mem = [memory(pid) for pid in workers]
+        master = memory(proc.pid)
+
+        # master hanya mengganti worker yang sempat hidup >= MIN_UPTIME
+        time.sleep(max(0, MIN_UPTIME - (time.perf_counter() - t0 - ready)))
+        t1 = time.perf_counter()
+        for pid in workers:
+            os.kill(pid, signal.SIGKILL)
+        wait_ready(port, proc)
+        respawn = time.perf_counter() - t1
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    return {
+        'ready_s':   ready,
+        'respawn_s': respawn,
+        'workers':   len(workers),
+        'rss_mb':    statistics.mean(m[0] for m in mem),
+        'pss_mb':    statistics.mean(m[1] for m in mem),
+        'uss_mb':    statistics.mean(m[2] for m in mem),
+        'total_pss_mb': master[1] + sum(m[1] for m in mem),
+    }
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5,
+                        help='fresh interpreters per app factory')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--comments-per-post', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=300,
+                        help='warm-up GETs before reading memory')
+    parser.add_argument('--output', help='write the results as JSON here')
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    tmp = tempfile.mkdtemp()
+    db  = os.path.join(tmp, 'bench.db')
+    ini = os.path.join(tmp, 'bench.ini')
+    url = 'sqlite:///' + db
+    results = {'factories': {}, 'servers': {}}
+    try:
+        print('app factory        import    factory    rss      modules')
+        for factory in FACTORIES:
+            r = time_factory(factory, dict(APP_SETTINGS, **{
+                'sqlalchemy.url': url}), args.runs)
+            results['factories'][factory] = r
+            print('%-16s %7.0f ms %7.0f ms %6.1f MB %6d%s%s'
+                  % (factory, r['import_ms'], r['factory_ms'], r['rss_mb'],
+                     r['modules'], '  jinja2' if r['jinja2'] else '',
+                     '  bcrypt' if r['bcrypt'] else ''))
+
+        _, engine = make_app(url, **APP_SETTINGS)
+        seed(users=args.users, posts=args.posts,
+             comments_per_post=args.comments_per_post)
+        engine.dispose()
+        write_ini(ini, url)
+
+        print('\n%d workers x %d threads   ready   respawn  rss/worker  '
+              'pss/worker  uss/worker  total pss' % (args.workers, args.threads))
+        for name, preload in (('preload', True), ('no-preload', False)):
+            r = run_server(ini, preload, args)
+            results['servers'][name] = r
+            print('%-22s %5.2f s  %5.2f s  %7.1f MB  %7.1f MB  %7.1f MB  %7.1f MB'
+                  % (name, r['ready_s'], r['respawn_s'], r['rss_mb'],
+                     r['pss_mb'], r['uss_mb'], r['total_pss_mb']))
+    finally:
+        shutil.rmtree(tmp)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2,
+                      sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
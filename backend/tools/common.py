@@ -0,0 +1,129 @@
+# backend/tools/common.py
+"""Shared helpers for the dev tools: build the real app, seed data, count SQL."""
+
+import contextlib
+import datetime
+import random
+
+import transaction
+from sqlalchemy import event
+
+from pyramid_kampusku import main
+from pyramid_kampusku.counters import reconcile
+from pyramid_kampusku.models import Base, DBSession, User, Post, Comment
+from pyramid_kampusku.threads import MAX_NESTING, place_under
+
+
+def make_app(url='sqlite://', **settings):
+    """Return ``(wsgi_app, engine)`` for a fresh schema at ``url``."""
+    settings.setdefault('sqlalchemy.url', url)
+    # token dari app.registry.token_signer.issue() untuk request write
+    settings.setdefault('auth.secret', 'kampusku-tools')
+    # outbox dikosongkan eksplisit lewat app.registry.outbox.drain(); thread
+    # worker tidak bisa melihat SQLite in-memory milik thread lain
+    settings.setdefault('outbox.worker', 'none')
+    # begitu juga refresh feed hot: app.registry.hot_refresher.refresh()
+    settings.setdefault('hot.refresh', 'none')
+    app    = main({}, **settings)
+    engine = DBSession.bind
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return app, engine
+
+
+SHAPES = ('random', 'wide', 'deep', 'skewed')
+
+
+def seed(users=10, posts=20, comments_per_post=5, reply_ratio=0.5, seed=1,
+         shape='random'):
+    """Insert a deterministic data set; replies attach to earlier comments.
+
+    ``shape`` sets the comment trees: ``random`` (a ``reply_ratio`` share
+    of replies to random earlier comments), ``wide`` (top-level only),
+    ``deep`` (each comment replies to the previous one, starting a new
+    thread every ``MAX_NESTING`` levels) or ``skewed``
+    (the same total, but spread over posts by a Zipf law, so a few hot
+    posts get most comments).
+
+    Passwords are stored pre-hashed so seeding stays fast; they cannot be
+    used to log in.
+    """
+    rnd  = random.Random(seed)
+    base = datetime.datetime(2025, 1, 1)
+    tick = 0
+
+    def ts():
+        nonlocal tick
+        tick += 1
+        return base + datetime.timedelta(seconds=tick)
+
+    with transaction.manager:
+        _seed(rnd, ts, users, posts, comments_per_post, reply_ratio, shape)
+        reconcile()
+
+
+def _comment_counts(posts, comments_per_post, shape):
+    if shape != 'skewed':
+        return [comments_per_post] * posts
+    weights = [1.0 / (i + 1) for i in range(posts)]
+    total   = comments_per_post * posts
+    return [int(round(total * w / sum(weights))) for w in weights]
+
+
+def _seed(rnd, ts, users, posts, comments_per_post, reply_ratio, shape):
+    if shape not in SHAPES:
+        raise ValueError('unknown shape %r' % shape)
+    us = [User(username='user%d' % i, email='user%d@example.com' % i,
+               _pw='x' * 60)
+          for i in range(users)]
+    DBSession.add_all(us)
+    DBSession.flush()
+
+    for n in _comment_counts(posts, comments_per_post, shape):
+        p = Post(content='post', author=rnd.choice(us), created_at=ts())
+        DBSession.add(p)
+        DBSession.flush()
+        made = []
+        for _ in range(n):
+            if shape == 'wide':
+                parent = None
+            elif shape == 'deep':
+                parent = made[-1] if made else None
+            else:
+                parent = rnd.choice(made) \
+                    if made and rnd.random() < reply_ratio else None
+            if parent is not None and parent.depth >= MAX_NESTING:
+                parent = None
+            path, depth = place_under(parent) if parent else ('', 0)
+            c = Comment(content='comment', author=rnd.choice(us), post_id=p.id,
+                        parent_id=parent.id if parent else None,
+                        path=path, depth=depth, created_at=ts())
+            DBSession.add(c)
+            DBSession.flush()
+            made.append(c)
+
+
+class QueryCounter(object):
+    """Records statements (and their parameters) executed on an engine."""
+
+    def __init__(self):
+        self.statements = []
+        self.params     = []
+
+    def __call__(self, conn, cursor, statement, params, context, many):
+        self.statements.append(statement)
+        self.params.append(params)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextlib.contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
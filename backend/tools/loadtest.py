@@ -0,0 +1,321 @@
+# backend/tools/loadtest.py
+"""Load test the hot API endpoints and compare against a stored baseline.
+
+Seeds a throwaway database, then drives the real app (``main``) with
+``--concurrency`` client threads, either in-process through WebTest or
+over HTTP against waitress on a local port, and measures throughput and
+p50/p99 latency per scenario:
+
+    get_posts     GET  /api/posts?limit=20
+    get_comments  GET  /api/posts/{id}/comments   (random post)
+    login         POST /api/login                 (bcrypt at --bcrypt-rounds)
+    create_post   POST /api/posts
+    add_comment   POST /api/posts/{id}/comments   (random post)
+
+Results are printed and written as JSON (``--output``). With
+``--baseline`` the run fails (exit status 1) when a scenario's throughput
+drops or its p50 rises by more than ``--tolerance``, or its p99 rises by
+more than ``--p99-tolerance``, against the baseline. Baselines are
+machine-specific: regenerate with ``--write-baseline`` on the machine that
+runs the comparison.
+
+    python -m tools.loadtest --shape skewed --output /tmp/run.json
+    python -m tools.loadtest --baseline tools/loadtest_baseline.json
+    python -m tools.loadtest --server waitress --concurrency 8
+    python -m tools.loadtest --url postgresql://.../kampusku_bench
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+import sqlalchemy
+import transaction
+from webtest import TestApp
+
+from pyramid_kampusku.hashing import InlineHasher
+from pyramid_kampusku.models import DBSession, User
+
+from .bench_login import percentile
+from .common import SHAPES, make_app, seed
+
+SCENARIOS = ('get_posts', 'get_comments', 'login', 'create_post',
+             'add_comment')
+
+LOGIN_USERS    = 8
+LOGIN_PASSWORD = 'loadtest'
+
+
+def scenario_request(name, rnd, ctx):
+    """``(method, path, json body or None, headers)`` for one request."""
+    if name == 'get_posts':
+        return 'GET', '/api/posts?limit=20', None, {}
+    if name == 'get_comments':
+        return ('GET', '/api/posts/%d/comments' % rnd.randint(1, ctx['posts']),
+                None, {})
+    if name == 'login':
+        return 'POST', '/api/login', {
+            'username': 'login%d' % rnd.randrange(LOGIN_USERS),
+            'password': LOGIN_PASSWORD,
+        }, {}
+    auth = {'Authorization': 'Bearer ' + rnd.choice(ctx['tokens'])}
+    if name == 'create_post':
+        return 'POST', '/api/posts', {'content': 'load test post'}, auth
+    if name == 'add_comment':
+        return ('POST', '/api/posts/%d/comments' % rnd.randint(1, ctx['posts']),
+                {'content': 'load test comment'}, auth)
+    raise ValueError(name)
+
+
+class InProcessClient(object):
+    """Calls the WSGI app directly (no sockets)."""
+
+    def __init__(self, app):
+        self.client = TestApp(app)
+
+    def request(self, method, path, body, headers):
+        if body is None:
+            r = self.client.get(path, headers=headers, expect_errors=True)
+        else:
+            r = self.client.post_json(path, body, headers=headers,
+                                      expect_errors=True)
+        return r.status_int
+
+    def close(self):
+        DBSession.remove()
+
+
+class HTTPClient(object):
+    """One keep-alive HTTP connection to the local waitress server."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+    def request(self, method, path, body, headers):
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.conn.request(method, path, body=payload, headers=headers)
+        resp = self.conn.getresponse()
+        resp.read()
+        return resp.status
+
+    def close(self):
+        self.conn.close()
+
+
+def run_scenario(name, make_client, ctx, args):
+    latencies = []
+    errors    = []
+    lock      = threading.Lock()
+    per_thread = [args.requests // args.concurrency +
+                  (i < args.requests % args.concurrency)
+                  for i in range(args.concurrency)]
+    start_gate = threading.Barrier(args.concurrency + 1)
+
+    def worker(i, count):
+        rnd    = random.Random('%s-%d' % (name, i))
+        client = make_client()
+        for _ in range(min(args.warmup, count)):
+            client.request(*scenario_request(name, rnd, ctx))
+        mine, bad = [], 0
+        start_gate.wait()
+        for _ in range(count):
+            req = scenario_request(name, rnd, ctx)
+            t0 = time.perf_counter()
+            status = client.request(*req)
+            mine.append(time.perf_counter() - t0)
+            bad += status >= 400
+        client.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(bad)
+
+    threads = [threading.Thread(target=worker, args=(i, n))
+               for i, n in enumerate(per_thread)]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return {
+        'requests': len(latencies),
+        'errors':   sum(errors),
+        'rps':      len(latencies) / elapsed,
+        'p50_ms':   percentile(latencies, 50) * 1000,
+        'p99_ms':   percentile(latencies, 99) * 1000,
+    }
+
+
+def prepare(url, args):
+    app, engine = make_app(url, **{
+        'cache.backend':  args.cache,
+        'bcrypt.rounds':  str(args.bcrypt_rounds),
+        'bcrypt.workers': '0',
+        'metrics.slow_request_ms': '0',
+        # seperti production: efek samping write di thread outbox
+        'outbox.worker':  'thread',
+    })
+    seed(users=args.users, posts=args.posts,
+         comments_per_post=args.comments_per_post, shape=args.shape)
+    hashed = InlineHasher(args.bcrypt_rounds).hash(LOGIN_PASSWORD)
+    with transaction.manager:
+        DBSession.add_all([User(username='login%d' % i,
+                                email='login%d@example.com' % i, _pw=hashed)
+                           for i in range(LOGIN_USERS)])
+    DBSession.remove()
+    signer = app.registry.token_signer
+    ctx = {
+        'posts':  args.posts,
+        'tokens': [signer.issue(i) for i in range(1, args.users + 1)],
+    }
+    return app, engine, ctx
+
+
+def compare(results, baseline, tolerance, p99_tolerance):
+    """Return a list of regression messages against ``baseline``."""
+    failures = []
+    for name, base in baseline.get('results', {}).items():
+        now = results.get(name)
+        if now is None:
+            continue
+        if now['rps'] < base['rps'] * (1 - tolerance):
+            failures.append('%s: %.1f req/s vs baseline %.1f'
+                            % (name, now['rps'], base['rps']))
+        for key, allowed in (('p50_ms', tolerance), ('p99_ms', p99_tolerance)):
+            if now[key] > base[key] * (1 + allowed):
+                failures.append('%s: %s %.1f ms vs baseline %.1f ms'
+                                % (name, key[:3], now[key], base[key]))
+    return failures
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: SQLite temp file)')
+    parser.add_argument('--server', choices=('inprocess', 'waitress'),
+                        default='inprocess')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma-separated subset of ' + ', '.join(SCENARIOS))
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--comments-per-post', type=int, default=10)
+    parser.add_argument('--shape', choices=SHAPES, default='random')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10,
+                        help='unmeasured requests per client thread')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--cache', default='none',
+                        help='cache.backend for the run (default: none)')
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--output', help='write the results as JSON here')
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed drop in req/s and rise in p50')
+    # ekor latensi write di SQLite didominasi tunggu lock: jauh lebih bising
+    parser.add_argument('--p99-tolerance', type=float, default=1.0,
+                        help='allowed rise in p99')
+    parser.add_argument('--write-baseline', action='store_true',
+                        help='store this run as --baseline instead of comparing')
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown scenario(s): %s' % ', '.join(sorted(unknown)))
+
+    path = None
+    url  = args.url
+    if not url:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        url = 'sqlite:///' + path
+    app, engine, ctx = prepare(url, args)
+
+    server = None
+    if args.server == 'waitress':
+        from waitress.server import create_server
+        # "Task queue depth" bila semua thread sibuk: memang itu bebannya
+        logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+        server = create_server(app, host='127.0.0.1', port=0,
+                               threads=args.concurrency)
+        threading.Thread(target=server.run, daemon=True).start()
+        port = server.effective_port
+
+        def make_client():
+            return HTTPClient(port)
+    else:
+        def make_client():
+            return InProcessClient(app)
+
+    results = {}
+    try:
+        for name in scenarios:
+            results[name] = r = run_scenario(name, make_client, ctx, args)
+            print('%-13s %8.1f req/s  p50 %7.2f ms  p99 %7.2f ms  %d errors'
+                  % (name, r['rps'], r['p50_ms'], r['p99_ms'], r['errors']))
+    finally:
+        if server is not None:
+            server.close()
+        engine.dispose()
+        if path:
+            os.remove(path)
+
+    report = {
+        'meta': {
+            'server':      args.server,
+            'dialect':     engine.dialect.name,
+            'shape':       args.shape,
+            'users':       args.users,
+            'posts':       args.posts,
+            'comments_per_post': args.comments_per_post,
+            'requests':    args.requests,
+            'concurrency': args.concurrency,
+            'cache':       args.cache,
+            'bcrypt_rounds': args.bcrypt_rounds,
+            'python':      platform.python_version(),
+            'sqlalchemy':  sqlalchemy.__version__,
+            'machine':     platform.node(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    failed = any(r['errors'] for r in results.values())
+    if failed:
+        print('FAIL: some requests returned an error status')
+    if args.baseline and args.write_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print('baseline written to %s' % args.baseline)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance,
+                              args.p99_tolerance)
+        for message in regressions:
+            print('REGRESSION ' + message)
+        if not regressions:
+            print('ok   within tolerance of baseline')
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# backend/tools/query_counts.py
+"""Assert that read endpoints run a constant number of SQL statements.
+
+Seeds growing data sets and fails (exit status 1) if the statement count
+of a request changes with the amount of data, i.e. on any N+1 pattern.
+
+    python -m tools.query_counts
+"""
+
+import sys
+import warnings
+
+from webtest import TestApp
+
+from .common import make_app, seed, count_queries
+
+SIZES = [
+    dict(users=2,  posts=2,  comments_per_post=3),
+    dict(users=10, posts=20, comments_per_post=10),
+    dict(users=50, posts=20, comments_per_post=60),
+]
+
+
+def measure(size):
+    app, engine = make_app()
+    seed(**size)
+    client = TestApp(app)
+    counts = {}
+    for name, url in [
+        ('GET /api/posts',                 '/api/posts?limit=20'),
+        ('GET /api/posts/{id}/comments',   '/api/posts/1/comments'),
+        ('GET /api/comments/{id}/replies', '/api/comments/1/replies'),
+    ]:
+        with count_queries(engine) as q:
+            client.get(url)
+        counts[name] = q.count
+    return counts
+
+
+def main(argv=sys.argv):
+    warnings.simplefilter('ignore')
+    results = [measure(size) for size in SIZES]
+    failed  = False
+    for name in results[0]:
+        counts = [r[name] for r in results]
+        ok     = len(set(counts)) == 1
+        failed = failed or not ok
+        print('%-35s %-20s %s' % (name, counts, 'ok' if ok else 'GROWS'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# backend/tools/query_plans.py
+"""Fail if a hot endpoint query plans a sequential scan.
+
+Seeds a database at realistic size, drives the hot read endpoints through
+the real app while recording every SQL statement they send, then asks the
+database to EXPLAIN each one. Any full scan of an application table
+(PostgreSQL ``Seq Scan``, SQLite ``SCAN <table>`` without an index) is
+reported and makes the exit status 1.
+
+    python -m tools.query_plans                          # SQLite temp file
+    python -m tools.query_plans --url postgresql://.../kampusku_bench
+
+Use a throwaway database: the schema is dropped and recreated.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import warnings
+
+from sqlalchemy import text
+from webtest import TestApp
+
+from pyramid_kampusku.models import Base
+
+from .common import make_app, seed, count_queries
+
+TABLES = set(Base.metadata.tables)
+
+
+def endpoints(client):
+    """(name, callable) pairs; each callable performs one request."""
+    first = client.get('/api/posts', {'limit': 20}).json
+    return [
+        ('GET /api/posts',
+         lambda: client.get('/api/posts', {'limit': 20})),
+        ('GET /api/posts?cursor',
+         lambda: client.get('/api/posts', {'limit': 20,
+                                           'cursor': first['next_cursor']})),
+        ('GET /api/posts?sort=hot',
+         lambda: client.get('/api/posts', {'limit': 20, 'sort': 'hot'})),
+        ('GET /api/posts/{id}/comments',
+         lambda: client.get('/api/posts/%d/comments' % first['posts'][0]['id'])),
+        ('GET /api/comments/{id}/replies',
+         lambda: client.get('/api/comments/1/replies')),
+        ('GET /api/users/{id}',
+         lambda: client.get('/api/users/1')),
+        ('GET /api/users/{id}/posts',
+         lambda: client.get('/api/users/1/posts')),
+        ('GET /api/users/{id}/comments',
+         lambda: client.get('/api/users/1/comments')),
+        ('GET /api/posts/changes',
+         lambda: client.get('/api/posts/changes', {'since': 0})),
+    ]
+
+
+def sqlite_scans(conn, statement, params):
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement,
+                                params).fetchall()
+    bad = []
+    for row in rows:
+        detail = row[-1]
+        words  = detail.split()
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in TABLES \
+                and 'USING' not in words:
+            bad.append(detail)
+    return bad
+
+
+def postgresql_scans(conn, statement, params):
+    plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement,
+                                params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    bad = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan' \
+                and node.get('Relation Name') in TABLES:
+            bad.append('Seq Scan on %s' % node['Relation Name'])
+        for child in node.get('Plans', ()):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return bad
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: SQLite temp file)')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--comments-per-post', type=int, default=10)
+    args = parser.parse_args(argv[1:])
+    warnings.simplefilter('ignore')
+
+    path = None
+    url  = args.url
+    if not url:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        url = 'sqlite:///' + path
+
+    # cache off, otherwise repeated requests never reach the database
+    app, engine = make_app(url, **{'cache.backend': 'none'})
+    seed(users=args.users, posts=args.posts,
+         comments_per_post=args.comments_per_post)
+    app.registry.hot_refresher.refresh()
+    explain = postgresql_scans if engine.dialect.name == 'postgresql' \
+        else sqlite_scans
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+
+    client = TestApp(app)
+    failed = False
+    for name, request in endpoints(client):
+        with count_queries(engine) as q:
+            request()
+        scans = []
+        with engine.connect() as conn:
+            for statement, params in zip(q.statements, q.params):
+                if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    scans += [(statement, bad)
+                              for bad in explain(conn, statement, params)]
+        for statement, bad in scans:
+            print('FAIL %s\n  %s\n  -> %s'
+                  % (name, ' '.join(statement.split()), bad))
+        if not scans:
+            print('ok   %s (%d statements)' % (name, q.count))
+        failed = failed or bool(scans)
+
+    engine.dispose()
+    if path:
+        os.remove(path)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,27 @@
 // src/api.js
 import axios from 'axios';
-export default axios.create({
+
+const api = axios.create({
   baseURL: '/api',
   headers: { 'Content-Type': 'application/json' }
 });
+
+// token dari /login atau /register (disimpan AuthContext di localStorage)
+export function authHeader() {
+  try {
+    const user = JSON.parse(localStorage.getItem('user'));
+    return user && user.token ? `Bearer ${user.token}` : null;
+  } catch (e) {
+    return null;
+  }
+}
+
+api.interceptors.request.use(config => {
+  const header = authHeader();
+  if (header) {
+    config.headers = { ...config.headers, Authorization: header };
+  }
+  return config;
+});
+
+export default api;
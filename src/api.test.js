@@ -1,4 +1,4 @@
-import api from './api';
+import api, { authHeader } from './api';
 
 // Mock axios since we're having issues with axios-mock-adapter
 jest.mock('axios', () => ({
@@ -7,6 +7,7 @@ jest.mock('axios', () => ({
     post: jest.fn(),
     put: jest.fn(),
     delete: jest.fn(),
+    interceptors: { request: { use: jest.fn() } },
     defaults: {
       baseURL: '/api',
       headers: {
@@ -19,6 +20,13 @@ jest.mock('axios', () => ({
 describe('API Module', () => {
   beforeEach(() => {
     jest.clearAllMocks();
+    localStorage.clear();
+  });
+
+  test('authHeader uses the token of the stored user', () => {
+    expect(authHeader()).toBeNull();
+    localStorage.setItem('user', JSON.stringify({ id: 1, token: 'abc.def' }));
+    expect(authHeader()).toBe('Bearer abc.def');
   });
 
   test('api instance is configured correctly', () => {
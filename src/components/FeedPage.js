@@ -1,5 +1,5 @@
 // src/components/FeedPage.jsx
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import InfiniteScroll from 'react-infinite-scroll-component';
 import { Card, Spinner } from 'react-bootstrap';
 import { usePosts } from '../context/PostsContext';
@@ -7,24 +7,20 @@ import PostForm from './PostForm';
 import PostItem from './PostItem';
 
 export default function FeedPage() {
-  const { posts } = usePosts();
+  const { posts, fetchMore: fetchMorePosts, hasMore: moreOnServer } = usePosts();
   const PAGE_SIZE = 5;
 
-  // 'displayed' adalah potongan awal dari 'posts'
-  const [displayed, setDisplayed] = useState([]);
+  // jumlah post yang sedang ditampilkan dari 'posts' yang sudah dimuat
+  const [shown, setShown] = useState(PAGE_SIZE);
+  const displayed = posts.slice(0, shown);
 
-  // setiap kali 'posts' berubah (fetch awal atau setelah create/delete),
-  // reset 'displayed' ke slice pertama
-  useEffect(() => {
-    setDisplayed(posts.slice(0, PAGE_SIZE));
-  }, [posts]);
-
-  // ketika scroll, ambil batch selanjutnya
+  // ketika scroll, tampilkan batch selanjutnya; kalau yang sudah dimuat
+  // hampir habis, minta halaman berikutnya ke backend (keyset cursor)
   const fetchMore = () => {
-    setDisplayed(prev => [
-      ...prev,
-      ...posts.slice(prev.length, prev.length + PAGE_SIZE)
-    ]);
+    if (shown + PAGE_SIZE > posts.length && moreOnServer) {
+      fetchMorePosts();
+    }
+    setShown(prev => prev + PAGE_SIZE);
   };
   return (
     <div data-testid="feed-page">
@@ -58,7 +54,7 @@ export default function FeedPage() {
           data-testid="infinite-scroll"
           dataLength={displayed.length}
           next={fetchMore}
-          hasMore={displayed.length < posts.length}
+          hasMore={displayed.length < posts.length || Boolean(moreOnServer)}
           loader={
             <div className="text-center mt-3 mb-4">
               <Card className="border-0 shadow-sm">
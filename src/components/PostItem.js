@@ -6,7 +6,14 @@ import { useAuth } from '../context/AuthContext';
 import { usePosts } from '../context/PostsContext';
 import EditPostForm from './EditPostForm';
 
-function CommentList({ comments, onReply, onDelete, level = 0 }) {
+// Feed dan thread hanya membawa sebagian balasan; sisanya dimuat per
+// halaman. Halaman pertama bisa tumpang tindih dengan yang sudah tampil.
+const appendNew = (list, extra) => {
+  const seen = new Set(list.map(c => c.id));
+  return [...list, ...extra.filter(c => !seen.has(c.id))];
+};
+
+function CommentList({ comments, onReply, onDelete, onMore, level = 0 }) {
   const { user } = useAuth();
 
   return comments.map(c => (
@@ -70,10 +77,21 @@ function CommentList({ comments, onReply, onDelete, level = 0 }) {
               comments={c.replies}
               onReply={onReply}
               onDelete={onDelete}
+              onMore={onMore}
               level={level + 1}
             />
           </div>
         )}
+        {c.more_replies > 0 && (
+          <Button
+            variant="link"
+            size="sm"
+            className="btn-more-replies ms-2 mb-1 text-start"
+            onClick={() => onMore(c)}
+          >
+            Lihat {c.more_replies} balasan lagi
+          </Button>
+        )}
       </Card>
     </div>
   ));
@@ -85,6 +103,8 @@ export default function PostItem({ post }) {
 
   const [showComments, setShowComments] = useState(false);
   const [comments, setComments] = useState(post.comments || []);
+  const [moreComments, setMoreComments] = useState(post.more_comments || 0);
+  const [commentsCursor, setCommentsCursor] = useState(null);
   const [newComment, setNewComment] = useState('');
   const [showEdit, setShowEdit] = useState(false);
   const [showConfirm, setShowConfirm] = useState(false);
@@ -181,6 +201,51 @@ export default function PostItem({ post }) {
     }
   };
 
+  const handleMoreReplies = async parent => {
+    try {
+      const { data } = await api.get(
+        `/comments/${parent.id}/replies`,
+        { params: parent.replies_cursor ? { cursor: parent.replies_cursor } : {} }
+      );
+      const injectMore = list =>
+        list.map(cm =>
+          cm.id === parent.id
+            ? {
+                ...cm,
+                replies: appendNew(cm.replies || [], data.comments),
+                more_replies: data.more_replies,
+                replies_cursor: data.next_cursor
+              }
+            : cm.replies
+            ? { ...cm, replies: injectMore(cm.replies) }
+            : cm
+        );
+      const updatedComments = injectMore(comments);
+      setComments(updatedComments);
+      setPosts(posts.map(x => (x.id === post.id ? { ...x, comments: updatedComments } : x)));
+    } catch (err) {
+      console.error('Gagal memuat balasan:', err);
+    }
+  };
+
+  const handleMoreComments = async () => {
+    try {
+      // tanpa cursor: satu halaman besar yang mencakup yang sudah tampil
+      const { data } = await api.get(
+        `/posts/${post.id}/comments`,
+        { params: commentsCursor ? { cursor: commentsCursor } : { limit: 100 } }
+      );
+      const updatedComments = appendNew(comments, data.comments);
+      const added = updatedComments.length - comments.length;
+      setComments(updatedComments);
+      setCommentsCursor(data.next_cursor);
+      setMoreComments(data.next_cursor ? Math.max(moreComments - added, 0) : 0);
+      setPosts(posts.map(x => (x.id === post.id ? { ...x, comments: updatedComments } : x)));
+    } catch (err) {
+      console.error('Gagal memuat komentar:', err);
+    }
+  };
+
   const handleUpvote = () => { /* unchanged */ };
   const handleDownvote = () => { /* unchanged */ };
   return (
@@ -270,7 +335,22 @@ export default function PostItem({ post }) {
                 </div>
               </Form>
               <div className="comments-list">
-                <CommentList comments={comments} onReply={handleReply} onDelete={handleDeleteComment} />
+                <CommentList
+                  comments={comments}
+                  onReply={handleReply}
+                  onDelete={handleDeleteComment}
+                  onMore={handleMoreReplies}
+                />
+                {moreComments > 0 && (
+                  <Button
+                    variant="link"
+                    size="sm"
+                    className="btn-more-comments"
+                    onClick={handleMoreComments}
+                  >
+                    Lihat {moreComments} komentar lagi
+                  </Button>
+                )}
               </div>
             </div>
           )}
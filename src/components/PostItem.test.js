@@ -387,4 +387,75 @@ describe('PostItem Component', () => {
     expect(upvoteButton).toBeInTheDocument();
     expect(downvoteButton).toBeInTheDocument();
   });
+
+  test('loads more replies for a cut thread', async () => {
+    const user = userEvent.setup();
+    const setPosts = jest.fn();
+    const cutPost = {
+      ...mockPost,
+      comments: [{ ...mockPost.comments[0], more_replies: 2 }, mockPost.comments[1]]
+    };
+    mockApi.onGet('/comments/1/replies').reply(200, {
+      comments: [
+        mockPost.comments[0].replies[0],
+        {
+          id: 4,
+          username: 'commenter3',
+          content: 'Loaded reply',
+          created_at: '2023-01-01T04:00:00Z',
+          replies: [],
+          more_replies: 0
+        }
+      ],
+      more_replies: 1,
+      next_cursor: 'abc'
+    });
+
+    renderWithProviders(<PostItem post={cutPost} />, { posts: [cutPost], setPosts });
+    await user.click(screen.getByText('Comment (2)'));
+    await user.click(screen.getByText('Lihat 2 balasan lagi'));
+
+    await waitFor(() => {
+      expect(screen.getByText('Loaded reply')).toBeInTheDocument();
+    });
+    // balasan yang sudah tampil tidak digandakan
+    expect(screen.getAllByText('Reply to first comment')).toHaveLength(1);
+    expect(screen.getByText('Lihat 1 balasan lagi')).toBeInTheDocument();
+    expect(setPosts).toHaveBeenCalled();
+
+    await user.click(screen.getByText('Lihat 1 balasan lagi'));
+    await waitFor(() => {
+      expect(mockApi.history.get).toHaveLength(2);
+    });
+    expect(mockApi.history.get[1].params).toEqual({ cursor: 'abc' });
+  });
+
+  test('loads more top-level comments', async () => {
+    const user = userEvent.setup();
+    const cutPost = { ...mockPost, more_comments: 1 };
+    mockApi.onGet(`/posts/${mockPost.id}/comments`).reply(200, {
+      comments: [
+        ...mockPost.comments,
+        {
+          id: 5,
+          username: 'commenter4',
+          content: 'Older thread',
+          created_at: '2023-01-01T05:00:00Z',
+          replies: [],
+          more_replies: 0
+        }
+      ],
+      next_cursor: null
+    });
+
+    renderWithProviders(<PostItem post={cutPost} />, { posts: [cutPost] });
+    await user.click(screen.getByText('Comment (2)'));
+    await user.click(screen.getByText('Lihat 1 komentar lagi'));
+
+    await waitFor(() => {
+      expect(screen.getByText('Older thread')).toBeInTheDocument();
+    });
+    expect(screen.getAllByText('First comment')).toHaveLength(1);
+    expect(screen.queryByText(/komentar lagi/)).not.toBeInTheDocument();
+  });
 });
@@ -1,25 +1,134 @@
 // src/context/PostsContext.js
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef, useCallback } from 'react';
 import api from '../api';
 
 const PostsContext = createContext();
 
 export { PostsContext };
 
+const PAGE_SIZE = 20;
+const EVENTS_URL = '/api/events';
+
+// hapus komentar (beserta balasannya) dari pohon komentar
+function removeComment(comments, id) {
+  return comments
+    .filter(c => c.id !== id)
+    .map(c => ({ ...c, replies: removeComment(c.replies || [], id) }));
+}
+
+// tambahkan komentar di bawah parent-nya (atau di akar jika parent_id null)
+function insertComment(comments, comment) {
+  if (!comment.parent_id) return [...comments, comment];
+  return comments.map(c => (
+    c.id === comment.parent_id
+      ? { ...c, replies: [...(c.replies || []), comment] }
+      : { ...c, replies: insertComment(c.replies || [], comment) }
+  ));
+}
+
+// Terapkan satu delta dari GET /api/events ke daftar posts
+export function applyEvent(posts, type, data) {
+  // payload terpotong (backend postgresql): tunggu fetch berikutnya
+  if (data.truncated) return posts;
+  switch (type) {
+    case 'post.created':
+      return posts.some(p => p.id === data.id) ? posts : [data, ...posts];
+    case 'post.updated':
+      return posts.map(p => (p.id === data.id ? { ...p, content: data.content } : p));
+    case 'post.deleted':
+      return posts.filter(p => p.id !== data.id);
+    case 'comment.created': {
+      const comment = { ...data, replies: [], more_replies: 0 };
+      return posts.map(p => (
+        p.id === data.post_id
+          ? {
+              ...p,
+              comment_count: (p.comment_count || 0) + 1,
+              comments: insertComment(removeComment(p.comments || [], data.id), comment)
+            }
+          : p
+      ));
+    }
+    case 'comment.deleted':
+      // removed = komentar itu + semua balasannya yang ikut terhapus
+      return posts.map(p => (
+        p.id === data.post_id
+          ? {
+              ...p,
+              comment_count: Math.max(0, (p.comment_count || 0) - (data.removed || 1)),
+              comments: removeComment(p.comments || [], data.id)
+            }
+          : p
+      ));
+    default:
+      return posts;
+  }
+}
+
+const EVENT_TYPES = [
+  'post.created', 'post.updated', 'post.deleted',
+  'comment.created', 'comment.deleted'
+];
+
 export function PostsProvider({ children }) {
   const [posts, setPosts] = useState([]);
+  // cursor halaman berikutnya dari backend (null = sudah habis)
+  const [nextCursor, setNextCursor] = useState(null);
+  const loadingMore = useRef(false);
 
-  // Fetch posts dari backend sekali saat mount
-  useEffect(() => {
-    api.get('/posts')
-      .then(({ data }) => setPosts(data))
+  // Fetch halaman pertama dari backend
+  const fetchFirstPage = useCallback(() => {
+    api.get('/posts', { params: { limit: PAGE_SIZE } })
+      .then(({ data }) => {
+        setPosts(data.posts);
+        setNextCursor(data.next_cursor);
+      })
       .catch(err => {
         console.error('Gagal fetch posts:', err);
       });
   }, []);
 
+  useEffect(() => {
+    fetchFirstPage();
+  }, [fetchFirstPage]);
+
+  // Perubahan berikutnya datang sebagai delta lewat SSE, bukan fetch ulang
+  // feed; EventSource reconnect sendiri dan mengirim Last-Event-ID
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return undefined;
+    const source = new EventSource(EVENTS_URL);
+    EVENT_TYPES.forEach(type => {
+      source.addEventListener(type, e => {
+        const data = JSON.parse(e.data);
+        setPosts(prev => applyEvent(prev, type, data));
+      });
+    });
+    // event yang terlewat tidak bisa diputar ulang: muat ulang halaman pertama
+    source.addEventListener('reset', fetchFirstPage);
+    return () => source.close();
+  }, [fetchFirstPage]);
+
+  // Ambil halaman berikutnya (keyset paging) dan tambahkan ke akhir feed
+  const fetchMore = () => {
+    if (!nextCursor || loadingMore.current) return Promise.resolve();
+    loadingMore.current = true;
+    return api.get('/posts', { params: { limit: PAGE_SIZE, cursor: nextCursor } })
+      .then(({ data }) => {
+        setPosts(prev => [...prev, ...data.posts]);
+        setNextCursor(data.next_cursor);
+      })
+      .catch(err => {
+        console.error('Gagal fetch posts:', err);
+      })
+      .finally(() => {
+        loadingMore.current = false;
+      });
+  };
+
   return (
-    <PostsContext.Provider value={{ posts, setPosts }}>
+    <PostsContext.Provider
+      value={{ posts, setPosts, fetchMore, hasMore: Boolean(nextCursor) }}
+    >
       {children}
     </PostsContext.Provider>
   );
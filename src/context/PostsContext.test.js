@@ -1,5 +1,5 @@
 import { renderHook, act } from '@testing-library/react';
-import { PostsProvider, usePosts } from './PostsContext';
+import { PostsProvider, usePosts, applyEvent } from './PostsContext';
 import api from '../api';
 
 // Mock the API module
@@ -35,7 +35,7 @@ describe('PostsContext', () => {
       }
     ];
     
-    api.get.mockResolvedValue({ data: mockPosts });
+    api.get.mockResolvedValue({ data: { posts: mockPosts, next_cursor: null } });
     
     const { result } = renderWithProvider();
     
@@ -69,7 +69,7 @@ describe('PostsContext', () => {
     consoleSpy.mockRestore();
   });
   test('setPosts function updates posts correctly', () => {
-    api.get.mockResolvedValue({ data: [] });
+    api.get.mockResolvedValue({ data: { posts: [], next_cursor: null } });
     
     const { result } = renderWithProvider();
     
@@ -105,7 +105,7 @@ describe('PostsContext', () => {
         ]
       }    ];
     
-    api.get.mockResolvedValue({ data: mockPosts });
+    api.get.mockResolvedValue({ data: { posts: mockPosts, next_cursor: null } });
     
     const { result } = renderWithProvider();
     
@@ -115,4 +115,84 @@ describe('PostsContext', () => {
     
     expect(result.current.posts).toEqual(mockPosts);
   });
+
+  test('fetchMore appends the next page using next_cursor', async () => {
+    api.get
+      .mockResolvedValueOnce({ data: { posts: [{ id: 2, content: 'Newer' }], next_cursor: 'abc' } })
+      .mockResolvedValueOnce({ data: { posts: [{ id: 1, content: 'Older' }], next_cursor: null } });
+
+    const { result } = renderWithProvider();
+
+    await act(async () => {
+      await new Promise(resolve => setTimeout(resolve, 100));
+    });
+    expect(result.current.hasMore).toBe(true);
+
+    await act(async () => {
+      await result.current.fetchMore();
+    });
+
+    expect(api.get).toHaveBeenLastCalledWith('/posts', { params: { limit: 20, cursor: 'abc' } });
+    expect(result.current.posts.map(p => p.id)).toEqual([2, 1]);
+    expect(result.current.hasMore).toBe(false);
+  });
+
+  test('applies SSE deltas pushed by the backend', async () => {
+    const listeners = {};
+    global.EventSource = jest.fn(() => ({
+      addEventListener: (type, fn) => { listeners[type] = fn; },
+      close: jest.fn()
+    }));
+    api.get.mockResolvedValue({
+      data: { posts: [{ id: 1, content: 'Old', comment_count: 0, comments: [] }], next_cursor: null }
+    });
+
+    const { result } = renderWithProvider();
+    await act(async () => {
+      await new Promise(resolve => setTimeout(resolve, 100));
+    });
+    expect(global.EventSource).toHaveBeenCalledWith('/api/events');
+
+    const push = (type, data) => act(() => {
+      listeners[type]({ data: JSON.stringify(data) });
+    });
+    push('post.created', { id: 2, content: 'New', comments: [] });
+    push('post.updated', { id: 1, content: 'Edited' });
+    push('comment.created', { id: 10, post_id: 1, parent_id: null, content: 'Hi' });
+    push('comment.created', { id: 11, post_id: 1, parent_id: 10, content: 'Reply' });
+
+    expect(result.current.posts.map(p => p.id)).toEqual([2, 1]);
+    const post = result.current.posts[1];
+    expect(post.content).toBe('Edited');
+    expect(post.comment_count).toBe(2);
+    expect(post.comments[0].replies[0].id).toBe(11);
+
+    push('comment.deleted', { id: 10, post_id: 1, removed: 2 });
+    push('post.deleted', { id: 2 });
+    expect(result.current.posts.map(p => p.id)).toEqual([1]);
+    expect(result.current.posts[0].comments).toEqual([]);
+    expect(result.current.posts[0].comment_count).toBe(0);
+
+    delete global.EventSource;
+  });
+
+  test('applyEvent subtracts deleted replies from comment_count', () => {
+    const posts = [{
+      id: 1,
+      comment_count: 4,
+      comments: [
+        { id: 10, replies: [{ id: 11, replies: [{ id: 12, replies: [] }] }] },
+        { id: 20, replies: [] }
+      ]
+    }];
+    const next = applyEvent(posts, 'comment.deleted', { id: 11, post_id: 1, removed: 2 });
+    expect(next[0].comment_count).toBe(2);
+    expect(next[0].comments[0].replies).toEqual([]);
+    expect(next[0].comments[1].id).toBe(20);
+  });
+
+  test('applyEvent ignores a post it already has', () => {
+    const posts = [{ id: 1, content: 'A' }];
+    expect(applyEvent(posts, 'post.created', { id: 1, content: 'A' })).toBe(posts);
+  });
 });
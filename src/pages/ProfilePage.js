@@ -1,19 +1,49 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { Card, Button, Container, Row, Col, Badge } from 'react-bootstrap';
+import api from '../api';
 import { useAuth } from '../context/AuthContext';
-import { usePosts } from '../context/PostsContext';
+import { PostsContext } from '../context/PostsContext';
 import EditProfileForm from '../components/EditProfileForm';
 import PostItem from '../components/PostItem';
 
+const PAGE_SIZE = 20;
+
 export default function ProfilePage() {
   const { user } = useAuth();
-  const { posts } = usePosts();
   const [editing, setEditing] = useState(false);
+  // timeline & statistik diambil langsung dari endpoint profil,
+  // bukan dengan memfilter seluruh feed
+  const [myPosts, setMyPosts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [stats, setStats] = useState(null);
+  const userId = user && user.id;
+
+  useEffect(() => {
+    if (!userId) return;
+    api.get(`/users/${userId}`)
+      .then(({ data }) => setStats(data))
+      .catch(err => console.error('Gagal fetch profil:', err));
+    api.get(`/users/${userId}/posts`, { params: { limit: PAGE_SIZE } })
+      .then(({ data }) => {
+        setMyPosts(data.posts);
+        setNextCursor(data.next_cursor);
+      })
+      .catch(err => console.error('Gagal fetch timeline:', err));
+  }, [userId]);
+
+  const loadMore = () => {
+    api.get(`/users/${userId}/posts`, {
+      params: { limit: PAGE_SIZE, cursor: nextCursor }
+    })
+      .then(({ data }) => {
+        setMyPosts(prev => [...prev, ...data.posts]);
+        setNextCursor(data.next_cursor);
+      })
+      .catch(err => console.error('Gagal fetch timeline:', err));
+  };
 
   if (!user) return <p>Loading...</p>;
 
-  // Filter hanya post milik user ini
-  const myPosts = posts.filter(p => p.username === user.username);
   return (
     <Container className="py-4">
       <Row>
@@ -48,18 +78,18 @@ export default function ProfilePage() {
                 <div className="d-flex align-items-center justify-content-between">
                   <div className="profile-stats d-flex gap-4">
                     <div className="text-center">
-                      <h5 className="mb-0 text-primary">{myPosts.length}</h5>
+                      <h5 className="mb-0 text-primary">{stats ? stats.post_count : '-'}</h5>
                       <small className="text-muted">Post</small>
                     </div>
                     <div className="text-center">
                       <h5 className="mb-0 text-primary">
-                        {myPosts.reduce((total, post) => total + (post.comments?.length || 0), 0)}
+                        {stats ? stats.comment_count : '-'}
                       </h5>
                       <small className="text-muted">Komentar</small>
                     </div>
                     <div className="text-center">
                       <h5 className="mb-0 text-primary">
-                        {myPosts.reduce((total, post) => total + (post.upvotes || 0), 0)}
+                        {stats ? stats.upvotes_received : '-'}
                       </h5>
                       <small className="text-muted">Likes</small>
                     </div>
@@ -82,14 +112,24 @@ export default function ProfilePage() {
               Timeline
             </h4>
             <Badge bg="primary" className="ms-3">
-              {myPosts.length} post
+              {stats ? stats.post_count : myPosts.length} post
             </Badge>
           </div>
           
           {myPosts.length > 0 ? (
-            myPosts.map(post => (
-              <PostItem key={post.id} post={post} />
-            ))
+            // edit/hapus dari PostItem mengubah timeline ini, bukan feed
+            <PostsContext.Provider value={{ posts: myPosts, setPosts: setMyPosts }}>
+              {myPosts.map(post => (
+                <PostItem key={post.id} post={post} />
+              ))}
+              {nextCursor && (
+                <div className="text-center">
+                  <Button variant="outline-primary" onClick={loadMore}>
+                    Muat lebih banyak
+                  </Button>
+                </div>
+              )}
+            </PostsContext.Provider>
           ) : (
             <Card className="text-center py-5 border-0 shadow-sm">
               <Card.Body>
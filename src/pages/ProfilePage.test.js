@@ -4,7 +4,15 @@ import userEvent from '@testing-library/user-event';
 import { MemoryRouter } from 'react-router-dom';
 import ProfilePage from './ProfilePage';
 import { AuthContext } from '../context/AuthContext';
-import { PostsContext } from '../context/PostsContext';
+import api from '../api';
+
+// Mock the API module
+jest.mock('../api', () => ({
+  get: jest.fn(),
+  post: jest.fn(),
+  put: jest.fn(),
+  delete: jest.fn(),
+}));
 
 // Mock EditProfileForm component
 jest.mock('../components/EditProfileForm', () => {
@@ -39,25 +47,14 @@ const mockUser = {
   email: 'test@example.com'
 };
 
+const mockStats = {
+  ...mockUser,
+  post_count: 2,
+  comment_count: 7,
+  upvotes_received: 5
+};
+
 const mockPosts = [
-  {
-    id: 1,
-    username: 'testuser',
-    content: 'My first post',
-    created_at: '2023-01-01T00:00:00Z',
-    upvotes: 5,
-    downvotes: 1,
-    comments: []
-  },
-  {
-    id: 2,
-    username: 'otheruser',
-    content: 'Other user post',
-    created_at: '2023-01-02T00:00:00Z',
-    upvotes: 3,
-    downvotes: 0,
-    comments: []
-  },
   {
     id: 3,
     username: 'testuser',
@@ -66,9 +63,31 @@ const mockPosts = [
     upvotes: 2,
     downvotes: 0,
     comments: []
+  },
+  {
+    id: 1,
+    username: 'testuser',
+    content: 'My first post',
+    created_at: '2023-01-01T00:00:00Z',
+    upvotes: 3,
+    downvotes: 1,
+    comments: []
   }
 ];
 
+// Jawab GET /users/{id} dan GET /users/{id}/posts seperti backend
+const mockApi = ({ stats = mockStats, pages = [{ posts: mockPosts, next_cursor: null }] } = {}) => {
+  let page = 0;
+  api.get.mockImplementation(url => {
+    if (url.endsWith('/posts')) {
+      const data = pages[Math.min(page, pages.length - 1)];
+      page += 1;
+      return Promise.resolve({ data });
+    }
+    return Promise.resolve({ data: stats });
+  });
+};
+
 const MockAuthProvider = ({ children, user = mockUser }) => (
   <AuthContext.Provider value={{ 
     user, 
@@ -81,19 +100,11 @@ const MockAuthProvider = ({ children, user = mockUser }) => (
   </AuthContext.Provider>
 );
 
-const MockPostsProvider = ({ children, posts = mockPosts }) => (
-  <PostsContext.Provider value={{ posts, setPosts: jest.fn(), fetchPosts: jest.fn() }}>
-    {children}
-  </PostsContext.Provider>
-);
-
-const renderWithProviders = (ui, { user = mockUser, posts = mockPosts } = {}) => {
+const renderWithProviders = (ui, { user = mockUser } = {}) => {
   return render(
     <MemoryRouter>
       <MockAuthProvider user={user}>
-        <MockPostsProvider posts={posts}>
-          {ui}
-        </MockPostsProvider>
+        {ui}
       </MockAuthProvider>
     </MemoryRouter>
   );
@@ -102,14 +113,17 @@ const renderWithProviders = (ui, { user = mockUser, posts = mockPosts } = {}) =>
 describe('ProfilePage Component', () => {
   beforeEach(() => {
     jest.clearAllMocks();
+    mockApi();
   });
 
   test('renders loading state when user is null', () => {
     renderWithProviders(<ProfilePage />, { user: null });
     
     expect(screen.getByText('Loading...')).toBeInTheDocument();
+    expect(api.get).not.toHaveBeenCalled();
   });
-  test('renders user profile information', () => {
+
+  test('renders user profile information', async () => {
     renderWithProviders(<ProfilePage />);
     
     expect(screen.getByText('Profil Saya')).toBeInTheDocument();
@@ -118,47 +132,79 @@ describe('ProfilePage Component', () => {
     expect(screen.getByText(/Email:/)).toBeInTheDocument();
     expect(screen.getByText(/test@example\.com/)).toBeInTheDocument();
     expect(screen.getByText('Edit Profil')).toBeInTheDocument();
+    await screen.findByTestId('post-item-1');
   });
 
-  test('shows timeline section', () => {
+  test('shows timeline section', async () => {
     renderWithProviders(<ProfilePage />);
     
     expect(screen.getByText('Timeline')).toBeInTheDocument();
+    await screen.findByTestId('post-item-1');
   });
 
-  test('displays only user own posts in timeline', () => {
+  test('fetches the timeline from the profile endpoint, not the feed', async () => {
+    renderWithProviders(<ProfilePage />);
+
+    await screen.findByTestId('post-item-1');
+    expect(api.get).toHaveBeenCalledWith('/users/1');
+    expect(api.get).toHaveBeenCalledWith('/users/1/posts', { params: { limit: 20 } });
+    expect(api.get).not.toHaveBeenCalledWith('/posts', expect.anything());
+  });
+
+  test('displays the user posts in the order returned', async () => {
     renderWithProviders(<ProfilePage />);
     
-    // Should show only testuser's posts (posts 1 and 3)
-    expect(screen.getByTestId('post-item-1')).toBeInTheDocument();
-    expect(screen.getByTestId('post-item-3')).toBeInTheDocument();
-    
-    // Should not show other user's post (post 2)
-    expect(screen.queryByTestId('post-item-2')).not.toBeInTheDocument();
-    
-    // Verify content
+    await screen.findByTestId('post-item-1');
+    const postItems = screen.getAllByTestId(/post-item-/);
+    expect(postItems).toHaveLength(2);
+    expect(postItems[0]).toHaveAttribute('data-testid', 'post-item-3');
+    expect(postItems[1]).toHaveAttribute('data-testid', 'post-item-1');
     expect(screen.getByText('My first post')).toBeInTheDocument();
     expect(screen.getByText('My second post')).toBeInTheDocument();
-    expect(screen.queryByText('Other user post')).not.toBeInTheDocument();
   });
 
-  test('shows message when user has no posts', () => {
-    const postsWithoutUserPosts = [
-      {
-        id: 2,
-        username: 'otheruser',
-        content: 'Other user post',
-        created_at: '2023-01-02T00:00:00Z',
-        upvotes: 3,
-        downvotes: 0,
-        comments: []
-      }
-    ];
-    
-    renderWithProviders(<ProfilePage />, { posts: postsWithoutUserPosts });
+  test('shows stats from the user counters', async () => {
+    renderWithProviders(<ProfilePage />);
+
+    expect(await screen.findByText('7')).toBeInTheDocument();
+    expect(screen.getByText('5')).toBeInTheDocument();
+    expect(screen.getByText('2 post')).toBeInTheDocument();
+  });
+
+  test('shows message when user has no posts', async () => {
+    mockApi({
+      stats: { ...mockStats, post_count: 0 },
+      pages: [{ posts: [], next_cursor: null }]
+    });
+    renderWithProviders(<ProfilePage />);
     
     expect(screen.getByText('Belum ada postingan.')).toBeInTheDocument();
+    await waitFor(() => expect(api.get).toHaveBeenCalledTimes(2));
+    expect(screen.getByText('Belum ada postingan.')).toBeInTheDocument();
+    expect(screen.queryByText('Muat lebih banyak')).not.toBeInTheDocument();
+  });
+
+  test('loads the next page with the cursor', async () => {
+    const user = userEvent.setup();
+    mockApi({
+      pages: [
+        { posts: [mockPosts[0]], next_cursor: 'abc' },
+        { posts: [mockPosts[1]], next_cursor: null }
+      ]
+    });
+    renderWithProviders(<ProfilePage />);
+
+    await screen.findByTestId('post-item-3');
+    await user.click(screen.getByText('Muat lebih banyak'));
+
+    await screen.findByTestId('post-item-1');
+    expect(api.get).toHaveBeenCalledWith('/users/1/posts', {
+      params: { limit: 20, cursor: 'abc' }
+    });
+    expect(screen.getAllByTestId(/post-item-/)).toHaveLength(2);
+    expect(screen.queryByText('Muat lebih banyak')).not.toBeInTheDocument();
   });
+
   test('toggles edit profile form', async () => {
     const user = userEvent.setup();
     renderWithProviders(<ProfilePage />);
@@ -178,6 +224,7 @@ describe('ProfilePage Component', () => {
     // Profile info should be hidden
     expect(screen.queryByText(/Username:/)).not.toBeInTheDocument();
   });
+
   test('cancels edit mode', async () => {
     const user = userEvent.setup();
     renderWithProviders(<ProfilePage />);
@@ -195,104 +242,7 @@ describe('ProfilePage Component', () => {
     expect(screen.getByText('testuser')).toBeInTheDocument();
   });
 
-  test('renders posts in correct order', () => {
-    renderWithProviders(<ProfilePage />);
-    
-    const postItems = screen.getAllByTestId(/post-item-/);
-    expect(postItems).toHaveLength(2);
-    
-    // Should maintain the original order from posts array
-    expect(postItems[0]).toHaveAttribute('data-testid', 'post-item-1');
-    expect(postItems[1]).toHaveAttribute('data-testid', 'post-item-3');
-  });
-
-  test('handles empty posts array', () => {
-    renderWithProviders(<ProfilePage />, { posts: [] });
-    
-    expect(screen.getByText('Profil Saya')).toBeInTheDocument();
-    expect(screen.getByText('Timeline')).toBeInTheDocument();
-    expect(screen.getByText('Belum ada postingan.')).toBeInTheDocument();
-  });
-
-  test('filters posts correctly with mixed usernames', () => {
-    const mixedPosts = [
-      {
-        id: 1,
-        username: 'testuser',
-        content: 'User post 1',
-        created_at: '2023-01-01T00:00:00Z',
-        upvotes: 0,
-        downvotes: 0,
-        comments: []
-      },
-      {
-        id: 2,
-        username: 'TestUser', // Different case
-        content: 'Different case username',
-        created_at: '2023-01-02T00:00:00Z',
-        upvotes: 0,
-        downvotes: 0,
-        comments: []
-      },
-      {
-        id: 3,
-        username: 'testuser',
-        content: 'User post 2',
-        created_at: '2023-01-03T00:00:00Z',
-        upvotes: 0,
-        downvotes: 0,
-        comments: []
-      }
-    ];
-    
-    renderWithProviders(<ProfilePage />, { posts: mixedPosts });
-    
-    // Should only show exact username matches
-    expect(screen.getByTestId('post-item-1')).toBeInTheDocument();
-    expect(screen.getByTestId('post-item-3')).toBeInTheDocument();
-    expect(screen.queryByTestId('post-item-2')).not.toBeInTheDocument();
-    
-    expect(screen.getByText('User post 1')).toBeInTheDocument();
-    expect(screen.getByText('User post 2')).toBeInTheDocument();
-    expect(screen.queryByText('Different case username')).not.toBeInTheDocument();
-  });
-
-  test('maintains edit state when posts change', async () => {
-    const user = userEvent.setup();
-    const { rerender } = renderWithProviders(<ProfilePage />);
-    
-    // Enter edit mode
-    await user.click(screen.getByText('Edit Profil'));
-    expect(screen.getByTestId('edit-profile-form')).toBeInTheDocument();
-    
-    // Simulate posts context change
-    const updatedPosts = [
-      ...mockPosts,
-      {
-        id: 4,
-        username: 'testuser',
-        content: 'New post',
-        created_at: '2023-01-04T00:00:00Z',
-        upvotes: 0,
-        downvotes: 0,
-        comments: []
-      }
-    ];
-    
-    rerender(
-      <MemoryRouter>
-        <MockAuthProvider user={mockUser}>
-          <MockPostsProvider posts={updatedPosts}>
-            <ProfilePage />
-          </MockPostsProvider>
-        </MockAuthProvider>
-      </MemoryRouter>
-    );
-    
-    // Should still be in edit mode
-    expect(screen.getByTestId('edit-profile-form')).toBeInTheDocument();
-  });
-  test('displays user profile with special characters', () => {
+  test('displays user profile with special characters', async () => {
     const userWithSpecialChars = {
       id: 1,
       username: 'test.user_123',
@@ -303,59 +253,21 @@ describe('ProfilePage Component', () => {
     
     expect(screen.getByText('test.user_123')).toBeInTheDocument();
     expect(screen.getByText(/test\+user@example\.com/)).toBeInTheDocument();
+    await screen.findByTestId('post-item-1');
   });
 
-  test('handles posts without required fields gracefully', () => {
+  test('handles posts without required fields gracefully', async () => {
     const incompletePost = {
       id: 1,
       username: 'testuser',
       content: 'Post without some fields'
       // Missing created_at, upvotes, downvotes, comments
     };
+    mockApi({ pages: [{ posts: [incompletePost], next_cursor: null }] });
     
-    renderWithProviders(<ProfilePage />, { posts: [incompletePost] });
-    
-    expect(screen.getByTestId('post-item-1')).toBeInTheDocument();
-    expect(screen.getByText('Post without some fields')).toBeInTheDocument();
-  });
-
-  test('updates timeline when user posts are added or removed', () => {
-    const initialPosts = [
-      {
-        id: 1,
-        username: 'testuser',
-        content: 'Initial post',
-        created_at: '2023-01-01T00:00:00Z',
-        upvotes: 0,
-        downvotes: 0,
-        comments: []
-      }
-    ];
-    
-    const { rerender } = renderWithProviders(<ProfilePage />, { posts: initialPosts });
-    
-    expect(screen.getByTestId('post-item-1')).toBeInTheDocument();
-    expect(screen.getByText('Initial post')).toBeInTheDocument();
-    
-    // Remove the post
-    rerender(
-      <MemoryRouter>
-        <MockAuthProvider user={mockUser}>
-          <MockPostsProvider posts={[]}>
-            <ProfilePage />
-          </MockPostsProvider>
-        </MockAuthProvider>
-      </MemoryRouter>
-    );
-    
-    expect(screen.queryByTestId('post-item-1')).not.toBeInTheDocument();
-    expect(screen.getByText('Belum ada postingan.')).toBeInTheDocument();
-  });
-
-  test('displays correct post count in timeline', () => {
     renderWithProviders(<ProfilePage />);
     
-    const postItems = screen.getAllByTestId(/post-item-/);
-    expect(postItems).toHaveLength(2); // testuser has 2 posts in mockPosts
+    expect(await screen.findByTestId('post-item-1')).toBeInTheDocument();
+    expect(screen.getByText('Post without some fields')).toBeInTheDocument();
   });
 });